@@ -0,0 +1,6 @@
+"""
+Benchmark and fuzz corpus of src.wasteland_wars.parsers, run from the repository root:
+
+    python -m benchmarks.parsers            # messages/sec and µs per parser over the corpus
+    python -m benchmarks.parsers --fuzz     # also flags parsers whose time grows super-linearly
+"""
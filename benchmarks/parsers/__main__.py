@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import dataclasses
+import sys
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from src.wasteland_wars.enums import MessageKind
+from src.wasteland_wars.parsers import parse_forward, parse_forwards
+from src.wasteland_wars.schemas import construct
+from src.wasteland_wars.utils import get_message_kinds
+
+from .corpus import FORWARD_DATE, PARSERS, Sample, load_corpus
+from .fuzz import measure_growth
+
+
+def _best_average(func: Callable[[], None], calls: int, repeat: int) -> float:
+    """Best over `repeat` rounds of the average seconds of one of `calls` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - started_at) / calls)
+    return best
+
+
+@contextlib.contextmanager
+def _validated_schemas():
+    """The parsers build their schemas with full validation, as with WW_VALIDATE_SCHEMAS"""
+    validate, construct.VALIDATE_SCHEMAS = construct.VALIDATE_SCHEMAS, True
+    try:
+        yield
+    finally:
+        construct.VALIDATE_SCHEMAS = validate
+
+
+def check_corpus(corpus: Sequence[Sample]) -> List[str]:
+    errors = []
+    for sample in corpus:
+        for kind, parser in PARSERS.items():
+            if kind == sample.kind and parser(sample.text, FORWARD_DATE) is None:
+                errors.append(f"{sample.kind}/{sample.name}: {parser.__name__} did not match")
+            if sample.kind == MessageKind.UNKNOWN and parser(sample.text, FORWARD_DATE) is not None:
+                errors.append(f"{sample.kind}/{sample.name}: {parser.__name__} matched")
+        if sample.kind != MessageKind.UNKNOWN and sample.kind not in get_message_kinds(sample.text):
+            errors.append(f"{sample.kind}/{sample.name}: not classified as {sample.kind}")
+    return errors
+
+
+def benchmark(corpus: Sequence[Sample], repeat: int):
+    texts = [sample.text for sample in corpus]
+
+    print(f"{'parser':<20}{'own kind µs':>14}{'validated µs':>14}{'other kinds µs':>16}")
+    for kind, parser in PARSERS.items():
+        own = [sample.text for sample in corpus if sample.kind == kind]
+        other = [sample.text for sample in corpus if sample.kind != kind]
+        own_seconds = _best_average(lambda: [parser(text, FORWARD_DATE) for text in own], len(own), repeat)
+        with _validated_schemas():
+            validated_seconds = _best_average(lambda: [parser(text, FORWARD_DATE) for text in own], len(own), repeat)
+        other_seconds = _best_average(lambda: [parser(text, FORWARD_DATE) for text in other], len(other), repeat)
+        print(
+            f"{parser.__name__:<20}{own_seconds * 1e6:>14.1f}{validated_seconds * 1e6:>14.1f}"
+            f"{other_seconds * 1e6:>16.1f}"
+        )
+
+    def every_parser():
+        for text in texts:
+            for parser in PARSERS.values():
+                parser(text, FORWARD_DATE)
+
+    def classified():
+        for text in texts:
+            parse_forward(text, FORWARD_DATE)
+
+    print()
+    for name, func in (("every parser", every_parser), ("classified", classified)):
+        seconds = _best_average(func, len(texts), repeat)
+        print(f"{name:<20}{1 / seconds:>12.0f} messages/sec {seconds * 1e6:>10.1f} µs/message")
+
+
+def _schema_calls(value) -> List[Tuple[type, dict]]:
+    """The construct.build calls the parser made for a result: every schema in it with its fields"""
+    if isinstance(value, list):
+        return [call for item in value for call in _schema_calls(item)]
+    if not dataclasses.is_dataclass(value):
+        return []
+    fields = {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    return [call for field in fields.values() for call in _schema_calls(field)] + [(type(value), fields)]
+
+
+def benchmark_schemas(corpus: Sequence[Sample], repeat: int):
+    """Building the schemas of a parsed message alone, trusted and validated"""
+    print(f"\n{'schemas of':<20}{'trusted µs':>14}{'validated µs':>14}")
+    for kind, parser in PARSERS.items():
+        calls = [_schema_calls(parser(sample.text, FORWARD_DATE)) for sample in corpus if sample.kind == kind]
+
+        def build_all():
+            for message_calls in calls:
+                for schema, fields in message_calls:
+                    construct.build(schema, **fields)
+
+        trusted_seconds = _best_average(build_all, len(calls), repeat)
+        with _validated_schemas():
+            validated_seconds = _best_average(build_all, len(calls), repeat)
+        print(f"{kind:<20}{trusted_seconds * 1e6:>14.1f}{validated_seconds * 1e6:>14.1f}")
+
+
+def benchmark_bulk(corpus: Sequence[Sample], copies: int, workers: Optional[int]):
+    """parse_forwards over the corpus repeated `copies` times, as an archive re-parse would run"""
+    records = [(sample.text, FORWARD_DATE) for sample in corpus] * copies
+
+    started_at = time.perf_counter()
+    for _ in parse_forwards(records, workers):
+        pass
+    seconds = time.perf_counter() - started_at
+    print(f"{'bulk':<20}{len(records) / seconds:>12.0f} messages/sec over {len(records)} messages")
+
+
+def fuzz(corpus: Sequence[Sample], max_length: int, threshold: float) -> int:
+    flagged = 0
+    print(f"\n{'input':<28}{'parser':<20}{'length':>8}{'ms':>10}{'exponent':>10}")
+    for growth in measure_growth(corpus, max_length):
+        # sub-millisecond timings are too noisy to tell the growth
+        super_linear = growth.exponent > threshold and growth.seconds[-1] > 0.001
+        flagged += super_linear
+        print(
+            f"{growth.generator:<28}{growth.parser:<20}{growth.lengths[-1]:>8}"
+            f"{growth.seconds[-1] * 1e3:>10.2f}{growth.exponent:>10.2f}{'  SUPER-LINEAR' if super_linear else ''}"
+        )
+    return flagged
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.parsers", description="Benchmark and fuzz src.wasteland_wars.parsers"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="rounds, the best one is reported")
+    parser.add_argument("--bulk", type=int, default=0, help="also time parse_forwards over the corpus this many times")
+    parser.add_argument("--workers", type=int, default=None, help="processes for --bulk, all cores by default")
+    parser.add_argument("--fuzz", action="store_true", help="measure parse time growth on generated inputs")
+    parser.add_argument("--max-length", type=int, default=8_000, help="length of the longest fuzz input")
+    parser.add_argument("--threshold", type=float, default=1.5, help="growth exponent flagged as super-linear")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus()
+    errors = check_corpus(corpus)
+    for error in errors:
+        print(error, file=sys.stderr)
+
+    print(f"{len(corpus)} corpus messages\n")
+    benchmark(corpus, args.repeat)
+    benchmark_schemas(corpus, args.repeat)
+    if args.bulk:
+        benchmark_bulk(corpus, args.bulk, args.workers)
+
+    flagged = fuzz(corpus, args.max_length, args.threshold) if args.fuzz else 0
+    return 1 if errors or flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+from src.wasteland_wars.enums import MessageKind
+from src.wasteland_wars.parsers import PARSERS
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+FORWARD_DATE = datetime.datetime(2024, 10, 18, 17, 30)
+
+# corpus/<kind>/ holds the texts the parser of the kind must match, corpus/unknown/ the ones no parser matches
+
+
+class Sample(NamedTuple):
+    kind: MessageKind
+    name: str
+    text: str
+
+
+def load_corpus(kinds: Optional[Sequence[MessageKind]] = None) -> List[Sample]:
+    samples = []
+    for kind in kinds or [*PARSERS, MessageKind.UNKNOWN]:
+        for path in sorted((CORPUS_DIR / kind).glob("*.txt")):
+            samples.append(Sample(kind, path.stem, path.read_text(encoding="utf-8").rstrip("\n")))
+    return samples
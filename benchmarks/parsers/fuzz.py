@@ -0,0 +1,85 @@
+import math
+import random
+import re
+import time
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+from .corpus import FORWARD_DATE, PARSERS, Sample
+
+_TOKEN_RE = re.compile(r"\d+|\w+|\s|.", re.UNICODE)
+
+
+def _repeat(fragment: str, length: int) -> str:
+    return (fragment * (length // len(fragment) + 1))[:length]
+
+
+def _without(text: str, marker: str) -> str:
+    """Near miss: the text with every line containing the marker removed"""
+    return "\n".join(line for line in text.split("\n") if marker not in line)
+
+
+def make_generators(corpus: Sequence[Sample], seed: int = 0) -> Dict[str, Callable[[int], str]]:
+    """Families of inputs of a given length: corpus texts missing one required line, and adversarial repeats"""
+    by_name = {f"{sample.kind}/{sample.name}": sample.text for sample in corpus}
+    full_pipboy = by_name.get("pipboy/full_1", "")
+    short_pipboy = by_name.get("pipboy/short_1", "")
+    gang_panel = by_name.get("gang_panel/members_30", "")
+    goat_panel = by_name.get("goat_panel/gangs_5", "")
+
+    tokens = sorted({token for sample in corpus for token in _TOKEN_RE.findall(sample.text)})
+
+    def token_soup(length: int) -> str:
+        rnd = random.Random(seed + length)
+        parts: List[str] = []
+        size = 0
+        while size < length:
+            parts.append(rnd.choice(tokens))
+            size += len(parts[-1])
+        return "".join(parts)[:length]
+
+    return {
+        "pipboy_no_stamina": lambda n: _repeat("\n" + _without(full_pipboy, "🔋"), n),
+        "pipboy_commas": lambda n: "\n" + _repeat("Игрок, ", n),
+        "short_pipboy_no_location": lambda n: _repeat(_without(short_pipboy, "├🔥") + "\n", n),
+        "gang_members_no_km": lambda n: gang_panel + "\n" + _repeat("🔸 Игрок 👂12 👊", n),
+        "goat_no_footer": lambda n: _repeat(_without(goat_panel, "👊") + "\n", n),
+        "raid_one_line": lambda n: _repeat("Рейд в 17:00 ", n),
+        "showdata_spaces": lambda n: "Доступ" + _repeat(" к", n),
+        "token_soup": token_soup,
+    }
+
+
+class Growth(NamedTuple):
+    generator: str
+    parser: str
+    lengths: List[int]
+    seconds: List[float]
+
+    @property
+    def exponent(self) -> float:
+        """Slope of log(time) over log(length): 1 is linear, 2 is quadratic"""
+        xs = [math.log(length) for length in self.lengths]
+        ys = [math.log(max(seconds, 1e-9)) for seconds in self.seconds]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        variance = sum((x - mean_x) ** 2 for x in xs)
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def _best_time(parser: Callable, text: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        parser(text, FORWARD_DATE)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def measure_growth(corpus: Sequence[Sample], max_length: int = 8_000, repeat: int = 3) -> List[Growth]:
+    lengths = [max_length // 8, max_length // 4, max_length // 2, max_length]
+    results = []
+    for generator_name, generator in make_generators(corpus).items():
+        texts = [generator(length) for length in lengths]
+        for kind, parser in PARSERS.items():
+            seconds = [_best_time(parser, text, repeat) for text in texts]
+            results.append(Growth(generator_name, parser.__name__, [len(text) for text in texts], seconds))
+    return results
@@ -1,6 +1,8 @@
 import datetime
 import logging.config
 import os
+import re
+import socket
 
 from dotenv import find_dotenv, load_dotenv
 
@@ -24,6 +26,28 @@ class Config(object):
     TG_TOKEN = os.getenv("TG_TOKEN")
 
     TG_PROXY_URL = os.getenv("TG_PROXY_URL")
+    TG_CON_POOL_SIZE = os.getenv("TG_CON_POOL_SIZE")  # sized to the concurrent Bot API callers if unset
+    TG_CONNECT_TIMEOUT = float(os.getenv("TG_CONNECT_TIMEOUT", 5))  # seconds
+    TG_READ_TIMEOUT = float(os.getenv("TG_READ_TIMEOUT", 5))  # seconds
+
+    UPDATES_MODE = os.getenv("UPDATES_MODE", "polling")  # polling | webhook
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # public url, required behind a reverse proxy
+    WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")  # checked on every post if set
+    WEBHOOK_CERT = os.getenv("WEBHOOK_CERT")  # TLS is terminated by the bot if both are set
+    WEBHOOK_KEY = os.getenv("WEBHOOK_KEY")
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+
+    SHARDS = int(os.getenv("SHARDS", 1))  # worker processes, updates are split between them by user id
+    LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", 30))  # seconds, must exceed the clock skew of the hosts
+
+    DISPATCHER_WORKERS = int(os.getenv("DISPATCHER_WORKERS", 4))
+    SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", 10))
+    HANDLER_WORKERS = int(os.getenv("HANDLER_WORKERS", 0))  # inner handlers pool, 0 runs them on the dispatcher
+    HANDLER_QUEUE_SIZE = int(os.getenv("HANDLER_QUEUE_SIZE", 1_000))
+    HANDLER_BLOCK_TIMEOUT = float(os.getenv("HANDLER_BLOCK_TIMEOUT", 5))  # seconds, then the update is dropped
 
     ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID")
 
@@ -34,9 +58,59 @@ class Config(object):
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+    SENDER_WORKERS = int(os.getenv("SENDER_WORKERS", 4))
+    SENDER_QUEUE_SIZE = int(os.getenv("SENDER_QUEUE_SIZE", 10_000))
+    SENDER_BACKPRESSURE = os.getenv("SENDER_BACKPRESSURE", "block")  # block | drop
+    SENDER_BLOCK_TIMEOUT = float(os.getenv("SENDER_BLOCK_TIMEOUT", 5))
+    SENDER_DRAIN_TIMEOUT = float(os.getenv("SENDER_DRAIN_TIMEOUT", 30))
+    MESSAGE_COALESCE_WINDOW = float(os.getenv("MESSAGE_COALESCE_WINDOW", 0))  # seconds, 0 disables coalescing
+    SENDER_MAX_RETRIES = int(os.getenv("SENDER_MAX_RETRIES", 3))  # retries of a send failed on a network error
+    SENDER_RETRY_BASE_DELAY = float(os.getenv("SENDER_RETRY_BASE_DELAY", 1))  # seconds, doubled on every retry
+    SENDER_RETRY_MAX_DELAY = float(os.getenv("SENDER_RETRY_MAX_DELAY", 60))  # seconds
+    EDIT_COALESCE_DELAY = float(os.getenv("EDIT_COALESCE_DELAY", 0.5))  # seconds an edit or a pin is held for
+    EDIT_COALESCE_MAX_DELAY = float(os.getenv("EDIT_COALESCE_MAX_DELAY", 2))  # seconds
+    UNDELIVERABLE_CHAT_TTL = float(os.getenv("UNDELIVERABLE_CHAT_TTL", 3 * 24 * 60 * 60))  # seconds
+
+    METRICS_FILE = os.getenv("METRICS_FILE")  # Prometheus text format file, not written if unset
+    METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 15))  # seconds
+
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() in ("1", "true", "yes")
+    PROFILER_SAMPLES = int(os.getenv("PROFILER_SAMPLES", 1_000))  # latest calls per handler the quantiles are over
+
+    N_PLUS_ONE_MODE = os.getenv("N_PLUS_ONE_MODE", "off")  # off | log | raise
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))  # repeats of one query per update or job
+
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 5_000))  # entries per looked up model
+    IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", 60))  # seconds, bounds staleness across processes
+
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 5))  # seconds between activity writes
+
+    OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "false").lower() in ("1", "true", "yes")
+    OUTBOX_OWNER = os.getenv("OUTBOX_OWNER", socket.gethostname())  # must be stable across restarts
+    OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", 1))  # seconds
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+    OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", 300))  # seconds before rows of a dead process are taken over
+
     DATETIME_FORMAT = os.getenv("DATETIME_FORMAT", "%Y-%m-%d %H:%M:%S")
     timezone = datetime.timezone(offset=datetime.timedelta(hours=3))  # MSK
 
+    @property
+    def CONCURRENT_API_CALLERS(self) -> int:
+        """
+        Threads which may call the Bot API at the same time: dispatcher, sender, scheduler and handler workers
+        and 4 for the Updater itself (dispatcher, polling, job queue, main thread)
+        """
+        return self.DISPATCHER_WORKERS + self.SENDER_WORKERS + self.SCHEDULER_WORKERS + self.HANDLER_WORKERS + 4
+
+    @property
+    def REQUEST_KWARGS(self):
+        return {
+            "con_pool_size": self.TG_CON_POOL_SIZE,
+            "proxy_url": self.TG_PROXY_URL,
+            "connect_timeout": self.TG_CONNECT_TIMEOUT,
+            "read_timeout": self.TG_READ_TIMEOUT,
+        }
+
     @property
     def LOGGING_CONFIG(self):
         return {
@@ -71,6 +145,37 @@ class Config(object):
         self.UNKOWN_CHAT_ID = int(self.UNKOWN_CHAT_ID)
         self.NOTIFY_CHAT_ID = int(self.NOTIFY_CHAT_ID)
 
+        if self.UPDATES_MODE not in ("polling", "webhook"):
+            raise ImproperlyConfigured("UPDATES_MODE must be one of: polling, webhook")
+        if self.WEBHOOK_SECRET_TOKEN and not re.fullmatch(r"[\w-]{1,256}", self.WEBHOOK_SECRET_TOKEN, re.ASCII):
+            raise ImproperlyConfigured("WEBHOOK_SECRET_TOKEN must be 1-256 characters of A-Z, a-z, 0-9, _ and -")
+        if bool(self.WEBHOOK_CERT) != bool(self.WEBHOOK_KEY):
+            raise ImproperlyConfigured("WEBHOOK_CERT and WEBHOOK_KEY must be set together")
+
+        if self.SHARDS < 1:
+            raise ImproperlyConfigured("SHARDS must be positive")
+        if self.SHARDS > 1 and not self.OUTBOX_ENABLED:
+            raise ImproperlyConfigured("SHARDS > 1 requires OUTBOX_ENABLED, the leader sends messages of all shards")
+
+        if self.N_PLUS_ONE_MODE not in ("off", "log", "raise"):
+            raise ImproperlyConfigured("N_PLUS_ONE_MODE must be one of: off, log, raise")
+
+        if self.SENDER_WORKERS < 1:
+            raise ImproperlyConfigured("SENDER_WORKERS must be positive")
+        if self.HANDLER_WORKERS < 0:
+            raise ImproperlyConfigured("HANDLER_WORKERS must not be negative")
+        if self.SENDER_BACKPRESSURE not in ("block", "drop"):
+            raise ImproperlyConfigured("SENDER_BACKPRESSURE must be one of: block, drop")
+
+        if self.TG_CON_POOL_SIZE is None:
+            self.TG_CON_POOL_SIZE = self.CONCURRENT_API_CALLERS
+        self.TG_CON_POOL_SIZE = int(self.TG_CON_POOL_SIZE)
+        if self.TG_CON_POOL_SIZE < self.CONCURRENT_API_CALLERS:
+            raise ImproperlyConfigured(
+                f"TG_CON_POOL_SIZE must be at least {self.CONCURRENT_API_CALLERS}: "
+                f"DISPATCHER_WORKERS + SENDER_WORKERS + SCHEDULER_WORKERS + HANDLER_WORKERS + 4"
+            )
+
         self.BASEDIR = BASEDIR
 
         logging.config.dictConfig(self.LOGGING_CONFIG)
@@ -1,5 +1,17 @@
+from .cache import LRUCache
 from .command import Command
 from .event_manager import EventManager
+from .executor import KeyedExecutor
 from .handler import InnerHandler
-from .message_manager import MessageManager, CallbackResults
+from .leader import LeaderLock
+from .message_manager import MessageManager, CallbackResults, BackpressurePolicy, AlreadyQueued
+from .metrics import MetricsRegistry, Counter, Gauge, Histogram, registry as metrics_registry
+from .outbox import Outbox
+from .profiler import Profiler, ProfileRow, callable_name, profiler
+from .query_detector import DetectorMode, NPlusOneError, QueryDetector, query_detector, statement_shape
+from .rate_limiter import RateLimiter, TokenBucketRateLimiter
+from .sharding import ShardRouter, ShardUpdater, routing_key, shard_of
+from .text_splitter import split_text, utf16_length
+from .undeliverable import UndeliverableChats
+from .webhook import WebhookUpdater
 from .update import InnerUpdate, UpdateFilter, CommandFilter, CommandNameFilter
@@ -0,0 +1,83 @@
+import collections
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional, OrderedDict, Tuple
+
+from .metrics import MetricsRegistry, registry
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread safe LRU cache whose entries also expire `ttl` seconds after they were stored.
+    None is cached as well, so a lookup of a missing row is not repeated either
+    """
+
+    def __init__(self, name: str, maxsize: int = 1_000, ttl: float = 60, metrics: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = collections.OrderedDict()  # key -> (expires, value)
+        self._generation = 0  # bumped by every invalidation, a value loaded across one is not stored
+        self._lock = threading.Lock()
+
+        metrics = metrics or registry
+        self._hits = metrics.counter("identity_cache_hits", "Lookups served from the cache", ["cache"])
+        self._misses = metrics.counter("identity_cache_misses", "Lookups which went to the database", ["cache"])
+        self._size = metrics.gauge("identity_cache_size", "Cached entries", ["cache"])
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits.inc(cache=self.name)
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+        self._misses.inc(cache=self.name)
+        return default
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._size.set(len(self._entries), cache=self.name)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        generation = self._generation
+        value = self.get(key)
+        if value is _MISSING:
+            value = load()
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+            self._size.set(len(self._entries), cache=self.name)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]):
+        """Drops the entries whose value matches, e.g. every lookup which returned a saved row"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+            self._size.set(len(self._entries), cache=self.name)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size.set(0, cache=self.name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,21 +1,128 @@
-from typing import List
+import heapq
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional, Set, Tuple
 
+from apscheduler.job import Job
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from .executor import KeyedExecutor
 from .handler import InnerHandler
-from .update import InnerUpdate
+from .leader import LeaderLock
+from .profiler import callable_name, profiler
+from .query_detector import query_detector
+from .sharding import routing_key
+from .update import InnerUpdate, UpdateFilter, CommandFilter, CommandNameFilter
+
+IndexedHandlers = List[Tuple[int, InnerHandler, bool]]  # (registration index, handler, filter is matched by index)
 
 
 class EventManager:
-    """this class broadcasts inside updates over modules"""
+    """
+    this class broadcasts inside updates over modules.
+    Handlers are indexed by their filter, so an update only touches the handlers which can match it:
+    CommandFilter by command, CommandNameFilter by command name, UpdateFilter by its attributes set.
+    Handlers with other filters are checked for every update. Matching handlers run in registration order.
+    With an executor updates are handled on its thread pool, the updates of one user keep their order.
+    With a leader lock the jobs added by add_leader_job run in the leader process only.
+    Handlers are measured by the profiler and checked by the N+1 query detector, if they are enabled
+    """
 
-    def __init__(self, scheduler: BackgroundScheduler):
+    def __init__(
+        self,
+        scheduler: BackgroundScheduler,
+        executor: Optional[KeyedExecutor] = None,
+        leader: Optional[LeaderLock] = None,
+    ):
         self.scheduler = scheduler
+        self.executor = executor
+        self.leader = leader
         self.handlers: List[InnerHandler] = []
+        self._handler_names: Dict[InnerHandler, str] = {}
+
+        self._by_command: Dict[str, IndexedHandlers] = {}
+        self._by_name: Dict[str, IndexedHandlers] = {}
+        self._by_attributes: Dict[FrozenSet[str], IndexedHandlers] = {}
+        self._attributes: Set[str] = set()
+        self._fallback: IndexedHandlers = []
 
     def add_handler(self, handler: InnerHandler) -> None:
+        index = len(self.handlers)
+        item = (index, handler, True)
         self.handlers.append(handler)
+        self._handler_names[handler] = callable_name(handler.target)
+
+        up_filter = handler.filter
+        if isinstance(up_filter, CommandNameFilter):
+            self._by_name.setdefault(up_filter.command, []).append(item)
+        elif isinstance(up_filter, CommandFilter):
+            self._by_command.setdefault(up_filter.command, []).append(item)
+        elif isinstance(up_filter, UpdateFilter) and up_filter.attributes:
+            attributes = frozenset(up_filter.attributes)
+            self._by_attributes.setdefault(attributes, []).append(item)
+            self._attributes.update(attributes)
+        else:
+            self._fallback.append((index, handler, False))
+
+    def _candidates(self, update: InnerUpdate) -> List[IndexedHandlers]:
+        """Lists of handlers whose filter is known to match the update"""
+        candidates: List[IndexedHandlers] = []
+
+        command = update.command
+        if command and command.command:
+            candidates.append(self._by_command.get(command.command.lower(), []))
+        if command and command.name:
+            candidates.append(self._by_name.get(command.name.lower(), []))
+
+        if self._by_attributes:
+            present = {attribute for attribute in self._attributes if getattr(update, attribute, False)}
+            if present:
+                for attributes, handlers in self._by_attributes.items():
+                    if attributes <= present:
+                        candidates.append(handlers)
+
+        return [handlers for handlers in candidates if handlers]
+
+    @staticmethod
+    def _get_key(update: InnerUpdate) -> Hashable:
+        if update.telegram_update is None:
+            return None
+        return routing_key(update.telegram_update)
+
+    def add_leader_job(self, func: Callable, trigger: str, **kwargs) -> Job:
+        """Schedules a job which must run once for the whole cluster, e.g. a notification cron"""
+        if self.leader:
+            func = self.leader.only(func)
+        return self.scheduler.add_job(func, trigger, **kwargs)
+
+    def start(self) -> None:
+        if self.executor:
+            self.executor.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if self.executor:
+            self.executor.stop(timeout)
 
     def invoke_handler_update(self, update: InnerUpdate) -> None:
-        for handler in self.handlers:
-            handler(update=update)
+        if self.executor:
+            self.executor.submit(self._get_key(update), self._invoke, update)
+        else:
+            self._invoke(update)
+
+    def _invoke(self, update: InnerUpdate) -> None:
+        for _, handler, matched in heapq.merge(self._fallback, *self._candidates(update), key=lambda item: item[0]):
+            if query_detector.enabled:
+                with query_detector.scope(self._handler_names[handler]):
+                    self._run(handler, matched, update)
+            else:
+                self._run(handler, matched, update)
+
+    def _run(self, handler: InnerHandler, matched: bool, update: InnerUpdate) -> None:
+        if not profiler.enabled:
+            if matched or handler.filter(update):
+                handler.handle(update)
+            return
+
+        name = self._handler_names[handler]
+        if not (matched or profiler.check(name, handler.filter, update)):
+            return
+        if profiler.check(name, handler.check_custom_filters, update):
+            profiler.call(name, handler.target, update)
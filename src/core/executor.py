@@ -0,0 +1,113 @@
+import collections
+import logging
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .message_manager import BackpressurePolicy
+from .metrics import MetricsRegistry, registry
+
+logger = logging.getLogger(__name__)
+
+Task = Tuple[float, Callable[..., Any], tuple]  # (submitted at, function, args)
+
+
+class KeyedExecutor:
+    """
+    Thread pool which runs the tasks of one key strictly one after another in submission order,
+    while the tasks of different keys run in parallel
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue_size: int = 1_000,
+        backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK,
+        block_timeout: float = 5.0,
+        name: str = "executor",
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self._workers_count = workers
+        self._max_queue_size = max_queue_size
+        self._backpressure = backpressure
+        self._block_timeout = block_timeout
+        self._name = name
+
+        self._tasks: Dict[Hashable, Deque[Task]] = {}  # key -> tasks not started yet
+        self._ready: Deque[Hashable] = collections.deque()  # keys with no running task
+        self._pending = 0  # queued and running tasks
+        self._stopping = False
+        self._workers: List[threading.Thread] = []
+        self._condition = threading.Condition(threading.Lock())
+
+        metrics = metrics or registry
+        self._wait = metrics.histogram(f"{name}_queue_wait_seconds", "Time from submit to start", [])
+        self._dropped = metrics.counter(f"{name}_dropped", "Tasks dropped on a full queue", [])
+        metrics.gauge(f"{name}_pending", "Queued and running tasks", collect=lambda: {(): self._pending})
+
+    def start(self):
+        self._stopping = False
+        for index in range(self._workers_count):
+            worker = threading.Thread(target=self._worker, name=f"{self._name}_{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Waits up to timeout seconds for the queued tasks, then stops workers"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+
+        if self._pending:
+            logger.warning(f"{self._name} stopped with {self._pending} unfinished tasks")
+
+    def submit(self, key: Hashable, function: Callable[..., Any], *args) -> bool:
+        """Queues function(*args) after the tasks already queued for key, returns False if it was dropped"""
+        with self._condition:
+            if self._pending >= self._max_queue_size and self._backpressure == BackpressurePolicy.BLOCK:
+                self._condition.wait_for(lambda: self._pending < self._max_queue_size, self._block_timeout)
+
+            if self._pending >= self._max_queue_size:
+                self._dropped.inc()
+                logger.warning(f"{self._name} queue is full, task for {key} dropped")
+                return False
+
+            tasks = self._tasks.get(key)
+            if tasks is None:
+                tasks = self._tasks[key] = collections.deque()
+                self._ready.append(key)
+
+            tasks.append((time.monotonic(), function, args))
+            self._pending += 1
+            self._condition.notify_all()
+            return True
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._ready:
+                    if self._stopping and not self._pending:
+                        return
+                    self._condition.wait()
+
+                key = self._ready.popleft()
+                submitted_at, function, args = self._tasks[key].popleft()
+
+            self._wait.observe(time.monotonic() - submitted_at)
+            try:
+                function(*args)
+            except (Exception,):
+                logger.exception(f"{self._name} task for {key} failed")
+            finally:
+                with self._condition:
+                    self._pending -= 1
+                    if self._tasks[key]:
+                        self._ready.append(key)
+                    else:
+                        del self._tasks[key]
+                    self._condition.notify_all()
@@ -24,8 +24,17 @@ class InnerHandler:
         if not self.filter(update):
             return None
 
-        for custom_filter in self.custom_filters:
-            if not custom_filter(update):
-                return None
+        return self.handle(update)
+
+    def handle(self, update: InnerUpdate) -> Any:
+        """Runs the handler for an update already matched by `filter`"""
+        if not self.check_custom_filters(update):
+            return None
 
         return self.target(update)
+
+    def check_custom_filters(self, update: InnerUpdate) -> bool:
+        for custom_filter in self.custom_filters:
+            if not custom_filter(update):
+                return False
+        return True
@@ -0,0 +1,60 @@
+import datetime
+import functools
+import logging
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """
+    Leader election on a lease row in the database: the process which holds the lease is the leader
+    and must refresh() it more often than every `ttl` seconds, otherwise another process takes it over.
+    `storage` is the LeaderLease model, it is passed in to keep src.core free of src.models imports
+    """
+
+    def __init__(self, storage, owner: str, name: str = "statbot", ttl: float = 30):
+        self._storage = storage
+        self.owner = owner
+        self.name = name
+        self.ttl = ttl
+        self._valid_until = 0.0  # monotonic time the lease is surely held till
+
+    @property
+    def is_leader(self) -> bool:
+        return self._valid_until > time.monotonic()
+
+    def refresh(self):
+        was_leader = self.is_leader
+        started_at = time.monotonic()
+        try:
+            acquired = self._storage.acquire(self.name, self.owner, datetime.timedelta(seconds=self.ttl))
+        except (Exception,):
+            logger.exception("Can not refresh leader lease")
+            return
+
+        self._valid_until = started_at + self.ttl if acquired else 0.0
+        if acquired != was_leader:
+            logger.info(f"{self.owner} {'is' if acquired else 'is not'} the {self.name} leader now")
+
+    def release(self):
+        if not self.is_leader:
+            return
+
+        self._valid_until = 0.0
+        try:
+            self._storage.release(self.name, self.owner)
+        except (Exception,):
+            logger.exception("Can not release leader lease")
+
+    def only(self, func: Callable) -> Callable:
+        """Wraps func to run only while this process is the leader"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.is_leader:
+                return func(*args, **kwargs)
+            logger.debug(f"Skipping {func.__name__}, {self.owner} is not the leader")
+
+        return wrapper
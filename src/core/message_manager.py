@@ -1,18 +1,46 @@
-import datetime
+import contextlib
+import enum
+import heapq
+import itertools
 import logging
+import random
 import threading
 import time
-from collections import deque, namedtuple
-from queue import PriorityQueue
-from typing import Optional
+import uuid
+from collections import namedtuple
+from queue import Full
+from typing import Optional, Dict, List, Tuple, Set
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from telegram import ParseMode, Message, Bot, TelegramError
+from telegram.error import BadRequest, NetworkError, RetryAfter, Unauthorized
+
+from .leader import LeaderLock
+from .metrics import MetricsRegistry, registry
+from .outbox import Outbox
+from .rate_limiter import RateLimiter, TokenBucketRateLimiter
+from .text_splitter import MAX_MESSAGE_LENGTH, split_text, utf16_length
+from .undeliverable import UndeliverableChats
 
 logger = logging.getLogger(__name__)
 
 CallbackResults = namedtuple("CallbackResults", ["value", "error", "args"])
 
+COALESCE_SEPARATOR = "\n\n"
+
+
+class AlreadyQueued(Exception):
+    """A message with the same dedupe key is queued and not sent yet, the new one is skipped"""
+
+
+class BackpressurePolicy(enum.StrEnum):
+    BLOCK = "block"  # caller waits up to block_timeout for a free slot, then the row is dropped
+    DROP = "drop"  # row is dropped right away
+
+
+def _chat_type(chat_id: Optional[int]) -> str:
+    return "private" if chat_id is not None and chat_id > 0 else "group"
+
 
 class RowFunctionArgs:
     def __init__(
@@ -23,7 +51,8 @@ class RowFunctionArgs:
         callback_args=None,
         args=None,
         kwargs=None,
-        group=False,
+        chat_id: Optional[int] = None,
+        coalesce: bool = False,
     ):
         self.priority = priority
         self.foo = foo
@@ -31,7 +60,23 @@ class RowFunctionArgs:
         self.callback_args = callback_args
         self.args = args
         self.kwargs = kwargs
-        self.group = group
+        self.chat_id = chat_id
+        self.coalesce = coalesce  # may be merged with the following rows of the same chat
+        self.size = 1  # number of queued rows this one stands for
+        self.outbox_keys: List[str] = []  # dedupe keys of the outbox rows this one stands for
+        self.sequence = 0  # queue position, a retried row goes back to it
+        self.attempts = 0  # failed sends which were retried
+        self.latest_key: Optional[tuple] = None  # rows with the same key replace each other until one is sent
+        self.hold_until = 0.0  # monotonic time before which the row is not sent
+        self.replacements = 0  # times the row was replaced by a later one with the same latest_key
+        self.created_at = time.monotonic()
+
+    def is_compatible(self, other: "RowFunctionArgs") -> bool:
+        """Rows differing only by text may be sent as one message"""
+        if not (other.coalesce and self.foo == other.foo and len(self.kwargs) == len(other.kwargs)):
+            return False
+
+        return all(key == "text" or other.kwargs.get(key) == value for key, value in self.kwargs.items())
 
     def __lt__(self, other):
         return self.priority < other.priority
@@ -45,95 +90,422 @@ class MessageManager:
         scheduler: BackgroundScheduler,
         all_burst_limit=30,
         group_burst_limit=20,
+        rate_limiter: Optional[RateLimiter] = None,
+        workers: int = 4,
+        max_queue_size: int = 10_000,
+        backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK,
+        block_timeout: float = 5.0,
+        coalesce_window: float = 0,
+        outbox: Optional[Outbox] = None,
+        outbox_interval: float = 1,
+        undeliverable: Optional[UndeliverableChats] = None,
+        max_retries: int = 3,
+        retry_base_delay: float = 1,
+        retry_max_delay: float = 60,
+        edit_delay: float = 0.5,
+        edit_max_delay: float = 2,
+        metrics: Optional[MetricsRegistry] = None,
+        leader: Optional[LeaderLock] = None,
     ):
         """unlike normal telegram Bot de not return anything valuable after calling send
-        if value is needed send it's receiver as a callback argument, or set is_queued parameter to False"""
-        self._burst_limit = all_burst_limit  # messages per second
-        self._group_burst_limit = group_burst_limit  # messages per minute
-
-        self._m_deque = deque()  # times to invoke self._call() under burst limit
-        self._mg_deque = deque()  # same with groups
-        self._m_blocked = False
-        self._mg_blocked = False
-        self._mq = PriorityQueue()
-        self._mq_group = PriorityQueue()
+        if value is needed send it's receiver as a callback argument, or set is_queued parameter to False.
+        Queued rows are sent by `workers` sender threads, see start() and stop().
+        With a positive coalesce_window plain text messages are held for that many seconds,
+        and the ones queued meanwhile to the same chat are sent as one message.
+        With an outbox queued messages are journaled and the unsent ones are replayed after a restart.
+        A row failed on RetryAfter is sent again once the chat's flood wait is over, one failed on a network error
+        is retried up to max_retries times with a jittered exponential backoff.
+        Chats which blocked the bot are remembered in `undeliverable` and skipped without API calls.
+        Edits, reply markup changes and pins are held for edit_delay seconds and the latest one per message wins,
+        the hold doubles on every replacement up to edit_max_delay.
+        With a leader lock and an outbox only the leader sends queued messages, the other processes relay them
+        through the outbox, so all processes together stay within the rate limits.
+        Messages with a callback are still sent by the process which queued them"""
+        if rate_limiter is None:
+            rate_limiter = TokenBucketRateLimiter(all_burst_limit, group_burst_limit)
+        self._rate_limiter = rate_limiter
+
+        self._queues: Dict[int, List[Tuple[int, int, RowFunctionArgs]]] = {}  # chat_id -> heap of pending rows
+        self._ready: List[Tuple[int, int, int]] = []  # heap of chats whose next row may be sent right now
+        self._delayed: List[Tuple[float, int]] = []  # heap of chats waiting for a token refill
+        self._in_flight: Set[int] = set()  # chats with a row being sent, keeps per chat order across workers
+        self._sequence = itertools.count()
+        self._pending = 0  # queued and in flight rows
+
+        self._workers_count = workers
+        self._workers: List[threading.Thread] = []
+        self._max_queue_size = max_queue_size
+        self._backpressure = backpressure
+        self._block_timeout = block_timeout
+        self._stopping = False
+        self._coalesce_window = coalesce_window
+        self._outbox = outbox
+        self._outbox_keys: Set[str] = set()  # dedupe keys of the outbox rows held in memory
+        self.undeliverable = undeliverable if undeliverable is not None else UndeliverableChats()
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._latest: Dict[tuple, RowFunctionArgs] = {}  # latest_key -> queued row
+        self._edit_delay = edit_delay
+        self._edit_max_delay = edit_max_delay
+        self._leader = leader
 
         self.bot = bot
         self._scheduler = scheduler
-        self._updates = {}
         self._lock = threading.RLock()
-        self._scheduler.add_job(self.run, "interval", seconds=2)
-
-    def _call(self, group=False):
-        i = None
-        if not group and not self._mq.empty():
-            i = self._mq.get()
-        elif group and not self._mq_group.empty():
-            i = self._mq_group.get()
-            self._mg_deque.append(time.time())
-
-        self._m_deque.append(time.time())
-        if i:
+        self._condition = threading.Condition(self._lock)
+        self._init_metrics(metrics or registry)
+        if self._outbox:
+            self._scheduler.add_job(self._outbox_tick, "interval", seconds=outbox_interval)
+
+    def _init_metrics(self, metrics: MetricsRegistry):
+        self._enqueued = metrics.counter(
+            "telegram_messages_enqueued", "Rows put into the sender queue", ["method", "chat_type"]
+        )
+        self._sent = metrics.counter("telegram_messages_sent", "Successful Bot API calls", ["method", "chat_type"])
+        self._errors = metrics.counter("telegram_send_errors", "Failed Bot API calls", ["method", "error"])
+        self._retries = metrics.counter("telegram_send_retries", "Failed calls scheduled again", ["error"])
+        self._dropped = metrics.counter("telegram_messages_dropped", "Rows dropped on a full queue", ["method"])
+        self._merged = metrics.counter(
+            "telegram_messages_merged", "Rows merged into another row by coalescing or latest-wins", ["method"]
+        )
+        self._latency = metrics.histogram(
+            "telegram_send_latency_seconds", "Time from enqueue to a completed send", ["method", "chat_type"]
+        )
+        self._call_duration = metrics.histogram("telegram_api_call_seconds", "Bot API call duration", ["method"])
+        metrics.gauge("telegram_queue_depth", "Queued rows by priority", ["priority"], collect=self._queue_depth)
+        metrics.gauge("telegram_messages_in_flight", "Rows being sent", collect=lambda: {(): len(self._in_flight)})
+        metrics.gauge(
+            "telegram_undeliverable_chats", "Chats skipped by the sender", collect=lambda: {(): len(self.undeliverable)}
+        )
+
+    def _queue_depth(self) -> Dict[Tuple[str, ...], float]:
+        depth: Dict[Tuple[str, ...], float] = {}
+        with self._lock:
+            for queue in self._queues.values():
+                for priority, _, row in queue:
+                    depth[(str(priority),)] = depth.get((str(priority),), 0) + row.size
+        return depth
+
+    def start(self):
+        """Starts sender workers"""
+        self._stopping = False
+        self.undeliverable.load()
+        if self._outbox:
+            self._outbox.replay()
+
+        for index in range(self._workers_count):
+            worker = threading.Thread(target=self._worker, name=f"message_sender_{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Waits up to timeout seconds until queued rows are sent, then stops sender workers"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+
+        if self._outbox:
+            self._outbox.flush()
+
+        if self._pending:
+            logger.warning(f"Message manager stopped with {self._pending} unsent messages")
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                row = self._next_row()
+                while row is None:
+                    if self._stopping and not self._pending:
+                        return
+                    self._condition.wait(self._next_timeout())
+                    row = self._next_row()
+
+            error = retry_delay = None
+            started_at = time.monotonic()
             try:
-                res = i.foo(*i.args, **i.kwargs)
-            except TelegramError as e:
-                logger.error(e.message)
-                if i.callback:
-                    i.callback(CallbackResults(None, e, i.callback_args))
-            else:
-                if i.callback:
-                    i.callback(CallbackResults(res, None, i.callback_args))
+                error = self._call(row)
+                if error is not None:
+                    retry_delay = self._retry_delay(row, error)
+                    if retry_delay is None and row.callback:
+                        row.callback(CallbackResults(None, error, row.callback_args))
+            except Exception as e:
+                error = e
+                logger.exception("Message sender failed")
+            finally:
+                with self._condition:
+                    self._done(row, error, retry_delay)
+                self._observe(row, error, retry_delay, started_at)
+
+    def _observe(
+        self, row: RowFunctionArgs, error: Optional[Exception], retry_delay: Optional[float], started_at: float
+    ):
+        now = time.monotonic()
+        method = row.foo.__name__
+        self._call_duration.observe(now - started_at, method=method)
+        if error is None:
+            chat_type = _chat_type(row.chat_id)
+            self._sent.inc(method=method, chat_type=chat_type)
+            self._latency.observe(now - row.created_at, method=method, chat_type=chat_type)
+            return
+
+        self._errors.inc(method=method, error=type(error).__name__)
+        if retry_delay is not None:
+            self._retries.inc(error=type(error).__name__)
 
-    def _empty(self):
-        return self._mq.empty() and self._mq_group.empty()
+    def _call(self, i: RowFunctionArgs) -> Optional[TelegramError]:
+        """Sends the row, returns the error if it failed"""
+        if i.chat_id in self.undeliverable:
+            return Unauthorized("Chat is undeliverable")
 
-    def _plan_next(self):
-        now = time.time()
-        if self._empty():
+        try:
+            res = i.foo(*i.args, **i.kwargs)
+        except BadRequest as e:
+            if "message is not modified" not in e.message.lower():
+                logger.error(f"{i.chat_id}: {e.message}")
+                return e
+            res = None  # an edit to the same content, nothing to report
+        except TelegramError as e:
+            logger.error(f"{i.chat_id}: {e.message}")
+            return e
+
+        if i.callback:
+            i.callback(CallbackResults(res, None, i.callback_args))
+
+    def _retry_delay(self, row: RowFunctionArgs, error: TelegramError) -> Optional[float]:
+        """Seconds to wait before the row is sent again, None if it must not be retried"""
+        if isinstance(error, RetryAfter):
+            self._rate_limiter.backoff(row.chat_id, error.retry_after)
+            return error.retry_after
+
+        chat_not_found = isinstance(error, BadRequest) and "chat not found" in error.message.lower()
+        if isinstance(error, Unauthorized) or chat_not_found:
+            if row.chat_id not in self.undeliverable:
+                self.undeliverable.add(row.chat_id, error.message)
+            return None
+
+        # BadRequest is a NetworkError subclass, but resending the same request will not help
+        if isinstance(error, BadRequest) or not isinstance(error, NetworkError) or row.attempts >= self._max_retries:
+            return None
+
+        row.attempts += 1
+        delay = min(self._retry_max_delay, self._retry_base_delay * 2 ** (row.attempts - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _push_ready(self, chat_id: int):
+        priority, sequence, _ = self._queues[chat_id][0]
+        heapq.heappush(self._ready, (priority, sequence, chat_id))
+
+    def _enqueue(self, row: RowFunctionArgs) -> bool:
+        with self._condition:
+            if self._pending >= self._max_queue_size and self._backpressure == BackpressurePolicy.BLOCK:
+                self._condition.wait_for(lambda: self._pending < self._max_queue_size, self._block_timeout)
+
+            dropped = self._pending >= self._max_queue_size
+            if not dropped:
+                queue = self._queues.get(row.chat_id)
+                if queue is None:
+                    queue = self._queues[row.chat_id] = []
+
+                row.sequence = next(self._sequence)
+                heapq.heappush(queue, (row.priority, row.sequence, row))
+                if len(queue) == 1 and row.chat_id not in self._in_flight:
+                    self._push_ready(row.chat_id)
+
+                self._pending += 1
+                self._condition.notify_all()
+                self._enqueued.inc(method=row.foo.__name__, chat_type=_chat_type(row.chat_id))
+
+        if dropped:
+            self._dropped.inc(method=row.foo.__name__)
+            logger.warning(f"Message queue is full, message to {row.chat_id} dropped")
+            if row.callback:
+                row.callback(CallbackResults(None, Full(), row.callback_args))
+
+        return not dropped
+
+    def _enqueue_durable(self, row: RowFunctionArgs, key: str):
+        """Journals the row to the outbox, a row with a dedupe key already held in memory is skipped"""
+        with self._lock:
+            queued = key in self._outbox_keys
+            if not queued:
+                self._outbox_keys.add(key)
+
+        if queued:
+            logger.info(f"Message {key} is already queued, skipped")
+            if row.callback:
+                row.callback(CallbackResults(None, AlreadyQueued(key), row.callback_args))
             return
 
-        while len(self._mg_deque) and now - self._mg_deque[0] > 60:
-            self._mg_deque.pop()
+        row.outbox_keys.append(key)
+        self._outbox.add(key, row.chat_id, row.kwargs, row.priority)
+        if not self._enqueue(row):
+            with self._lock:
+                self._outbox_keys.discard(key)
+            self._outbox.complete(key, "Message queue is full")
+
+    def _enqueue_latest(self, row: RowFunctionArgs, key: tuple):
+        """Queues the row, or puts it in place of the queued row with the same key which was not sent yet"""
+        now = time.monotonic()
+        with self._lock:
+            queued = self._latest.get(key)
+            if queued is None:
+                row.latest_key = key
+                row.hold_until = now + self._edit_delay
+                self._latest[key] = row
+                if not self._enqueue(row):
+                    self._latest.pop(key, None)
+                return
+
+            if queued.foo == self.bot.edit_message_text and row.foo == self.bot.edit_message_reply_markup:
+                queued.kwargs = {**queued.kwargs, "reply_markup": row.kwargs.get("reply_markup")}
+                if row.callback:
+                    queued.callback, queued.callback_args = row.callback, row.callback_args
+            else:
+                queued.foo, queued.args, queued.kwargs = row.foo, row.args, row.kwargs
+                queued.callback, queued.callback_args = row.callback, row.callback_args
 
-        while len(self._m_deque) and now - self._m_deque[0] > 1:
-            self._m_deque.pop()
+            queued.replacements += 1
+            self._merged.inc(method=row.foo.__name__)
+            hold = self._edit_delay * 2**queued.replacements
+            queued.hold_until = min(queued.created_at + self._edit_max_delay, now + hold)
 
-        while not self._mq.empty() and len(self._m_deque) < self._burst_limit:
-            self._m_blocked = False
-            self._call(False)
+    @property
+    def _is_sender(self) -> bool:
+        """Whether queued messages are sent by this process or relayed to the leader"""
+        return self._leader is None or self._leader.is_leader
 
-        while (
-            not self._mq_group.empty()
-            and len(self._m_deque) < self._burst_limit
-            and len(self._mg_deque) < self._group_burst_limit
-        ):
-            self._m_blocked = False
-            self._mg_blocked = False
-            self._call(True)
+    def _outbox_tick(self):
+        """Writes the journal and takes the due rows nobody holds, e.g. left unsent by a previous run"""
+        self._outbox.flush()
 
-        if self._m_blocked:
+        free = self._max_queue_size - self._pending
+        if self._stopping or free <= 0 or not self._is_sender:
             return
 
-        if not self._mq.empty():
-            self._m_blocked = True
-            d = 1.01 - now + self._m_deque[0]
-            self._scheduler.add_job(
-                self._plan_next,
-                "date",
-                run_date=datetime.datetime.now() + datetime.timedelta(seconds=d),
+        for claimed in self._outbox.claim(free):
+            with self._lock:
+                if claimed.key in self._outbox_keys:
+                    continue
+                self._outbox_keys.add(claimed.key)
+
+            row = RowFunctionArgs(
+                self.bot.send_message,
+                claimed.priority,
+                args=(),
+                kwargs=claimed.kwargs,
+                chat_id=claimed.chat_id,
+                coalesce=self._coalesce_window > 0 and not claimed.kwargs.get("reply_markup"),
             )
-
-        if self._mg_blocked:
+            row.outbox_keys.append(claimed.key)
+            if not self._enqueue(row):
+                with self._lock:
+                    self._outbox_keys.discard(claimed.key)
+                self._outbox.complete(claimed.key, "Message queue is full")
+
+    def _next_row(self) -> Optional[RowFunctionArgs]:
+        """Takes the next row which may be sent right now, must be called under the lock"""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, chat_id = heapq.heappop(self._delayed)
+            self._push_ready(chat_id)
+
+        while self._ready:
+            _, _, chat_id = heapq.heappop(self._ready)
+            queue = self._queues[chat_id]
+
+            head = queue[0][2]
+            if head.coalesce and head.created_at + self._coalesce_window > now:
+                heapq.heappush(self._delayed, (head.created_at + self._coalesce_window, chat_id))
+                continue
+
+            if head.hold_until > now:
+                heapq.heappush(self._delayed, (head.hold_until, chat_id))
+                continue
+
+            delay = self._rate_limiter.acquire(chat_id)
+            if delay > 0:
+                heapq.heappush(self._delayed, (now + delay, chat_id))
+                continue
+
+            _, _, row = heapq.heappop(queue)
+            if row.latest_key is not None:
+                # the row is not replaceable any more, also when it is put back for a retry
+                if self._latest.get(row.latest_key) is row:
+                    del self._latest[row.latest_key]
+                row.latest_key = None
+            if row.coalesce:
+                row = self._coalesce(row, queue)
+
+            self._in_flight.add(chat_id)
+            return row
+
+        return None
+
+    def _coalesce(self, row: RowFunctionArgs, queue: List[Tuple[int, int, RowFunctionArgs]]) -> RowFunctionArgs:
+        """Merges the following compatible rows of the chat queue into one message"""
+        rows = [row]
+        length = utf16_length(row.kwargs["text"])
+        while queue:
+            following = queue[0][2]
+            if not row.is_compatible(following):
+                break
+
+            length += len(COALESCE_SEPARATOR) + utf16_length(following.kwargs["text"])
+            if length > MAX_MESSAGE_LENGTH:
+                break
+
+            rows.append(heapq.heappop(queue)[2])
+
+        if len(rows) == 1:
+            return row
+
+        kwargs = {**row.kwargs, "text": COALESCE_SEPARATOR.join(r.kwargs["text"] for r in rows)}
+        merged = RowFunctionArgs(row.foo, row.priority, self._coalesced_callback, rows, row.args, kwargs, row.chat_id)
+        merged.size = len(rows)
+        self._merged.inc(len(rows) - 1, method=row.foo.__name__)
+        merged.created_at = row.created_at
+        merged.sequence = row.sequence
+        merged.outbox_keys = [key for r in rows for key in r.outbox_keys]
+        return merged
+
+    @staticmethod
+    def _coalesced_callback(callback_results: CallbackResults):
+        for row in callback_results.args:
+            if row.callback:
+                row.callback(CallbackResults(callback_results.value, callback_results.error, row.callback_args))
+
+    def _next_timeout(self) -> Optional[float]:
+        """Seconds until the nearest token refill, None if nothing is waiting for one"""
+        if not self._delayed:
+            return None
+        return max(0.0, self._delayed[0][0] - time.monotonic())
+
+    def _done(self, row: RowFunctionArgs, error: Optional[Exception] = None, retry_delay: Optional[float] = None):
+        self._in_flight.discard(row.chat_id)
+        if retry_delay is not None:
+            heapq.heappush(self._queues[row.chat_id], (row.priority, row.sequence, row))
+            heapq.heappush(self._delayed, (time.monotonic() + retry_delay, row.chat_id))
+            self._condition.notify_all()
             return
 
-        if not self._mq_group.empty():
-            self._mg_blocked = True
-            d = 60.01 - now + self._m_deque[0]
-            self._scheduler.add_job(
-                self._plan_next,
-                "date",
-                run_date=datetime.datetime.now() + datetime.timedelta(seconds=d),
-            )
+        self._pending -= row.size
+
+        for key in row.outbox_keys:
+            self._outbox_keys.discard(key)
+            self._outbox.complete(key, None if error is None else str(error))
+
+        if self._queues[row.chat_id]:
+            self._push_ready(row.chat_id)
+        else:
+            del self._queues[row.chat_id]
+
+        self._condition.notify_all()
 
     def reply_message(
         self,
@@ -164,66 +536,117 @@ class MessageManager:
         callback_args=None,
         priority: int = 1,
         *args,
+        dedupe_key: Optional[str] = None,
         **kwargs,
     ):
+        """
+        With an outbox the queued message is journaled under dedupe_key (random if not given),
+        a message whose key is already queued is skipped and the callback gets AlreadyQueued,
+        a key whose message was sent already is journaled and sent again.
+        A text longer than one message is sent as several ones, see split_text
+        """
         kwargs.setdefault("parse_mode", ParseMode.HTML)
         kwargs.setdefault("disable_web_page_preview", True)
 
+        relay = bool(self._outbox) and is_queued and not args and not callback and not self._is_sender
+
+        text = kwargs.get("text")
+        if not args and isinstance(text, str) and utf16_length(text) > MAX_MESSAGE_LENGTH:
+            return self._send_chunks(is_queued, callback, callback_args, priority, dedupe_key, relay, **kwargs)
+        return self._send(is_queued, callback, callback_args, priority, dedupe_key, relay, args, kwargs)
+
+    def _send(
+        self,
+        is_queued: bool,
+        callback: callable,
+        callback_args,
+        priority: int,
+        dedupe_key: Optional[str],
+        relay: bool,
+        args: tuple,
+        kwargs: dict,
+    ):
+        chat_id = kwargs.get("chat_id")
+        if relay:
+            self._outbox.add(dedupe_key or uuid.uuid4().hex, chat_id, kwargs, priority, claimed=False)
+            return
+
         if not is_queued:
-            self._m_deque.append(time.time())
-            if kwargs.get("chat_id") and kwargs.get("chat_id") < 0:
-                self._mg_deque.append(time.time())
+            self._rate_limiter.consume(chat_id)
             return self.bot.send_message(*args, **kwargs)
 
-        if kwargs.get("chat_id") and kwargs.get("chat_id") < 0:
-            self._mq_group.put(
-                RowFunctionArgs(
-                    self.bot.send_message,
-                    priority,
-                    callback,
-                    callback_args,
-                    args,
-                    kwargs,
-                    False,
-                )
-            )
+        row = RowFunctionArgs(
+            self.bot.send_message,
+            priority,
+            callback,
+            callback_args,
+            args,
+            kwargs,
+            chat_id,
+            coalesce=self._coalesce_window > 0 and not args and not kwargs.get("reply_markup"),
+        )
+        if self._outbox and not args:
+            self._enqueue_durable(row, dedupe_key or uuid.uuid4().hex)
         else:
-            self._mq.put(
-                RowFunctionArgs(
-                    self.bot.send_message,
+            self._enqueue(row)
+
+    def _send_chunks(
+        self,
+        is_queued: bool,
+        callback: callable,
+        callback_args,
+        priority: int,
+        dedupe_key: Optional[str],
+        relay: bool,
+        **kwargs,
+    ):
+        """
+        Sends the text as consecutive messages, queued ones are enqueued at once so nothing gets in between.
+        reply_to_message_id goes with the first message, reply_markup and callback go with the last one
+        """
+        chunks = split_text(kwargs["text"], html=kwargs["parse_mode"] == ParseMode.HTML)
+        last = len(chunks) - 1
+
+        result = None
+        with self._lock if is_queued else contextlib.nullcontext():
+            for index, chunk in enumerate(chunks):
+                chunk_kwargs = {**kwargs, "text": chunk}
+                if index != 0:
+                    chunk_kwargs.pop("reply_to_message_id", None)
+                if index != last:
+                    chunk_kwargs.pop("reply_markup", None)
+
+                result = self._send(
+                    is_queued,
+                    callback if index == last else None,
+                    callback_args if index == last else None,
                     priority,
-                    callback,
-                    callback_args,
-                    args,
-                    kwargs,
-                    True,
+                    dedupe_key and f"{dedupe_key}:{index}",
+                    relay,
+                    (),
+                    chunk_kwargs,
                 )
-            )
+        return result
 
-        self._plan_next()
+    def _edit(self, foo: callable, key: tuple, callback: callable, callback_args, priority: int, kwargs: dict):
+        row = RowFunctionArgs(foo, priority, callback, callback_args, (), kwargs, kwargs["chat_id"])
+        self._enqueue_latest(row, key)
 
-    def send_message_splitted(self, text: str, chat_id: int, n: int, reply_to_message_id: Optional[int] = None):
-        split = text.split("\n")
-        for i in range(0, len(split), n):
-            text = ("...\n" if i != 0 else "") + "\n".join(split[i : min(i + n, len(split))])
-            time.sleep(1.0 / 30)
-            kwargs = {"reply_to_message_id": reply_to_message_id} if reply_to_message_id else {}
-            self.send_message(chat_id=chat_id, text=text, disable_web_page_preview=True, **kwargs)
-
-    def edit_message_text(self, *args, **kwargs):
-        with self._lock:
-            self._updates[(kwargs["chat_id"], kwargs["message_id"])] = (args, kwargs)
+    def edit_message_text(self, callback: callable = None, callback_args=None, priority: int = 1, **kwargs):
+        """Queued Bot.edit_message_text, chat_id and message_id are required"""
+        kwargs.setdefault("parse_mode", ParseMode.HTML)
+        kwargs.setdefault("disable_web_page_preview", True)
 
-    def run(self):
-        with self._lock:
-            ups = list(self._updates.values())
-            self._updates.clear()
+        key = ("edit", kwargs["chat_id"], kwargs["message_id"])
+        self._edit(self.bot.edit_message_text, key, callback, callback_args, priority, kwargs)
 
-        for args, kwargs in ups:
-            self._edit_message_text(*args, **kwargs)
+    def edit_message_reply_markup(self, callback: callable = None, callback_args=None, priority: int = 1, **kwargs):
+        """Queued Bot.edit_message_reply_markup, chat_id and message_id are required.
+        A queued text edit of the same message takes the markup over"""
+        key = ("edit", kwargs["chat_id"], kwargs["message_id"])
+        self._edit(self.bot.edit_message_reply_markup, key, callback, callback_args, priority, kwargs)
 
-    def _edit_message_text(self, *args, **kwargs):
-        try:
-            return self.bot.edit_message_text(*args, **kwargs)
-        except (Exception,):
-            pass
+    def pin_chat_message(self, callback: callable = None, callback_args=None, priority: int = 1, **kwargs):
+        """Queued Bot.pin_chat_message, only the latest of the pins queued to a chat is made"""
+        key = ("pin", kwargs["chat_id"])
+        self._edit(self.bot.pin_chat_message, key, callback, callback_args, priority, kwargs)
@@ -0,0 +1,246 @@
+import bisect
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(name suffix, formatted labels, value)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        return [("_total", _format_labels(self.labels, key), value) for key, value in sorted(self.values().items())]
+
+
+class Gauge(Metric):
+    """Either set() explicitly or computed by `collect` on every read"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def values(self) -> Dict[LabelValues, float]:
+        if self._collect is not None:
+            try:
+                return self._collect()
+            except (Exception,):
+                logger.exception(f"Can not collect {self.name}")
+                return {}
+
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        return [("", _format_labels(self.labels, key), value) for key, value in sorted(self.values().items())]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}  # per bucket, the last one is +Inf
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def _snapshot(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        with self._lock:
+            return {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+    def count(self, **labels) -> int:
+        counts, _ = self._snapshot().get(self._key(labels), ([], 0.0))
+        return sum(counts)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimated like Prometheus histogram_quantile: linear interpolation inside the bucket"""
+        counts, _ = self._snapshot().get(self._key(labels), ([], 0.0))
+        return self._quantile(q, counts)
+
+    def _quantile(self, q: float, counts: List[int]) -> Optional[float]:
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # +Inf bucket, the highest finite bound is the best guess
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict[LabelValues, Tuple[int, List[Optional[float]]]]:
+        """label values -> (count, estimated quantiles)"""
+        return {
+            key: (sum(counts), [self._quantile(q, counts) for q in qs])
+            for key, (counts, _) in sorted(self._snapshot().items())
+        }
+
+    def samples(self):
+        samples = []
+        for key, (counts, total) in sorted(self._snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                samples.append(("_bucket", _format_labels(self.labels, key, le), cumulative))
+            samples.append(("_sum", _format_labels(self.labels, key), total))
+            samples.append(("_count", _format_labels(self.labels, key), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            registered = self._metrics.get(metric.name)
+            if registered is not None:
+                return registered  # several instances of one component share the metric
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), collect=None) -> Gauge:
+        gauge = self._register(Gauge(name, documentation, labels, collect))
+        if collect is not None:
+            gauge._collect = collect  # the latest instance of the component reports
+        return gauge
+
+    def histogram(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Short human readable form, histograms are reduced to count and p50/p90/p99"""
+        lines = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                for key, (count, quantiles) in metric.quantiles().items():
+                    formatted = "/".join("-" if value is None else f"{value:.3f}" for value in quantiles)
+                    lines.append(f"{metric.name}{_format_labels(metric.labels, key)} n={count} p50/90/99={formatted}")
+            else:
+                for key, value in sorted(metric.values().items()):
+                    lines.append(f"{metric.name}{_format_labels(metric.labels, key)} {value:g}")
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """Writes render() atomically, for node_exporter textfile collector or alike"""
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                file.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception(f"Can not write metrics to {path}")
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,103 @@
+import datetime
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Any
+
+from telegram import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRow:
+    """Unsent message loaded back from the outbox table"""
+
+    __slots__ = ("key", "chat_id", "kwargs", "priority")
+
+    def __init__(self, key: str, chat_id: int, kwargs: Dict[str, Any], priority: int):
+        self.key = key
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.priority = priority
+
+
+class Outbox:
+    """
+    Write-behind journal of queued messages.
+    add() and complete() only touch memory, flush() writes them to the storage in batches,
+    so a message sent before the next flush never reaches the database at all.
+    `storage` is the OutboxMessage model, it is passed in to keep src.core free of src.models imports.
+    """
+
+    def __init__(self, storage, owner: str, batch_size: int = 500, lease: float = 300):
+        self._storage = storage
+        self.owner = owner
+        self.batch_size = batch_size
+        self._lease = datetime.timedelta(seconds=lease)
+
+        self._inserts: Dict[str, dict] = {}
+        self._completed: Dict[str, Optional[str]] = {}  # dedupe_key -> error
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def dumps(kwargs: Dict[str, Any]) -> str:
+        payload = dict(kwargs)
+        reply_markup = payload.get("reply_markup")
+        if isinstance(reply_markup, TelegramObject):
+            payload["reply_markup"] = reply_markup.to_dict()
+        return json.dumps(payload, ensure_ascii=False)
+
+    def add(self, key: str, chat_id: int, kwargs: Dict[str, Any], priority: int = 1, claimed: bool = True):
+        """An unclaimed row is left for whichever process claims it, see MessageManager relaying"""
+        now = datetime.datetime.now()
+        row = {
+            "chat_id": chat_id,
+            "payload": self.dumps(kwargs),
+            "priority": priority,
+            "not_before": now,
+            "dedupe_key": key,
+            "owner": self.owner if claimed else None,
+            "claimed_at": now if claimed else None,
+            "created_date": now,
+        }
+        with self._lock:
+            self._inserts[key] = row
+
+    def complete(self, key: str, error: Optional[str] = None):
+        with self._lock:
+            if self._inserts.pop(key, None) is None:
+                self._completed[key] = error
+
+    def flush(self):
+        with self._lock:
+            inserts = list(self._inserts.values())
+            completed = self._completed
+            self._inserts = {}
+            self._completed = {}
+
+        try:
+            if inserts:
+                self._storage.add_many(inserts)
+
+            by_error: Dict[Optional[str], List[str]] = {}
+            for key, error in completed.items():
+                by_error.setdefault(error, []).append(key)
+            for error, keys in by_error.items():
+                self._storage.complete(keys, error)
+
+            self._storage.refresh(self.owner)
+        except (Exception,):
+            logger.exception("Outbox flush failed")
+            with self._lock:
+                for row in inserts:
+                    self._inserts.setdefault(row["dedupe_key"], row)
+                for key, error in completed.items():
+                    self._completed.setdefault(key, error)
+
+    def claim(self, limit: int) -> List[OutboxRow]:
+        rows = self._storage.claim(self.owner, min(limit, self.batch_size), self._lease)
+        return [OutboxRow(row.dedupe_key, row.chat_id, json.loads(row.payload), row.priority) for row in rows]
+
+    def replay(self):
+        """Makes the rows left unsent by a previous run of this owner claimable again"""
+        self._storage.release(self.owner)
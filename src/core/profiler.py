@@ -0,0 +1,185 @@
+import collections
+import functools
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .metrics import MetricsRegistry, registry
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class CallStats:
+    """Counters of one handler and its latest calls, the quantiles are computed over the latest calls only"""
+
+    __slots__ = ("calls", "rejected", "filter_seconds", "wall", "queries", "sql_seconds")
+
+    def __init__(self, samples: int):
+        self.calls = 0
+        self.rejected = 0
+        self.filter_seconds = 0.0
+        self.wall: Deque[float] = collections.deque(maxlen=samples)
+        self.queries: Deque[int] = collections.deque(maxlen=samples)
+        self.sql_seconds: Deque[float] = collections.deque(maxlen=samples)
+
+
+class ProfileRow:
+    __slots__ = ("name", "calls", "total", "p50", "p95", "p99", "queries", "sql_seconds", "rejected", "filter_seconds")
+
+    def __init__(self, name: str, stats: CallStats):
+        wall = sorted(stats.wall)
+        self.name = name
+        self.calls = stats.calls
+        self.total = sum(wall)
+        self.p50, self.p95, self.p99 = (_percentile(wall, q) for q in (0.5, 0.95, 0.99))
+        self.queries = sum(stats.queries) / len(stats.queries) if stats.queries else 0.0
+        self.sql_seconds = sum(stats.sql_seconds) / len(stats.sql_seconds) if stats.sql_seconds else 0.0
+        self.rejected = stats.rejected
+        self.filter_seconds = stats.filter_seconds
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def callable_name(func: Callable) -> str:
+    func = getattr(func, "func", func)  # functools.partial
+    return getattr(func, "__qualname__", repr(func))
+
+
+class Profiler:
+    """
+    Measures handlers and jobs: wall time, time of the filters which rejected an update,
+    SQL queries count and SQL time of every call. Calls are recorded to the metrics registry
+    and to per handler rolling windows of the latest `samples` calls for report().
+    A disabled profiler returns the wrapped functions as they are, so it costs nothing
+    """
+
+    def __init__(self, enabled: bool = True, samples: int = 1_000, metrics: Optional[MetricsRegistry] = None):
+        self.enabled = enabled
+        self.samples = samples
+        self._stats: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        metrics = metrics or registry
+        self._wall = metrics.histogram("handler_seconds", "Handler and job run time", ["handler"])
+        self._sql = metrics.histogram("handler_sql_seconds", "SQL time of a handler call", ["handler"])
+        self._queries = metrics.histogram(
+            "handler_sql_queries", "SQL queries of a handler call", ["handler"], buckets=QUERY_BUCKETS
+        )
+        self._filter = metrics.histogram("handler_filter_seconds", "Time of filters which rejected", ["handler"])
+
+    def _get_stats(self, name: str) -> CallStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(name, CallStats(self.samples))
+        return stats
+
+    def sql_counters(self) -> Tuple[int, float]:
+        """(queries, seconds) made by the current thread so far"""
+        return getattr(self._local, "queries", 0), getattr(self._local, "sql_seconds", 0.0)
+
+    def instrument_database(self, database):
+        """Counts the queries made through database.execute_sql, which all peewee queries go through"""
+        if not self.enabled:
+            return
+
+        execute_sql = database.execute_sql
+
+        @functools.wraps(execute_sql)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return execute_sql(*args, **kwargs)
+            finally:
+                local = self._local
+                local.queries = getattr(local, "queries", 0) + 1
+                local.sql_seconds = getattr(local, "sql_seconds", 0.0) + time.perf_counter() - started_at
+
+        database.execute_sql = wrapper
+
+    def instrument_scheduler(self, scheduler):
+        """Profiles every job added to the scheduler afterwards"""
+        if not self.enabled:
+            return
+
+        add_job = scheduler.add_job
+
+        @functools.wraps(add_job)
+        def wrapper(func, *args, **kwargs):
+            return add_job(self.wrap(f"job:{callable_name(func)}", func), *args, **kwargs)
+
+        scheduler.add_job = wrapper
+
+    def call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        queries, sql_seconds = self.sql_counters()
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - started_at
+            queries_after, sql_seconds_after = self.sql_counters()
+            self.record(name, wall, queries_after - queries, sql_seconds_after - sql_seconds)
+
+    def check(self, name: str, predicate: Callable[..., bool], *args) -> bool:
+        """Runs a filter, the time of a filter which rejected is recorded"""
+        started_at = time.perf_counter()
+        result = predicate(*args)
+        if not result:
+            self.record_rejected(name, time.perf_counter() - started_at)
+        return result
+
+    def record(self, name: str, wall: float, queries: int, sql_seconds: float):
+        stats = self._get_stats(name)
+        stats.calls += 1
+        stats.wall.append(wall)
+        stats.queries.append(queries)
+        stats.sql_seconds.append(sql_seconds)
+
+        self._wall.observe(wall, handler=name)
+        self._queries.observe(queries, handler=name)
+        self._sql.observe(sql_seconds, handler=name)
+
+    def record_rejected(self, name: str, seconds: float):
+        stats = self._get_stats(name)
+        stats.rejected += 1
+        stats.filter_seconds += seconds
+        self._filter.observe(seconds, handler=name)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(name, func, *args, **kwargs)
+
+        return wrapper
+
+    def wrap_check(self, name: str, predicate: Callable[..., bool]) -> Callable[..., bool]:
+        if not self.enabled:
+            return predicate
+
+        @functools.wraps(predicate)
+        def wrapper(*args):
+            return self.check(name, predicate, *args)
+
+        return wrapper
+
+    def report(self, top: int = 10, sort: str = "total") -> List[ProfileRow]:
+        """Handlers with the largest `sort` attribute of ProfileRow: total, p99, queries, sql_seconds..."""
+        with self._lock:
+            items = list(self._stats.items())
+        rows = [ProfileRow(name, stats) for name, stats in items]
+        return sorted(rows, key=lambda row: getattr(row, sort), reverse=True)[:top]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+profiler = Profiler()
@@ -0,0 +1,148 @@
+import collections
+import contextlib
+import enum
+import functools
+import logging
+import os
+import re
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .profiler import callable_name
+
+logger = logging.getLogger(__name__)
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_PLACEHOLDERS_RE = re.compile(r"\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+class DetectorMode(enum.StrEnum):
+    OFF = "off"
+    LOG = "log"
+    RAISE = "raise"
+
+
+class NPlusOneError(AssertionError):
+    """The same query was made too many times while handling one update or job"""
+
+
+def statement_shape(sql: str) -> str:
+    """The query with the varying parts, IN lists and inlined numbers, collapsed"""
+    return _NUMBER_RE.sub("N", _PLACEHOLDERS_RE.sub("(?...)", sql))
+
+
+def _caller_location() -> str:
+    """The innermost frame of the bot's own code outside src.core, e.g. the loop which touches a relation"""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_SRC_DIR) and not frame.filename.startswith(_CORE_DIR):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(_SRC_DIR))}:{frame.lineno} in {frame.name}"
+    return "unknown location"
+
+
+class _Scope:
+    __slots__ = ("name", "counts", "locations")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts: Dict[str, int] = collections.Counter()
+        self.locations: Dict[str, str] = {}  # shape -> where it crossed the threshold
+
+
+class QueryDetector:
+    """
+    Finds N+1 queries: records the statements made while handling one update or job
+    and reports every statement shape repeated at least `threshold` times, with the handler name
+    and the code location. LOG mode writes a warning, RAISE mode raises NPlusOneError for tests.
+    Statements are recorded by instrument_database() inside scope()
+    """
+
+    def __init__(self, mode: DetectorMode = DetectorMode.LOG, threshold: int = 5):
+        self.mode = mode
+        self.threshold = threshold
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != DetectorMode.OFF
+
+    def instrument_database(self, database):
+        if not self.enabled:
+            return
+
+        execute_sql = database.execute_sql
+
+        @functools.wraps(execute_sql)
+        def wrapper(sql, *args, **kwargs):
+            self.record(sql)
+            return execute_sql(sql, *args, **kwargs)
+
+        database.execute_sql = wrapper
+
+    def instrument_scheduler(self, scheduler):
+        """Checks every job added to the scheduler afterwards"""
+        if not self.enabled:
+            return
+
+        add_job = scheduler.add_job
+
+        @functools.wraps(add_job)
+        def wrapper(func, *args, **kwargs):
+            return add_job(self.wrap(f"job:{callable_name(func)}", func), *args, **kwargs)
+
+        scheduler.add_job = wrapper
+
+    def record(self, sql: str):
+        scope: Optional[_Scope] = getattr(self._local, "scope", None)
+        if scope is None:
+            return
+
+        shape = statement_shape(sql)
+        scope.counts[shape] += 1
+        if scope.counts[shape] == self.threshold:
+            scope.locations[shape] = _caller_location()
+
+    @contextlib.contextmanager
+    def scope(self, name: str):
+        """Statements made inside are checked on exit, nested scopes are checked as part of the outer one"""
+        if not self.enabled or getattr(self._local, "scope", None) is not None:
+            yield
+            return
+
+        scope = self._local.scope = _Scope(name)
+        try:
+            yield
+        finally:
+            self._local.scope = None
+
+        self.check(scope)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.scope(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def check(self, scope: _Scope):
+        repeated: List[Tuple[str, int, str]] = [
+            (shape, count, scope.locations[shape]) for shape, count in scope.counts.items() if count >= self.threshold
+        ]
+        if not repeated:
+            return
+
+        report = "\n".join(f"  {count}x at {location}: {shape}" for shape, count, location in repeated)
+        message = f"N+1 queries in {scope.name}:\n{report}"
+        if self.mode == DetectorMode.RAISE:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+query_detector = QueryDetector(DetectorMode.OFF)
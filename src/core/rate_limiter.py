@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import registry
+
+# limit label is one of: global, group, private
+throttled = registry.counter("telegram_throttle_waits", "Sends postponed by a rate limit", ["limit"])
+throttle_delay = registry.histogram("telegram_throttle_delay_seconds", "Postponed send waits", ["limit"])
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens at most, refilled with `rate` tokens per second"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Seconds left until a token is available, 0 if it is available right now"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        """Takes a token, the bucket may go into debt if it is empty"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def backoff(self, now: float, delay: float) -> None:
+        """Empties the bucket so that the next token is available in delay seconds"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - delay * self.rate)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """Base class for MessageManager rate limiters"""
+
+    def acquire(self, chat_id: int) -> float:
+        """Takes a send slot for chat_id, returns 0 on success or seconds to wait before the next try"""
+        raise NotImplementedError
+
+    def consume(self, chat_id: int) -> None:
+        """Records a send which was made bypassing the limiter"""
+        raise NotImplementedError
+
+    def backoff(self, chat_id: int, delay: float) -> None:
+        """Holds sends to chat_id for delay seconds, e.g. after a flood wait reported by Telegram"""
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    Token buckets keyed by chat_id plus one global bucket.
+    Telegram allows ~1 msg/s per private chat, 20 msg/min per group and ~30 msg/s overall,
+    see https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+    """
+
+    def __init__(
+        self,
+        all_burst_limit: int = 30,
+        group_burst_limit: int = 20,
+        private_burst_limit: int = 1,
+        max_buckets: int = 10_000,
+    ):
+        self._all_burst_limit = all_burst_limit  # messages per second
+        self._group_burst_limit = group_burst_limit  # messages per minute
+        self._private_burst_limit = private_burst_limit  # messages per second
+        self._max_buckets = max_buckets
+
+        self._global = TokenBucket(all_burst_limit, all_burst_limit)
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _new_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id < 0:
+            return TokenBucket(self._group_burst_limit / 60, self._group_burst_limit)
+        return TokenBucket(self._private_burst_limit, self._private_burst_limit)
+
+    def _get_bucket(self, chat_id: Optional[int], now: float) -> Optional[TokenBucket]:
+        """None for a send whose chat is not known, e.g. chat_id passed positionally: only the global limit applies"""
+        if chat_id is None:
+            return None
+
+        bucket = self._buckets.get(chat_id)
+        if bucket is not None:
+            return bucket
+
+        if len(self._buckets) >= self._max_buckets:
+            self._prune(now)
+
+        bucket = self._buckets[chat_id] = self._new_bucket(chat_id)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Full buckets carry no state, so they can be dropped and recreated on demand"""
+        for chat_id in [chat_id for chat_id, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[chat_id]
+
+    def acquire(self, chat_id: Optional[int]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._get_bucket(chat_id, now)
+            global_delay, chat_delay = self._global.delay(now), bucket.delay(now) if bucket else 0.0
+            if global_delay > 0 or chat_delay > 0:
+                limit = "global" if global_delay >= chat_delay else ("group" if chat_id < 0 else "private")
+                delay = max(global_delay, chat_delay)
+                throttled.inc(limit=limit)
+                throttle_delay.observe(delay, limit=limit)
+                return delay
+
+            self._global.consume(now)
+            if bucket:
+                bucket.consume(now)
+            return 0.0
+
+    def consume(self, chat_id: Optional[int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._global.consume(now)
+            if bucket := self._get_bucket(chat_id, now):
+                bucket.consume(now)
+
+    def backoff(self, chat_id: Optional[int], delay: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if bucket := self._get_bucket(chat_id, now):
+                bucket.backoff(now, delay)
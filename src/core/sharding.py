@@ -0,0 +1,82 @@
+import logging
+import os
+import queue
+import signal
+import threading
+from typing import List, Optional
+
+from telegram import Update
+from telegram.ext import DispatcherHandlerStop, Handler
+
+from .webhook import WebhookUpdater
+
+logger = logging.getLogger(__name__)
+
+
+def routing_key(update: Update) -> Optional[int]:
+    """Updates of one user are handled by one process and one thread, chat updates without a user go by chat"""
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+def shard_of(key: Optional[int], shards: int) -> int:
+    return 0 if key is None else key % shards
+
+
+class ShardRouter(Handler):
+    """
+    Dispatcher handler of the process which receives updates, hands the updates of other shards over
+    to their queues. Must be added to a group before the other handlers
+    """
+
+    def __init__(self, queues: List, shard_index: int = 0):
+        super().__init__(self._forward)
+        self._queues = queues
+        self._shard_index = shard_index
+
+    def check_update(self, update) -> bool:
+        if not isinstance(update, Update):
+            return False
+        return shard_of(routing_key(update), len(self._queues)) != self._shard_index
+
+    def handle_update(self, update: Update, dispatcher):
+        self._forward(update)
+        raise DispatcherHandlerStop()
+
+    def _forward(self, update: Update):
+        self._queues[shard_of(routing_key(update), len(self._queues))].put(update.to_dict())
+
+
+class ShardUpdater(WebhookUpdater):
+    """Updater of a shard process, takes updates from the queue filled by the ShardRouter"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._shard_lock = threading.Lock()  # a shard is only started by start_shard, not by the Updater methods
+
+    def start_shard(self, updates):
+        with self._shard_lock:
+            if self.running:
+                return
+
+            self.running = True
+            self.job_queue.start()
+            self._init_thread(self.dispatcher.start, "dispatcher")
+            self._init_thread(self._start_shard, "updater", updates)
+            return self.update_queue
+
+    def _start_shard(self, updates):
+        while self.running:
+            try:
+                data = updates.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if data is None:  # the receiving process stops
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+            self.update_queue.put(Update.de_json(data, self.bot))
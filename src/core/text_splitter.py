@@ -0,0 +1,143 @@
+import re
+from typing import List, Optional, Tuple
+
+MAX_MESSAGE_LENGTH = 4096
+
+_HTML_TOKEN_RE = re.compile(r"<[^>]*>|&#?\w+;|\n|[^<&\n]+|[<&]")
+_TEXT_TOKEN_RE = re.compile(r"\n|[^\n]+")
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][\w-]*)")
+
+
+def utf16_length(text: str) -> int:
+    """Telegram measures message length in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _parse_tag(token: str) -> Optional[Tuple[str, bool]]:
+    """(tag name, is closing) for a tag token, None for anything else"""
+    if not token.startswith("<") or not token.endswith(">"):
+        return None
+
+    match = _TAG_RE.match(token)
+    if match is None:
+        return None
+    return match.group(2).lower(), bool(match.group(1))
+
+
+class _Chunker:
+    """Packs tokens into chunks, every chunk closes the tags left open and the next one reopens them"""
+
+    def __init__(self, limit: int, html: bool):
+        self.limit = limit
+        self.html = html
+        self.chunks: List[str] = []
+
+        self._parts: List[str] = []
+        self._length = 0
+        self._has_text = False
+        self._stack: List[Tuple[str, str]] = []  # (tag name, opening tag) of the open tags
+        self._closing_length = 0
+
+    def _apply_tag(self, stack: List[Tuple[str, str]], token: str) -> int:
+        """Updates the open tags stack, returns the change of the closing tags length"""
+        tag = _parse_tag(token) if self.html else None
+        if tag is None:
+            return 0
+
+        name, is_closing = tag
+        if not is_closing:
+            stack.append((name, token))
+            return len(name) + 3
+
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index][0] == name:
+                removed = stack[index:]
+                del stack[index:]
+                return -sum(len(removed_name) + 3 for removed_name, _ in removed)
+        return 0
+
+    def _append(self, token: str, length: int):
+        self._parts.append(token)
+        self._length += length
+        self._closing_length += self._apply_tag(self._stack, token)
+        self._has_text = self._has_text or not token.isspace()
+
+    def cut(self):
+        if self._has_text:
+            closing = "".join(f"</{name}>" for name, _ in reversed(self._stack))
+            self.chunks.append("".join(self._parts).strip("\n") + closing)
+
+        reopening = "".join(opening for _, opening in self._stack)
+        self._parts = [reopening] if reopening else []
+        self._length = utf16_length(reopening)
+        self._has_text = False
+
+    def _fits(self, length: int, closing_length: int) -> bool:
+        return self._length + length + closing_length <= self.limit
+
+    def add_line(self, tokens: List[str]):
+        """Lines are kept whole whenever they fit into a chunk"""
+        lengths = [utf16_length(token) for token in tokens]
+        stack = list(self._stack)
+        closing_length = self._closing_length + sum(self._apply_tag(stack, token) for token in tokens)
+
+        if not self._fits(sum(lengths), closing_length):
+            self.cut()
+
+        if self._fits(sum(lengths), closing_length):
+            for token, length in zip(tokens, lengths):
+                self._append(token, length)
+            return
+
+        for token, length in zip(tokens, lengths):
+            self.add_token(token, length)
+
+    def add_token(self, token: str, length: int):
+        stack = list(self._stack)
+        closing_length = self._closing_length + self._apply_tag(stack, token)
+        if self._fits(length, closing_length):
+            return self._append(token, length)
+
+        self.cut()
+        if self._fits(length, closing_length) or (self.html and token.startswith(("<", "&"))):
+            return self._append(token, length)
+
+        # plain text longer than a whole chunk, cut it by spaces if possible
+        while token:
+            room = max(1, self.limit - self._length - self._closing_length)
+            piece = token[:room]
+            while utf16_length(piece) > room and len(piece) > 1:
+                piece = piece[:-1]
+            if len(piece) < len(token) and " " in piece[1:]:
+                piece = piece[: piece.rindex(" ") + 1]
+
+            self._append(piece, utf16_length(piece))
+            token = token[len(piece) :]
+            if token:
+                self.cut()
+
+    def finish(self) -> List[str]:
+        self.cut()
+        return self.chunks
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH, html: bool = True) -> List[str]:
+    """
+    Splits text into messages of at most limit UTF-16 code units, preferably on line breaks.
+    With html an entity or a tag is never cut, and the tags open at a cut are closed and reopened in the next chunk.
+    Length is counted on the markup, which is never less than the text Telegram counts
+    """
+    if utf16_length(text) <= limit:
+        return [text]
+
+    chunker = _Chunker(limit, html)
+    line: List[str] = []
+    for token in (_HTML_TOKEN_RE if html else _TEXT_TOKEN_RE).findall(text):
+        line.append(token)
+        if token == "\n":
+            chunker.add_line(line)
+            line = []
+
+    if line:
+        chunker.add_line(line)
+    return chunker.finish()
@@ -0,0 +1,64 @@
+import datetime
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UndeliverableChats:
+    """
+    Chats every send to which fails for good (bot blocked, chat not found), so MessageManager skips them.
+    Entries expire after `ttl` seconds. `storage` is the UndeliverableChat model,
+    it is passed in to keep src.core free of src.models imports
+    """
+
+    def __init__(self, storage=None, ttl: float = 3 * 24 * 60 * 60):
+        self._storage = storage
+        self._ttl = datetime.timedelta(seconds=ttl)
+        self._expires: Dict[int, datetime.datetime] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._storage is None:
+            return
+
+        expires = self._storage.active()
+        with self._lock:
+            self._expires.update(expires)
+
+    def add(self, chat_id: int, reason: Optional[str] = None):
+        expires_at = datetime.datetime.now() + self._ttl
+        with self._lock:
+            self._expires[chat_id] = expires_at
+
+        logger.info(f"Chat {chat_id} is undeliverable until {expires_at}: {reason}")
+        if self._storage is None:
+            return
+
+        try:
+            self._storage.mark(chat_id, reason, expires_at)
+        except (Exception,):
+            logger.exception("Can not save undeliverable chat")
+
+    def discard(self, chat_id: int):
+        with self._lock:
+            if self._expires.pop(chat_id, None) is None:
+                return
+
+        if self._storage is not None:
+            self._storage.unmark(chat_id)
+
+    def __contains__(self, chat_id: int) -> bool:
+        expires_at = self._expires.get(chat_id)
+        if expires_at is None:
+            return False
+        if expires_at > datetime.datetime.now():
+            return True
+
+        with self._lock:
+            self._expires.pop(chat_id, None)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._expires)
@@ -0,0 +1,107 @@
+import hmac
+import itertools
+import logging
+import ssl
+import time
+from typing import List, Optional
+
+from telegram.error import TelegramError, Unauthorized
+from telegram.ext import Updater
+from telegram.utils.webhookhandler import WebhookHandler, WebhookServer, _InvalidPost
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class SecretTokenWebhookHandler(WebhookHandler):
+    """Rejects posts without the secret token Telegram sends along with every update"""
+
+    def _validate_post(self):
+        content_type = self.headers.get("content-type", "")
+        if self.path != self.server.webhook_path or not content_type.startswith("application/json"):
+            raise _InvalidPost(403)
+
+        secret_token = self.server.secret_token
+        if secret_token and not hmac.compare_digest(self.headers.get(SECRET_TOKEN_HEADER, ""), secret_token):
+            raise _InvalidPost(403)
+
+
+class WebhookUpdater(Updater):
+    """
+    Updater whose webhook checks the secret token and is registered at Telegram also when TLS
+    is terminated by a reverse proxy, in which case `webhook_url` is the public url of the proxy.
+    Polling works the same as in Updater
+    """
+
+    def __init__(self, *args, secret_token: Optional[str] = None, max_connections: int = 40, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.secret_token = secret_token
+        self.max_connections = max_connections
+
+    def _start_webhook(
+        self,
+        listen: str,
+        port: int,
+        url_path: str,
+        cert: Optional[str],
+        key: Optional[str],
+        bootstrap_retries: int,
+        clean: bool,
+        webhook_url: Optional[str],
+        allowed_updates: Optional[List[str]],
+    ):
+        use_ssl = cert is not None and key is not None
+        if not url_path.startswith("/"):
+            url_path = f"/{url_path}"
+
+        self.httpd = WebhookServer((listen, port), SecretTokenWebhookHandler, self.update_queue, url_path, self.bot)
+        self.httpd.secret_token = self.secret_token
+
+        if use_ssl:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            try:
+                context.load_cert_chain(cert, key)
+            except (ssl.SSLError, OSError) as error:
+                raise TelegramError(f"Can not load SSL certificate: {error}")
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+
+            if not webhook_url:
+                webhook_url = self._gen_webhook_url(listen, port, url_path)
+
+        if webhook_url:
+            self._set_webhook(webhook_url, cert if use_ssl else None, clean, allowed_updates, bootstrap_retries)
+        else:
+            logger.warning("Webhook url is not set, expecting the webhook to be registered already")
+
+        logger.info(f"Listening for updates on {listen}:{port}{url_path}")
+        self.httpd.serve_forever(poll_interval=1)
+
+    def _set_webhook(
+        self,
+        url: str,
+        cert: Optional[str],
+        drop_pending_updates: bool,
+        allowed_updates: Optional[List[str]],
+        max_retries: int,
+        interval: float = 5,
+    ):
+        kwargs = {"drop_pending_updates": drop_pending_updates}
+        if self.secret_token:
+            kwargs["secret_token"] = self.secret_token
+
+        for attempt in itertools.count(1):
+            try:
+                if cert is None:
+                    self.bot.set_webhook(url, None, None, self.max_connections, allowed_updates, **kwargs)
+                else:
+                    with open(cert, "rb") as certificate:
+                        self.bot.set_webhook(url, certificate, None, self.max_connections, allowed_updates, **kwargs)
+                return
+            except Unauthorized:
+                raise
+            except TelegramError as error:
+                if 0 <= max_retries < attempt:
+                    raise
+                logger.warning(f"Can not set webhook, try {attempt}: {error}")
+                time.sleep(interval)
@@ -1,5 +1,6 @@
 from .chat import get_chat
 from .command import command_parser, command_handler
+from .context import UpdateContext
 from .log import log, log_command
 from .permissions import permissions
 from .raid import get_invoker_raid
@@ -1,14 +1,14 @@
 from functools import wraps
 
 from src.core import InnerUpdate as InnerUpdate
-from src.models import TelegramChat
+from src.decorators.context import UpdateContext
 
 
 def get_chat(func):
     @wraps(func)
     def wrapper(self, update: InnerUpdate, *args, **kwargs):
         if update.effective_chat_id and update.chat is None:
-            update.chat = TelegramChat.get_or_none(TelegramChat.chat_id == update.effective_chat_id)
+            update.chat = UpdateContext.of(update.telegram_update).chat
 
         return func(self, update, *args, **kwargs)
 
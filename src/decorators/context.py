@@ -0,0 +1,89 @@
+from typing import Optional
+
+import peewee
+import telegram
+
+from src.models import Player, TelegramChat, TelegramUser
+
+
+class UpdateContext:
+    """
+    Sender's user, player and chat of one telegram.Update. They are loaded with one joined query
+    on the first access and shared by all the InnerUpdates made of the update, so every handler group
+    and every decorator sees the same objects. A handler which creates or rebinds the player sets it here
+    """
+
+    ATTRIBUTE = "statbot_context"
+
+    def __init__(self, telegram_update: telegram.Update):
+        self.user_id = telegram_update.effective_user.id if telegram_update.effective_user else None
+        chat = telegram_update.effective_chat
+        self.chat_id = chat.id if chat and chat.type != "private" else None  # private chats are not stored
+
+        self._loaded = False
+        self._invoker: Optional[TelegramUser] = None
+        self._player: Optional[Player] = None
+        self._chat: Optional[TelegramChat] = None
+
+    @classmethod
+    def of(cls, telegram_update: telegram.Update) -> "UpdateContext":
+        context = getattr(telegram_update, cls.ATTRIBUTE, None)
+        if context is None:
+            context = cls(telegram_update)
+            setattr(telegram_update, cls.ATTRIBUTE, context)
+        return context
+
+    def _load(self):
+        self._loaded = True
+        if self.user_id is None:
+            if self.chat_id is not None:
+                self._chat = TelegramChat.get_by_chat_id(self.chat_id)
+            return
+
+        query = TelegramUser.select(TelegramUser, Player).join_from(
+            TelegramUser, Player, peewee.JOIN.LEFT_OUTER, attr="context_player"
+        )
+        if self.chat_id is not None:
+            query = query.select_extend(TelegramChat).join_from(
+                TelegramUser,
+                TelegramChat,
+                peewee.JOIN.LEFT_OUTER,
+                on=(TelegramChat.chat_id == self.chat_id),
+                attr="context_chat",
+            )
+
+        invoker = query.where(TelegramUser.user_id == self.user_id).first()
+        if invoker is None:
+            if self.chat_id is not None:
+                self._chat = TelegramChat.get_by_chat_id(self.chat_id)
+            return
+
+        self._invoker = invoker
+        self._player = getattr(invoker, "context_player", None)
+        self._chat = getattr(invoker, "context_chat", None)
+        if self._player is not None:
+            self._player.telegram_user = invoker
+
+    @property
+    def invoker(self) -> Optional[TelegramUser]:
+        if not self._loaded:
+            self._load()
+        return self._invoker
+
+    @property
+    def player(self) -> Optional[Player]:
+        if not self._loaded:
+            self._load()
+        return self._player
+
+    @player.setter
+    def player(self, player: Optional[Player]):
+        if not self._loaded:
+            self._load()
+        self._player = player
+
+    @property
+    def chat(self) -> Optional[TelegramChat]:
+        if not self._loaded:
+            self._load()
+        return self._chat
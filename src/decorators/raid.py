@@ -8,7 +8,8 @@ def get_invoker_raid(func):
     @wraps(func)
     def decorator(self, update: InnerUpdate, *args, **kwargs):
         invoker = update.invoker
-        raid = invoker.player.get().actual_raid
+        player = update.player if update.player is not None else invoker.player.get()
+        raid = player.actual_raid
         if raid is None or raid.status == RaidStatus.UNKNOWN:
             return self.message_manager.send_message(chat_id=invoker.chat_id, text="Твой пин еще не назначен")
 
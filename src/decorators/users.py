@@ -3,6 +3,7 @@ from functools import wraps
 from typing import Optional, List
 
 from src.core import InnerUpdate as InnerUpdate
+from src.decorators.context import UpdateContext
 from src.models import TelegramUser, database
 
 re_id = re.compile(r"#(?P<id>\d+)", re.MULTILINE)
@@ -119,7 +120,7 @@ def get_invoker(func):
     @wraps(func)
     def wrapper(self, update: InnerUpdate, *args, **kwargs):
         if update.invoker is None:
-            update.invoker = TelegramUser.get_by_user_id(update.telegram_update.effective_user.id)
+            update.invoker = UpdateContext.of(update.telegram_update).invoker
         return func(self, update, *args, **kwargs)
 
     return wrapper
@@ -130,7 +131,7 @@ def get_player(func):
     @get_invoker
     def wrapper(self, update: InnerUpdate, *args, **kwargs):
         if update.player is None:
-            update.player = update.invoker.player.get_or_none()
+            update.player = UpdateContext.of(update.telegram_update).player
         return func(self, update, *args, **kwargs)
 
     return wrapper
@@ -1,14 +1,31 @@
 import logging
+import multiprocessing
+import os
 from types import FrameType
-from typing import Type, List
+from typing import Type, List, Optional
 
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
-from telegram.ext import Updater
 
 import src.modules.common as common_modules
 import src.modules.statbot as statbot_modules
 from src.config import settings
-from src.core import EventManager, MessageManager
+from src.core import (
+    EventManager,
+    MessageManager,
+    BackpressurePolicy,
+    Outbox,
+    UndeliverableChats,
+    KeyedExecutor,
+    LeaderLock,
+    ShardRouter,
+    ShardUpdater,
+    metrics_registry,
+    profiler,
+    query_detector,
+    DetectorMode,
+)
+from src.models import LeaderLease, OutboxMessage, UndeliverableChat, database
 from src.modules import BasicModule
 
 
@@ -18,17 +35,94 @@ from src.modules import BasicModule
 
 
 class StatBot:
-    """StatBot runner"""
+    """
+    StatBot runner. With several shards every shard is a process running its own StatBot:
+    the first one receives updates and hands the ones of other users' shards over to their queues
+    """
 
-    def __init__(self):
+    def __init__(self, shard_index: int = 0, shard_queues: Optional[List] = None):
         self.logger = logging.getLogger(__name__)
+        self.shard_index = shard_index
+        self.shard_queues = shard_queues or []
 
-        # initializing Updater
-        self.updater = Updater(token=settings.TG_TOKEN, user_sig_handler=self.stop)
+        owner = settings.OUTBOX_OWNER
+        if settings.SHARDS > 1:
+            owner = f"{owner}:{shard_index}"
 
-        self.scheduler = BackgroundScheduler()
-        self.event_manager = EventManager(self.scheduler)
-        self.message_manager = MessageManager(self.updater.bot, self.scheduler)
+        # initializing Updater
+        self.updater = ShardUpdater(
+            token=settings.TG_TOKEN,
+            workers=settings.DISPATCHER_WORKERS,
+            user_sig_handler=self.stop,
+            request_kwargs=settings.REQUEST_KWARGS,
+            secret_token=settings.WEBHOOK_SECRET_TOKEN,
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        )
+
+        self.scheduler = BackgroundScheduler(executors={"default": ThreadPoolExecutor(settings.SCHEDULER_WORKERS)})
+
+        profiler.enabled = settings.PROFILING_ENABLED
+        profiler.samples = settings.PROFILER_SAMPLES
+        profiler.instrument_database(database)
+        profiler.instrument_scheduler(self.scheduler)
+
+        query_detector.mode = DetectorMode(settings.N_PLUS_ONE_MODE)
+        query_detector.threshold = settings.N_PLUS_ONE_THRESHOLD
+        query_detector.instrument_database(database)
+        query_detector.instrument_scheduler(self.scheduler)
+
+        self.leader = None
+        if settings.SHARDS > 1:
+            self.leader = LeaderLock(LeaderLease, owner, ttl=settings.LEADER_LEASE_TTL)
+            self.scheduler.add_job(self.leader.refresh, "interval", seconds=settings.LEADER_LEASE_TTL / 3)
+            self.updater.dispatcher.add_handler(ShardRouter(self.shard_queues, shard_index), group=-1)
+
+        executor = None
+        if settings.HANDLER_WORKERS:
+            executor = KeyedExecutor(
+                workers=settings.HANDLER_WORKERS,
+                max_queue_size=settings.HANDLER_QUEUE_SIZE,
+                block_timeout=settings.HANDLER_BLOCK_TIMEOUT,
+                name="inner_handlers",
+            )
+        self.event_manager = EventManager(self.scheduler, executor, self.leader)
+
+        outbox = None
+        if settings.OUTBOX_ENABLED:
+            outbox = Outbox(
+                OutboxMessage,
+                owner=owner,
+                batch_size=settings.OUTBOX_BATCH_SIZE,
+                lease=settings.OUTBOX_LEASE,
+            )
+
+        self.message_manager = MessageManager(
+            self.updater.bot,
+            self.scheduler,
+            workers=settings.SENDER_WORKERS,
+            max_queue_size=settings.SENDER_QUEUE_SIZE,
+            backpressure=BackpressurePolicy(settings.SENDER_BACKPRESSURE),
+            block_timeout=settings.SENDER_BLOCK_TIMEOUT,
+            coalesce_window=settings.MESSAGE_COALESCE_WINDOW,
+            outbox=outbox,
+            outbox_interval=settings.OUTBOX_FLUSH_INTERVAL,
+            undeliverable=UndeliverableChats(UndeliverableChat, ttl=settings.UNDELIVERABLE_CHAT_TTL),
+            max_retries=settings.SENDER_MAX_RETRIES,
+            retry_base_delay=settings.SENDER_RETRY_BASE_DELAY,
+            retry_max_delay=settings.SENDER_RETRY_MAX_DELAY,
+            edit_delay=settings.EDIT_COALESCE_DELAY,
+            edit_max_delay=settings.EDIT_COALESCE_MAX_DELAY,
+            leader=self.leader,
+        )
+
+        if settings.METRICS_FILE:
+            metrics_file = settings.METRICS_FILE
+            if settings.SHARDS > 1:
+                root, extension = os.path.splitext(metrics_file)
+                metrics_file = f"{root}_{shard_index}{extension}"
+            self.scheduler.add_job(
+                metrics_registry.write, "interval", seconds=settings.METRICS_INTERVAL, args=[metrics_file]
+            )
 
         modules: List[Type[BasicModule]] = [
             common_modules.ActivityModule,
@@ -64,12 +158,31 @@ class StatBot:
         for instance in self.modules:
             instance.startup()
 
+        if self.leader:
+            self.leader.refresh()
+        self.message_manager.start()
+        self.event_manager.start()
         self.scheduler.start()
 
-        self.logger.info("%s started", self.updater.bot.name)
-        self.message_manager.send_message(chat_id=settings.ADMIN_CHAT_ID, text="Restarted")
+        self.logger.info("%s started, shard %s of %s", self.updater.bot.name, self.shard_index + 1, settings.SHARDS)
+        if self.shard_index:
+            self.updater.start_shard(self.shard_queues[self.shard_index])
+            return
 
-        self.updater.start_polling(clean=True)
+        self.message_manager.send_message(chat_id=settings.ADMIN_CHAT_ID, text="Restarted")
+        if settings.UPDATES_MODE == "webhook":
+            self.updater.start_webhook(
+                listen=settings.WEBHOOK_LISTEN,
+                port=settings.WEBHOOK_PORT,
+                url_path=settings.WEBHOOK_PATH,
+                cert=settings.WEBHOOK_CERT,
+                key=settings.WEBHOOK_KEY,
+                clean=True,
+                bootstrap_retries=-1,
+                webhook_url=settings.WEBHOOK_URL,
+            )
+        else:
+            self.updater.start_polling(clean=True)
 
     def stop(self, _: int = None, __: FrameType = None):
         """Stop Statbot"""
@@ -77,17 +190,43 @@ class StatBot:
             instance.shutdown()
 
         self.updater.stop()
+        if self.shard_index == 0:
+            for updates in self.shard_queues[1:]:
+                updates.put(None)
+
+        self.event_manager.stop(timeout=settings.SENDER_DRAIN_TIMEOUT)
         self.scheduler.shutdown()
+        self.message_manager.stop(timeout=settings.SENDER_DRAIN_TIMEOUT)
+        if self.leader:
+            self.leader.release()
 
     def run(self):
         self.start()
         self.updater.idle()
 
 
-def main():
-    statbot = StatBot()
+def run_shard(shard_index: int, shard_queues: List):
+    statbot = StatBot(shard_index, shard_queues)
     statbot.run()
 
 
+def main():
+    if settings.SHARDS == 1:
+        return run_shard(0, [])
+
+    context = multiprocessing.get_context("spawn")  # nothing of the parent's threads and connections is inherited
+    shard_queues = [context.Queue() for _ in range(settings.SHARDS)]
+    shards = [
+        context.Process(target=run_shard, args=(index, shard_queues), name=f"shard_{index}")
+        for index in range(1, settings.SHARDS)
+    ]
+    for shard in shards:
+        shard.start()
+
+    run_shard(0, shard_queues)
+    for shard in shards:
+        shard.join()
+
+
 if __name__ == "__main__":
     main()
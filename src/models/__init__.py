@@ -1,5 +1,7 @@
 from .base import BaseModel, database
 from .group import Group, GroupPlayerThrough, GroupLiderThrough
+from .leader_lease import LeaderLease
+from .outbox import OutboxMessage
 from .player import Player, PlayerStatHistory
 from .radar import Radar
 from .raid_assign import RaidAssign, RaidStatus
@@ -8,6 +10,7 @@ from .settings import Settings
 from .telegram_chat import TelegramChat
 from .telegram_user import TelegramUser
 from .trigger import Trigger
+from .undeliverable_chat import UndeliverableChat
 
 MODELS = {
     TelegramUser,
@@ -22,6 +25,9 @@ MODELS = {
     Settings,
     Trigger,
     RaidsInterval,
+    OutboxMessage,
+    UndeliverableChat,
+    LeaderLease,
 }
 
 with database:
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import peewee
 from playhouse.db_url import connect
 
@@ -9,3 +11,14 @@ database = connect(settings.DATABASE_URL, autorollback=True)
 class BaseModel(peewee.Model):
     class Meta:
         database = database
+
+    def detached(self):
+        """Copy sharing no state with this instance, cached rows are handed out as such copies"""
+        copy = type(self)(__no_default__=True)
+        copy.__data__ = dict(self.__data__)
+        copy._dirty = set()
+        return copy
+
+
+def detached(instance: Optional[BaseModel]) -> Optional[BaseModel]:
+    return None if instance is None else instance.detached()
@@ -2,11 +2,15 @@ import datetime
 from typing import Optional
 
 import peewee
-from playhouse.signals import Model
+from playhouse.signals import Model, post_delete, post_save
 
-from .base import BaseModel
+from src.config import settings
+from src.core.cache import LRUCache
+from .base import BaseModel, detached
 from .player import Player
 
+_by_name = LRUCache("group_name", settings.IDENTITY_CACHE_SIZE, settings.IDENTITY_CACHE_TTL)
+
 ThroughDeferredMembers = peewee.DeferredThroughModel()
 ThroughDeferredLiders = peewee.DeferredThroughModel()
 
@@ -26,6 +30,12 @@ class Group(BaseModel, Model):
 
     @classmethod
     def get_by_name(cls, group_name: str, group_type: Optional[str] = None) -> Optional["Group"]:
+        return detached(
+            _by_name.get_or_load((group_name, group_type), lambda: cls._get_by_name(group_name, group_type))
+        )
+
+    @classmethod
+    def _get_by_name(cls, group_name: str, group_type: Optional[str] = None) -> Optional["Group"]:
         where_stmt = (cls.name == group_name) | (cls.alias == group_name)
         select_stmt = cls.select().where(where_stmt)
 
@@ -37,6 +47,11 @@ class Group(BaseModel, Model):
         if groups:
             return groups[0]
 
+    @classmethod
+    def invalidate_cache(cls):
+        """For writes which bypass save(), e.g. update() and insert().on_conflict()"""
+        _by_name.clear()
+
     class Meta(object):
         indexes = ((("name", "type"), True),)
         only_save_dirty = True
@@ -60,3 +75,10 @@ class GroupLiderThrough(BaseModel, Model):
 
 ThroughDeferredMembers.set_model(GroupPlayerThrough)
 ThroughDeferredLiders.set_model(GroupLiderThrough)
+
+
+@post_save(sender=Group)
+@post_delete(sender=Group)
+def invalidate_cached_group(_, instance: Group, **kwargs):
+    # a failed lookup may match the saved name or alias now
+    _by_name.invalidate_where(lambda group: group is None or group.id == instance.id)
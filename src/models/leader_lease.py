@@ -0,0 +1,30 @@
+import datetime
+
+import peewee
+
+from .base import BaseModel
+
+
+class LeaderLease(BaseModel):
+    """Named lease, at most one process of the cluster holds a name until expires_at"""
+
+    name = peewee.CharField(max_length=64, primary_key=True)
+    owner = peewee.CharField(max_length=64)
+    expires_at = peewee.DateTimeField()
+
+    class Meta:
+        table_name = "leader_lease"
+        only_save_dirty = True
+
+    @classmethod
+    def acquire(cls, name: str, owner: str, ttl: datetime.timedelta) -> bool:
+        """Takes or prolongs the lease, returns False if another owner holds it"""
+        now = datetime.datetime.now()
+        cls.insert(name=name, owner=owner, expires_at=now + ttl).on_conflict_ignore().execute()
+
+        held = (cls.owner == owner) | (cls.expires_at < now)
+        return bool(cls.update(owner=owner, expires_at=now + ttl).where((cls.name == name) & held).execute())
+
+    @classmethod
+    def release(cls, name: str, owner: str):
+        cls.update(expires_at=datetime.datetime.now()).where((cls.name == name) & (cls.owner == owner)).execute()
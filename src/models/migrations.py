@@ -0,0 +1,49 @@
+"""
+Columns added to the models of existing tables, create_tables() skips a table which exists already.
+Run once after an update, before the bot is started: python -m src.models.migrations
+"""
+
+import logging
+from typing import Callable, List
+
+from playhouse.migrate import SchemaMigrator, migrate
+
+from .base import database
+from .trigger import Trigger
+
+logger = logging.getLogger(__name__)
+
+
+def _has_column(table_name: str, column_name: str) -> bool:
+    return any(column.name == column_name for column in database.get_columns(table_name))
+
+
+def add_trigger_file_id() -> bool:
+    """Trigger.file_id, Telegram file_id of the uploaded trigger media"""
+    table_name = Trigger._meta.table_name
+    if _has_column(table_name, Trigger.file_id.column_name):
+        return False
+
+    migrator = SchemaMigrator.from_database(database)
+    with database.atomic():
+        migrate(migrator.add_column(table_name, Trigger.file_id.column_name, Trigger.file_id))
+    return True
+
+
+MIGRATIONS: List[Callable[[], bool]] = [add_trigger_file_id]
+
+
+def run_migrations() -> List[str]:
+    """Applies the migrations which were not applied yet, returns their names"""
+    applied = []
+    with database:
+        for migration in MIGRATIONS:
+            if migration():
+                logger.info(f"Migration {migration.__name__} applied")
+                applied.append(migration.__name__)
+    return applied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Applied: {', '.join(run_migrations()) or 'nothing'}")
@@ -0,0 +1,82 @@
+import datetime
+from typing import List, Optional
+
+import peewee
+
+from .base import BaseModel, database
+
+
+class OutboxMessage(BaseModel):
+    """Journal of queued messages, lets MessageManager replay the unsent ones after a restart"""
+
+    id = peewee.BigAutoField()
+    chat_id = peewee.BigIntegerField()
+    payload = peewee.TextField()  # json encoded keyword arguments of Bot.send_message
+    priority = peewee.IntegerField(default=1)
+    not_before = peewee.DateTimeField(default=datetime.datetime.now)
+    attempts = peewee.IntegerField(default=0)
+    dedupe_key = peewee.CharField(max_length=255, unique=True)
+
+    owner = peewee.CharField(max_length=64, null=True, index=True)  # process which holds the row in memory
+    claimed_at = peewee.DateTimeField(null=True)
+    sent_at = peewee.DateTimeField(null=True, index=True)
+    error = peewee.TextField(null=True)
+
+    created_date = peewee.DateTimeField(default=datetime.datetime.now)
+
+    class Meta:
+        table_name = "outbox_message"
+        only_save_dirty = True
+
+    @classmethod
+    def add_many(cls, rows: List[dict], batch_size: int = 100):
+        """
+        Inserts rows in batches. A row with the dedupe_key of a sent one takes its place and is sent again,
+        a row with the dedupe_key of an unsent one is skipped
+        """
+        update = {
+            field: getattr(peewee.EXCLUDED, field.name)
+            for field in (cls.chat_id, cls.payload, cls.priority, cls.not_before, cls.owner, cls.claimed_at)
+        }
+        update.update({cls.attempts: 0, cls.sent_at: None, cls.error: None})
+        with database.atomic():
+            for batch in peewee.chunked(rows, batch_size):
+                cls.insert_many(batch).on_conflict(
+                    conflict_target=[cls.dedupe_key], update=update, where=cls.sent_at.is_null(False)
+                ).execute()
+
+    @classmethod
+    def complete(cls, keys: List[str], error: Optional[str] = None, batch_size: int = 500):
+        now = datetime.datetime.now()
+        with database.atomic():
+            for batch in peewee.chunked(keys, batch_size):
+                cls.update(sent_at=now, error=error, attempts=cls.attempts + 1).where(cls.dedupe_key << batch).execute()
+
+    @classmethod
+    def claim(cls, owner: str, limit: int, lease: datetime.timedelta) -> List["OutboxMessage"]:
+        """Takes up to limit due rows which are not held by a live process"""
+        now = datetime.datetime.now()
+        claimable = (
+            cls.sent_at.is_null() & (cls.not_before <= now) & (cls.owner.is_null() | (cls.claimed_at < now - lease))
+        )
+        ids = [row.id for row in cls.select(cls.id).where(claimable).order_by(cls.priority, cls.id).limit(limit)]
+        if not ids:
+            return []
+
+        # claimable is repeated so the rows taken by a concurrent claim are skipped,
+        # the taken rows are then selected by id: claimed_at may be truncated by the database
+        if not cls.update(owner=owner, claimed_at=now).where((cls.id << ids) & claimable).execute():
+            return []
+
+        query = cls.select().where((cls.id << ids) & (cls.owner == owner) & cls.sent_at.is_null())
+        return list(query.order_by(cls.priority, cls.id))
+
+    @classmethod
+    def refresh(cls, owner: str):
+        """Prolongs the lease of the rows held by owner"""
+        cls.update(claimed_at=datetime.datetime.now()).where((cls.owner == owner) & cls.sent_at.is_null()).execute()
+
+    @classmethod
+    def release(cls, owner: str):
+        """Gives back the rows held by owner, e.g. by a previous run of the same process"""
+        cls.update(owner=None, claimed_at=None).where((cls.owner == owner) & cls.sent_at.is_null()).execute()
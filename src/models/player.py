@@ -3,11 +3,13 @@ from typing import List, cast, Optional, TYPE_CHECKING
 
 import peewee
 from playhouse.hybrid import hybrid_property
-from playhouse.signals import post_save, Model, pre_save
+from playhouse.signals import post_delete, post_save, Model, pre_save
 
-from src.models import Settings
+from src.config import settings
+from src.core.cache import LRUCache
+from .settings import Settings
 from src.utils.functions import get_next_raid_date
-from .base import BaseModel
+from .base import BaseModel, detached
 from .telegram_user import TelegramUser
 
 if TYPE_CHECKING:
@@ -30,6 +32,9 @@ PLAYER_STAT_DUPLICATING_PARAMS = (
 )
 
 
+_by_nickname = LRUCache("player_nickname", settings.IDENTITY_CACHE_SIZE, settings.IDENTITY_CACHE_TTL)
+
+
 class Player(BaseModel, Model):
     telegram_user = peewee.ForeignKeyField(TelegramUser, backref="player")
 
@@ -115,7 +120,12 @@ class Player(BaseModel, Model):
 
     @classmethod
     def get_by_nickname(cls, nickname) -> Optional["Player"]:
-        return cls.get_or_none(peewee.fn.LOWER(cls.nickname).contains(nickname.lower()))
+        """The player with the nickname, else one whose nickname contains it. Only exact matches are cached"""
+        nickname = nickname.lower()
+        player = _by_nickname.get_or_load(nickname, lambda: cls.get_or_none(peewee.fn.LOWER(cls.nickname) == nickname))
+        if player is None:
+            return cls.get_or_none(peewee.fn.LOWER(cls.nickname).contains(nickname))
+        return detached(player)
 
     @classmethod
     def get_iterator(cls):
@@ -274,3 +284,10 @@ def post_save_handler(_, instance: PlayerStatHistory, created):
 @pre_save(sender=PlayerStatHistory)
 def pre_save_handler_stats(_, instance: PlayerStatHistory, created):
     return instance.set_sum_stat()
+
+
+@post_save(sender=Player)
+@post_delete(sender=Player)
+def invalidate_cached_player(_, instance: Player, **kwargs):
+    # a failed lookup may match the saved nickname now, the old nickname of a renamed player must not
+    _by_nickname.invalidate_where(lambda player: player is None or player.id == instance.id)
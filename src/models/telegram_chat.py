@@ -2,11 +2,16 @@ import datetime
 from typing import Optional, cast
 
 import peewee
+from playhouse.signals import Model, post_delete, post_save
 
-from .base import BaseModel
+from src.config import settings
+from src.core.cache import LRUCache
+from .base import BaseModel, detached
 
+_by_chat_id = LRUCache("telegram_chat", settings.IDENTITY_CACHE_SIZE, settings.IDENTITY_CACHE_TTL)
 
-class TelegramChat(BaseModel):
+
+class TelegramChat(BaseModel, Model):
     chat_id = peewee.BigIntegerField(null=False, index=True, unique=True, primary_key=True)
     chat_type = peewee.CharField(
         max_length=10,
@@ -24,6 +29,15 @@ class TelegramChat(BaseModel):
 
     is_active = peewee.BooleanField(default=False)
 
+    @classmethod
+    def get_by_chat_id(cls, chat_id: int) -> Optional["TelegramChat"]:
+        return detached(_by_chat_id.get_or_load(chat_id, lambda: cls.get_or_none(cls.chat_id == chat_id)))
+
+    @classmethod
+    def invalidate_cache(cls, chat_id: int):
+        """For writes which bypass save(), e.g. insert().on_conflict()"""
+        _by_chat_id.invalidate(chat_id)
+
     @classmethod
     def get_by_name(cls, chat_name: str) -> Optional["TelegramChat"]:
         where_stmt = (cls.title == chat_name) | (cls.shortname == chat_name)
@@ -36,3 +50,9 @@ class TelegramChat(BaseModel):
 
     class Meta:
         only_save_dirty = True
+
+
+@post_save(sender=TelegramChat)
+@post_delete(sender=TelegramChat)
+def invalidate_cached_chat(_, instance: TelegramChat, **kwargs):
+    _by_chat_id.invalidate(instance.chat_id)
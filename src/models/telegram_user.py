@@ -3,11 +3,16 @@ import html
 from typing import Optional, cast
 
 import peewee
+from playhouse.signals import Model, post_delete, post_save
 
-from .base import BaseModel
+from src.config import settings
+from src.core.cache import LRUCache
+from .base import BaseModel, detached
 
+_by_user_id = LRUCache("telegram_user", settings.IDENTITY_CACHE_SIZE, settings.IDENTITY_CACHE_TTL)
 
-class TelegramUser(BaseModel):
+
+class TelegramUser(BaseModel, Model):
     user_id = peewee.BigIntegerField(index=True, unique=True, primary_key=True)
     chat_id = peewee.BigIntegerField(null=True, unique=True)
 
@@ -24,7 +29,12 @@ class TelegramUser(BaseModel):
 
     @classmethod
     def get_by_user_id(cls, user_id: int) -> Optional["TelegramUser"]:
-        return cls.get_or_none(cls.user_id == user_id)
+        return detached(_by_user_id.get_or_load(user_id, lambda: cls.get_or_none(cls.user_id == user_id)))
+
+    @classmethod
+    def invalidate_cache(cls, user_id: int):
+        """For writes which bypass save(), e.g. insert().on_conflict()"""
+        _by_user_id.invalidate(user_id)
 
     @classmethod
     def get_by_username(cls, username: str) -> Optional["TelegramUser"]:
@@ -61,3 +71,9 @@ class TelegramUser(BaseModel):
 
     class Meta:
         only_save_dirty = True
+
+
+@post_save(sender=TelegramUser)
+@post_delete(sender=TelegramUser)
+def invalidate_cached_user(_, instance: TelegramUser, **kwargs):
+    _by_user_id.invalidate(instance.user_id)
@@ -22,6 +22,7 @@ class Trigger(BaseModel, Model):
         ),
     )
     file_path = peewee.CharField(max_length=255, default="")
+    file_id = peewee.CharField(max_length=255, null=True)  # Telegram file_id of the uploaded file_path
 
     admin_only = peewee.BooleanField(default=False)
     ignore_case = peewee.BooleanField(default=True)
@@ -0,0 +1,41 @@
+import datetime
+from typing import Dict
+
+import peewee
+
+from .base import BaseModel
+
+
+class UndeliverableChat(BaseModel):
+    """Chats the bot can not write to, e.g. the user blocked the bot or the bot was kicked from the group"""
+
+    chat_id = peewee.BigIntegerField(primary_key=True)
+    reason = peewee.TextField(null=True)
+    expires_at = peewee.DateTimeField(index=True)
+
+    created_date = peewee.DateTimeField(default=datetime.datetime.now)
+
+    class Meta:
+        table_name = "undeliverable_chat"
+        only_save_dirty = True
+
+    @classmethod
+    def mark(cls, chat_id: int, reason: str, expires_at: datetime.datetime):
+        cls.insert(chat_id=chat_id, reason=reason, expires_at=expires_at).on_conflict(
+            conflict_target=[cls.chat_id],
+            update={cls.reason: reason, cls.expires_at: expires_at},
+        ).execute()
+
+    @classmethod
+    def unmark(cls, chat_id: int):
+        cls.delete().where(cls.chat_id == chat_id).execute()
+
+    @classmethod
+    def active(cls) -> Dict[int, datetime.datetime]:
+        query = cls.select(cls.chat_id, cls.expires_at).where(cls.expires_at > datetime.datetime.now())
+        return {row.chat_id: row.expires_at for row in query}
+
+    @classmethod
+    def active_chat_ids(cls) -> peewee.ModelSelect:
+        """Subquery for recipient queries: `.where(Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids()))`"""
+        return cls.select(cls.chat_id).where(cls.expires_at > datetime.datetime.now())
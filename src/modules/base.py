@@ -4,7 +4,7 @@ from typing import Optional
 from telegram.ext import Dispatcher, Handler
 
 from src.core import EventManager, MessageManager
-from src.core import InnerHandler
+from src.core import InnerHandler, callable_name, profiler, query_detector
 
 
 class BasicModule:
@@ -47,6 +47,9 @@ class BasicModule:
 
     def set_handlers(self, dispatcher: Dispatcher) -> None:
         for handler in self._handler_list:
+            name = f"{self.module_name}:{callable_name(handler.callback)}"
+            handler.callback = profiler.wrap(name, query_detector.wrap(name, handler.callback))
+            handler.check_update = profiler.wrap_check(name, handler.check_update)
             dispatcher.add_handler(handler, group=self.group)
 
         for handler in self._inner_handler_list:
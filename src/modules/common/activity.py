@@ -1,14 +1,31 @@
+import datetime
+import threading
+from typing import Dict
+
+import peewee
 from telegram import Bot, Update
 from telegram.ext import Dispatcher, Filters, MessageHandler
 
+from src.config import settings
 from src.core import EventManager, MessageManager
-from src.models import TelegramChat, TelegramUser
+from src.models import TelegramChat, TelegramUser, database
 from src.modules import BasicModule
 
+USER_FIELDS = (TelegramUser.username, TelegramUser.first_name, TelegramUser.last_name)
+
+
+def _differs(instance, values: dict) -> bool:
+    """Whether the upsert would change the cached row"""
+    return any(getattr(instance, field.name) != value for field, value in values.items())
+
 
 class ActivityModule(BasicModule):
     """
-    Tracks new users, chats, and user`s activity
+    Tracks new users, chats, and user`s activity.
+    New users and chats, and a new private chat_id of a user, are written at once, since the following
+    handlers look them up.
+    Activity of known ones is buffered, deduplicated by user_id and chat_id, and written
+    every ACTIVITY_FLUSH_INTERVAL seconds with one multi-row upsert per table
     """
 
     module_name = "activity"
@@ -20,9 +37,20 @@ class ActivityModule(BasicModule):
         message_manager: MessageManager,
         dispatcher: Dispatcher,
     ):
+        self._users: Dict[int, dict] = {}  # user_id -> row of the latest message
+        self._renamed_users = set()
+        self._chats: Dict[int, dict] = {}  # chat_id -> row, only the chats whose title has changed
+        self._lock = threading.Lock()
+
         self.add_handler(MessageHandler(Filters.all, self._write_activity))
         super().__init__(event_manager, message_manager, dispatcher)
 
+    def startup(self):
+        self.event_manager.scheduler.add_job(self._flush, "interval", seconds=settings.ACTIVITY_FLUSH_INTERVAL)
+
+    def shutdown(self):
+        self._flush()
+
     def _write_activity(self, _: Bot, update: Update):
         user_data = update.effective_user
         if user_data is None:
@@ -35,23 +63,27 @@ class ActivityModule(BasicModule):
             TelegramUser.username: user_data.username,
             TelegramUser.first_name: user_data.first_name,
             TelegramUser.last_name: user_data.last_name,
-        }
-        telegram_user_update = {
-            TelegramUser.username: user_data.username,
-            TelegramUser.first_name: user_data.first_name,
-            TelegramUser.last_name: user_data.last_name,
+            TelegramUser.chat_id: None,
+            TelegramUser.last_seen_date: datetime.datetime.now(),
         }
 
         if chat_data.type == "private":
             telegram_user[TelegramUser.chat_id] = chat_data.id
-            telegram_user_update[TelegramUser.chat_id] = chat_data.id
+            self.message_manager.undeliverable.discard(chat_data.id)  # the user has unblocked the bot
 
-        TelegramUser.insert(telegram_user).on_conflict(
-            conflict_target=[
-                TelegramUser.user_id,
-            ],
-            update=telegram_user_update,
-        ).execute()
+        invoker = TelegramUser.get_by_user_id(user_data.id)
+        new_chat_id = telegram_user[TelegramUser.chat_id] not in (None, getattr(invoker, "chat_id", None))
+        if invoker is None or new_chat_id:
+            # the following handlers reply to invoker.chat_id, it must be there before they run
+            with self._lock:
+                self._users.pop(user_data.id, None)
+                self._renamed_users.discard(user_data.id)
+            self._upsert_users([telegram_user])
+            TelegramUser.invalidate_cache(user_data.id)
+        else:
+            renamed = _differs(invoker, {field: telegram_user[field] for field in USER_FIELDS})
+            with self._lock:
+                self._buffer_user(telegram_user, renamed)
 
         if chat_data.type == "private":
             return
@@ -61,11 +93,79 @@ class ActivityModule(BasicModule):
             TelegramChat.chat_type: chat_data.type,
             TelegramChat.title: chat_data.title,
         }
-        telegram_chat_update = {TelegramChat.title: chat_data.title}
 
-        TelegramChat.insert(telegram_chat).on_conflict(
+        chat = TelegramChat.get_by_chat_id(chat_data.id)
+        if chat is None:
+            self._upsert_chats([telegram_chat])
+            TelegramChat.invalidate_cache(chat_data.id)
+        elif _differs(chat, {TelegramChat.title: chat_data.title}):
+            with self._lock:
+                self._chats[chat_data.id] = telegram_chat
+
+    def _buffer_user(self, telegram_user: dict, renamed: bool):
+        """Merges the row into the buffered one of the user, a private chat_id is kept over a group message"""
+        user_id = telegram_user[TelegramUser.user_id]
+        if (buffered := self._users.get(user_id)) and telegram_user[TelegramUser.chat_id] is None:
+            telegram_user[TelegramUser.chat_id] = buffered[TelegramUser.chat_id]
+        self._users[user_id] = telegram_user
+        if renamed:
+            self._renamed_users.add(user_id)
+
+    def _flush(self):
+        with self._lock:
+            users, self._users = self._users, {}
+            renamed_users, self._renamed_users = self._renamed_users, set()
+            chats, self._chats = self._chats, {}
+
+        if not users and not chats:
+            return
+
+        try:
+            with database.atomic():
+                if users:
+                    self._upsert_users(list(users.values()))
+                if chats:
+                    self._upsert_chats(list(chats.values()))
+        except (Exception,):
+            self.logger.exception(f"Can not write activity of {len(users)} users and {len(chats)} chats")
+            with self._lock:
+                # rows buffered since the swap are newer and win, they are retried with the next flush
+                for user_id, telegram_user in users.items():
+                    newer = self._users.pop(user_id, None)
+                    self._users[user_id] = telegram_user
+                    if newer is not None:
+                        self._buffer_user(newer, renamed=False)
+                self._renamed_users.update(renamed_users)
+                for chat_id, telegram_chat in chats.items():
+                    self._chats.setdefault(chat_id, telegram_chat)
+            return
+
+        # last_seen_date of the cached users is left to expire with the cache
+        for user_id in renamed_users:
+            TelegramUser.invalidate_cache(user_id)
+        for chat_id in chats:
+            TelegramChat.invalidate_cache(chat_id)
+
+    @staticmethod
+    def _upsert_users(rows):
+        TelegramUser.insert_many(rows).on_conflict(
+            conflict_target=[
+                TelegramUser.user_id,
+            ],
+            update={
+                TelegramUser.username: peewee.EXCLUDED.username,
+                TelegramUser.first_name: peewee.EXCLUDED.first_name,
+                TelegramUser.last_name: peewee.EXCLUDED.last_name,
+                TelegramUser.chat_id: peewee.fn.COALESCE(peewee.EXCLUDED.chat_id, TelegramUser.chat_id),
+                TelegramUser.last_seen_date: peewee.EXCLUDED.last_seen_date,
+            },
+        ).execute()
+
+    @staticmethod
+    def _upsert_chats(rows):
+        TelegramChat.insert_many(rows).on_conflict(
             conflict_target=[
                 TelegramChat.chat_id,
             ],
-            update=telegram_chat_update,
+            update={TelegramChat.title: peewee.EXCLUDED.title},
         ).execute()
@@ -98,7 +98,7 @@ class ActivatedModule(BasicModule):
 
         alias = match.group("alias")
         chat_id = match.group("chat_id") or update.effective_chat_id
-        chat = TelegramChat.get_or_none(TelegramChat.chat_id == int(chat_id))
+        chat = TelegramChat.get_by_chat_id(int(chat_id))
         if chat is None or chat.chat_type == "private":
             self.message_manager.send_message(chat_id=update.effective_chat_id, text=f"Чата с id: {chat_id} не найден")
             return
@@ -1,3 +1,4 @@
+import html
 import re
 from functools import partial
 from typing import Match, List
@@ -12,6 +13,9 @@ from src.core import (
     InnerHandler,
     CommandFilter,
     InnerUpdate,
+    metrics_registry,
+    profiler,
+    ProfileRow,
 )
 from src.decorators import command_handler, permissions
 from src.decorators.permissions import is_admin, is_developer
@@ -97,6 +101,24 @@ class AdminModule(BasicModule):
                 ],
             )
         )
+        self.add_inner_handler(
+            InnerHandler(
+                CommandFilter(command="metrics", description="Метрики отправки сообщений"),
+                self._metrics,
+                [
+                    CustomInnerFilters.from_admin_chat_or_private,
+                ],
+            )
+        )
+        self.add_inner_handler(
+            InnerHandler(
+                CommandFilter(command="perf", description="Самые затратные обработчики"),
+                self._perf,
+                [
+                    CustomInnerFilters.from_admin_chat_or_private,
+                ],
+            )
+        )
 
         super().__init__(event_manager, message_manager, dispatcher)
 
@@ -125,6 +147,48 @@ class AdminModule(BasicModule):
             text=f"✅ Это сообщение {telegram_user.mention_html()}",
         )
 
+    @permissions(is_admin)
+    def _metrics(self, update: InnerUpdate):
+        """
+        Показывает метрики, гистограммы сокращены до p50/p90/p99
+        Можно передать часть имени метрики: /metrics telegram_send
+        """
+
+        lines = metrics_registry.summary().split("\n")
+        if update.command.argument:
+            lines = [line for line in lines if update.command.argument in line]
+
+        text = html.escape("\n".join(lines)) or "Метрик пока нет"
+        self.message_manager.send_message(chat_id=update.effective_chat_id, text=f"<pre>{text}</pre>")
+
+    @permissions(is_admin)
+    def _perf(self, update: InnerUpdate):
+        """
+        Показывает обработчики с наибольшим суммарным временем за последние вызовы
+        Можно передать сортировку: /perf p99, /perf queries, /perf sql_seconds, /perf rejected
+        """
+
+        if not profiler.enabled:
+            return self.message_manager.send_message(
+                chat_id=update.effective_chat_id, text="Профилирование выключено (PROFILING_ENABLED)"
+            )
+
+        sort = update.command.argument or "total"
+        if sort not in ProfileRow.__slots__ or sort == "name":
+            return self.message_manager.send_message(
+                chat_id=update.effective_chat_id, text=f"Неизвестная сортировка: {html.escape(sort)}"
+            )
+
+        lines = [
+            f"{row.name}\n"
+            f"  n={row.calls} total={row.total:.2f}s p50/95/99={row.p50 * 1000:.0f}/{row.p95 * 1000:.0f}/"
+            f"{row.p99 * 1000:.0f}ms sql={row.queries:.1f}q/{row.sql_seconds * 1000:.0f}ms "
+            f"rejected={row.rejected}/{row.filter_seconds * 1000:.0f}ms"
+            for row in profiler.report(top=15, sort=sort)
+        ]
+        text = html.escape("\n".join(lines)) or "Замеров пока нет"
+        self.message_manager.send_message(chat_id=update.effective_chat_id, text=f"<pre>{text}</pre>")
+
     @permissions(is_admin)
     @get_users(include_reply=True, break_if_no_users=True)
     def _ban(
@@ -1,6 +1,8 @@
 import html
 import re
-from typing import Match, List, Tuple, Set, Optional, Dict
+import threading
+from functools import partial
+from typing import Match, List, Tuple, Set, Optional, Callable, Any
 
 from telegram.ext import Dispatcher
 
@@ -16,11 +18,37 @@ from src.core import (
 from src.decorators import command_handler, permissions
 from src.decorators.permissions import is_admin
 from src.decorators.users import re_id, re_username
-from src.models import TelegramChat, Group, Player, TelegramUser, GroupPlayerThrough
+from src.models import TelegramChat, Group, Player, TelegramUser, GroupPlayerThrough, UndeliverableChat
 from src.modules import BasicModule
 from src.utils.functions import CustomInnerFilters, telegram_user_id_encode
 
 
+class EchoDelivery:
+    """
+    Collects send results of one /echo, sender workers report them asynchronously.
+    on_done is called on the worker of the last result, so it must only hand the report off
+    """
+
+    def __init__(self, recipients: List[Tuple[str, int]], on_done: Callable[["EchoDelivery"], Any]):
+        self.recipients = recipients
+        self.blocked: Set[int] = set()
+
+        self._pending = len(recipients)
+        self._on_done = on_done
+        self._lock = threading.Lock()
+
+    def callback(self, callback_results: CallbackResults):
+        with self._lock:
+            if callback_results.error:
+                self.blocked.add(callback_results.args)
+
+            self._pending -= 1
+            done = self._pending == 0
+
+        if done:
+            self._on_done(self)
+
+
 class EchoModule(BasicModule):
     """
     message sending
@@ -45,14 +73,6 @@ class EchoModule(BasicModule):
         )
         super().__init__(event_manager, message_manager, dispatcher)
 
-    def _error_send_callback(self, callback_results: CallbackResults):
-        error = callback_results.error
-        if not error:
-            return
-
-        blocked_list, chat_id = callback_results.args
-        blocked_list.append(chat_id)
-
     def _get_text_from_template(self, template: str, chat_id: int) -> str:
         chat_id_secret = telegram_user_id_encode(chat_id)
         return template.replace("{secret}", chat_id_secret)
@@ -61,7 +81,10 @@ class EchoModule(BasicModule):
         query = (
             Player.select(Player.nickname, Player.telegram_user_id.alias("user_id"))
             .join(GroupPlayerThrough, on=(GroupPlayerThrough.player_id == Player.id))
-            .where(GroupPlayerThrough.group == group)
+            .where(
+                (GroupPlayerThrough.group == group)
+                & Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids())
+            )
             .dicts()
         )
 
@@ -79,7 +102,10 @@ class EchoModule(BasicModule):
         query = (
             TelegramUser.select(Player.nickname, TelegramUser.user_id)
             .join(Player, on=(Player.telegram_user_id == TelegramUser.user_id))
-            .where((TelegramUser.user_id << user_id_mentions) | (TelegramUser.username << username_mentions))
+            .where(
+                ((TelegramUser.user_id << user_id_mentions) | (TelegramUser.username << username_mentions))
+                & TelegramUser.user_id.not_in(UndeliverableChat.active_chat_ids())
+            )
             .dicts()
         )
 
@@ -92,6 +118,8 @@ class EchoModule(BasicModule):
         return result
 
     def _get_recipients_chat_ids_from_chat(self, chat: TelegramChat) -> List[Tuple[str, int]]:
+        if chat.chat_id in self.message_manager.undeliverable:
+            return []
         return [(chat.title, chat.chat_id)]
 
     def _get_recipients_chat_ids(
@@ -149,52 +177,48 @@ class EchoModule(BasicModule):
             reply_to_message_user_id = None
 
         recipients_list = self._get_recipients_chat_ids(match.group("recipients"), reply_to_message_user_id)
-
-        name_by_chat_id: Dict[int, str] = {}
-        blocked_list: List[int] = []
+        delivery = EchoDelivery(recipients_list, partial(self._schedule_report, chat_id=message.chat_id))
+        if not recipients_list:
+            return self._send_report(delivery, message.chat_id)
 
         for name, chat_id in recipients_list:
-            name_by_chat_id[chat_id] = name
-
             text = self._get_text_from_template(message_text_template, chat_id)
             self.message_manager.send_message(
                 chat_id=chat_id,
                 text=text,
-                callback=self._error_send_callback,
-                callback_args=(blocked_list, chat_id),
+                callback=delivery.callback,
+                callback_args=chat_id,
             )
 
-        blocked_mentions: List[str] = []
-        for chat_id in blocked_list:
-            name = name_by_chat_id[chat_id]
-            mention = self._get_recipient_mention(name, chat_id)
-            blocked_mentions.append(mention)
+    def _schedule_report(self, delivery: EchoDelivery, chat_id: int):
+        """The report looks up the blocked recipients and sends, which must not hold up a sender worker"""
+        self.event_manager.scheduler.add_job(self._send_report, args=(delivery, chat_id))
 
+    def _send_report(self, delivery: EchoDelivery, chat_id: int):
+        blocked_mentions: List[str] = []
         success_mentions: List[str] = []
-        for name, chat_id in recipients_list:
-            if chat_id in blocked_list:
-                continue
-
-            mention = self._get_recipient_mention(name, chat_id)
-            success_mentions.append(mention)
+        for name, recipient_chat_id in delivery.recipients:
+            mention = self._get_recipient_mention(name, recipient_chat_id)
+            if recipient_chat_id in delivery.blocked:
+                blocked_mentions.append(mention)
+            else:
+                success_mentions.append(mention)
 
         if blocked_mentions:
             blocked_mentions_text = "\n".join(blocked_mentions)
-            self.message_manager.send_message_splitted(
+            self.message_manager.send_message(
                 chat_id=settings.GOAT_ADMIN_CHAT_ID,
                 text=f"❌ Не смог доставить сообщение в эти чаты ❌\n\n{blocked_mentions_text}",
-                n=30,
             )
 
         if success_mentions:
             success_mentions_text = "\n".join(success_mentions)
-            self.message_manager.send_message_splitted(
-                chat_id=message.chat_id,
+            self.message_manager.send_message(
+                chat_id=chat_id,
                 text=f"✅ Сообщение отправлено в эти чаты ✅\n\n{success_mentions_text}",
-                n=30,
             )
         else:
             self.message_manager.send_message(
-                chat_id=message.chat_id,
+                chat_id=chat_id,
                 text="⚠ Кажется я никуда не смог доставить сообщение ⚠",
             )
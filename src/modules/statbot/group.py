@@ -188,6 +188,7 @@ class GroupModule(BasicModule):
         ]
 
         Group.insert(gangs).on_conflict(conflict_target=[Group.name, Group.type], update={Group.parent: goat}).execute()
+        Group.invalidate_cache()
 
         goat.last_update = update.date
         goat.league = update.goat.league_name
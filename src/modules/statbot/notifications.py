@@ -4,7 +4,7 @@ from typing import List
 from telegram.ext import Dispatcher
 
 from src.core import EventManager, MessageManager
-from src.models import RaidAssign, Player, Settings, TelegramUser
+from src.models import RaidAssign, Player, Settings, TelegramUser, UndeliverableChat
 from src.models.raid_assign import RaidStatus
 from src.modules import BasicModule
 from src.utils import get_last_raid_date, get_when_raid_text
@@ -22,9 +22,9 @@ class NotificationsModule(BasicModule):
     ):
         super().__init__(event_manager, message_manager, dispatcher)
 
-        self.event_manager.scheduler.add_job(self._notification_when_raid_3, "cron", day_of_week="mon-sun", hour="6,22")
+        self.event_manager.add_leader_job(self._notification_when_raid_3, "cron", day_of_week="mon-sun", hour="6,22")
 
-        self.event_manager.scheduler.add_job(
+        self.event_manager.add_leader_job(
             self._notification_when_raid_tz(
                 kms=[
                     24,
@@ -36,7 +36,7 @@ class NotificationsModule(BasicModule):
             minute=57,
         )  # Выход с 23 км на 24 км
 
-        self.event_manager.scheduler.add_job(
+        self.event_manager.add_leader_job(
             self._notification_when_raid_tz(
                 kms=[
                     32,
@@ -48,7 +48,7 @@ class NotificationsModule(BasicModule):
             minute=47,
         )  # Выход с 27 км на 32 км
 
-        self.event_manager.scheduler.add_job(
+        self.event_manager.add_leader_job(
             self._notification_pipboy_update, "cron", day_of_week="mon-sun", hour="12"
         )  # Обновление пип-боев
 
@@ -56,7 +56,9 @@ class NotificationsModule(BasicModule):
         pipboy_expire_date = datetime.datetime.now() - datetime.timedelta(days=7)
 
         query = Player.select(Player.telegram_user_id).where(
-            (Player.is_active == True) & (Player.last_update <= pipboy_expire_date)
+            (Player.is_active == True)
+            & (Player.last_update <= pipboy_expire_date)
+            & Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids())
         )
 
         text = (
@@ -66,8 +68,13 @@ class NotificationsModule(BasicModule):
             "Хорошего тебе дня!"
         )
 
+        today = datetime.date.today()
         for row in query:
-            self.message_manager.send_message(chat_id=row["telegram_user_id"], text=text)
+            self.message_manager.send_message(
+                chat_id=row["telegram_user_id"],
+                text=text,
+                dedupe_key=f"pipboy_update:{row['telegram_user_id']}:{today:%Y%m%d}",
+            )
 
     def _notification_when_raid_3(self):
         last_raid_time = get_last_raid_date()
@@ -84,13 +91,18 @@ class NotificationsModule(BasicModule):
                 & (RaidAssign.is_reported == False)
                 & (RaidAssign.time > last_raid_time)
                 & (Settings.pings["notify_raid_3"] == "true")
+                & Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids())
             )
         ).dicts()
 
         text = get_when_raid_text()
 
         for user in users:
-            self.message_manager.send_message(chat_id=user["chat_id"], text=text)
+            self.message_manager.send_message(
+                chat_id=user["chat_id"],
+                text=text,
+                dedupe_key=f"notify_raid_3:{user['chat_id']}:{last_raid_time:%Y%m%d%H}",
+            )
 
     def _notification_when_raid_tz_10(self):
         last_raid_time = get_last_raid_date()
@@ -108,13 +120,18 @@ class NotificationsModule(BasicModule):
                 & (RaidAssign.time > last_raid_time)
                 & (Settings.pings["notify_raid_tz_10"] == "true")
                 & (RaidAssign.km_assigned << constants.raid_kms_tz)
+                & Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids())
             )
         ).dicts()
 
         text = get_when_raid_text()
 
         for user in users:
-            self.message_manager.send_message(chat_id=user["chat_id"], text=text)
+            self.message_manager.send_message(
+                chat_id=user["chat_id"],
+                text=text,
+                dedupe_key=f"notify_raid_tz_10:{user['chat_id']}:{last_raid_time:%Y%m%d%H}",
+            )
 
     def _notification_when_raid_tz(self, kms: List[int]):
         def wrapper():
@@ -134,10 +151,16 @@ class NotificationsModule(BasicModule):
                     & (RaidAssign.time > last_raid_time)
                     & (Settings.pings["notify_raid_tz"] == "true")
                     & (RaidAssign.km_assigned << kms)
+                    & Player.telegram_user_id.not_in(UndeliverableChat.active_chat_ids())
                 )
             ).dicts()
 
             for user in users:
-                self.message_manager.send_message(chat_id=user["chat_id"], text=text, is_queued=False)
+                self.message_manager.send_message(
+                    chat_id=user["chat_id"],
+                    text=text,
+                    priority=0,
+                    dedupe_key=f"notify_raid_tz:{'-'.join(map(str, kms))}:{user['chat_id']}:{last_raid_time:%Y%m%d%H}",
+                )
 
         return wrapper
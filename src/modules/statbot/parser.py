@@ -1,21 +1,17 @@
+import time
 from typing import Optional
 
 import telegram
 from telegram.ext import MessageHandler, Dispatcher
 from telegram.ext.filters import Filters
 
-from src.core import EventManager, MessageManager, InnerUpdate
+from src.core import EventManager, MessageManager, InnerUpdate, metrics_registry
 from src.decorators.update import inner_update
 from src.decorators.users import get_player
 from src.modules import BasicModule
 from src.utils.functions import CustomFilters
-from src.wasteland_wars.parsers import (
-    parse_pipboy,
-    parse_gang_panel,
-    parse_goat_panel,
-    parse_raid_reward,
-    parse_showdata,
-)
+from src.wasteland_wars.parsers import parse_forward
+from src.wasteland_wars.enums import MessageKind
 from src.wasteland_wars.schemas import (
     Profile,
     GangPanel,
@@ -42,10 +38,14 @@ class GroupParseResult(InnerUpdate):
         self.goat: Optional[GoatPanel] = None
 
 
+PARSE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
 class ParserModule(BasicModule):
     """
     responds to forwards in group 1 (not default 10 and not activity 0)
-    as a result make EventManager trigger WWHandlers in other modules
+    as a result make EventManager trigger WWHandlers in other modules.
+    A forward is classified by cheap markers first and only the parsers of its kinds are run
     """
 
     module_name = "parser"
@@ -59,6 +59,11 @@ class ParserModule(BasicModule):
     ):
         self.add_handler(MessageHandler(CustomFilters.ww_forwarded & Filters.text, self._text))
 
+        self._forwards = metrics_registry.counter("ww_forwards", "Game bot forwards by message kind", ["kind"])
+        self._parse_seconds = metrics_registry.histogram(
+            "ww_forward_parse_seconds", "Classifying and parsing a forward", ["kind"], buckets=PARSE_BUCKETS
+        )
+
         super().__init__(event_manager, message_manager, dispatcher)
 
     @inner_update(PlayerParseResult)
@@ -68,18 +73,23 @@ class ParserModule(BasicModule):
         if message.text is None:
             return
 
-        player_info_parsed = update
+        started_at = time.perf_counter()
+        parsed = parse_forward(message.text, message.forward_date)
 
-        player_info_parsed.profile = parse_pipboy(message)
-        player_info_parsed.raid = parse_raid_reward(message)
-        player_info_parsed.showdata = parse_showdata(message)
+        player_info_parsed = update
+        player_info_parsed.profile = parsed.get(MessageKind.PIPBOY)
+        player_info_parsed.raid = parsed.get(MessageKind.RAID_REWARD)
+        player_info_parsed.showdata = parsed.get(MessageKind.SHOWDATA)
 
         group_info_parsed = GroupParseResult(update.telegram_update)
         group_info_parsed.invoker = player_info_parsed.invoker
         group_info_parsed.player = player_info_parsed.player
+        group_info_parsed.gang = parsed.get(MessageKind.GANG_PANEL)
+        group_info_parsed.goat = parsed.get(MessageKind.GOAT_PANEL)
 
-        group_info_parsed.gang = parse_gang_panel(message)
-        group_info_parsed.goat = parse_goat_panel(message)
+        kind = "+".join(sorted(parsed)) or MessageKind.UNKNOWN
+        self._forwards.inc(kind=kind)
+        self._parse_seconds.observe(time.perf_counter() - started_at, kind=kind)
 
         self.event_manager.invoke_handler_update(player_info_parsed)
         self.event_manager.invoke_handler_update(group_info_parsed)
@@ -215,7 +215,7 @@ class RaidModule(BasicModule):
 
         super().__init__(event_manager, message_manager, dispatcher)
 
-        self.event_manager.scheduler.add_job(self._raids21_z, "cron", day_of_week="mon-sun", hour=1, minute=1)
+        self.event_manager.add_leader_job(self._raids21_z, "cron", day_of_week="mon-sun", hour=1, minute=1)
 
     def _update_from_panel_gang(self, update: GroupParseResult):
         message = update.telegram_update.message
@@ -506,6 +506,7 @@ class RaidModule(BasicModule):
                 chat_id=chat_id,
                 is_queued=True,
                 text=self.get_assigned_message(raid_assigned),
+                dedupe_key=f"sendpin:{player.id}:{raid_assigned.time:%Y%m%d%H}:{raid_assigned.km_assigned}",
             )
 
         if message.chat_id == settings.GOAT_ADMIN_CHAT_ID:
@@ -47,8 +47,6 @@ class BytesIOWrapper(RawIOBase):
 
 
 class RatingAbstractModule(BasicModule):
-    stream: StringIO
-
     COMMANDS: Dict[str, RatingFieldInfo] = {
         "bmtop": {"field": Player.sum_stat, "label": "Топ игроков", "visible": False},
         "rushtop": {"field": Player.attack, "label": "Топ дамагеров", "visible": False},
@@ -75,13 +73,12 @@ class RatingAbstractModule(BasicModule):
 
     def _top(self, field_data: RatingFieldInfo):
         def handler(self, update: InnerUpdate):
-            with StringIO() as self.stream:
-                self._send_message(
-                    update.effective_chat_id,
-                    update.player,
-                    field_data,
-                    update.command.argument,
-                )
+            self._send_message(
+                update.effective_chat_id,
+                update.player,
+                field_data,
+                update.command.argument,
+            )
 
         handler.__doc__ = f'Выдает {field_data["label"].lower()}'
         return partial(handler, self)
@@ -163,17 +160,16 @@ class RatingModule(RatingAbstractModule):
         if group:
             label = f"{label} группы {group.name}"
 
-        self._write_msg(
+        text = self._write_msg(
             player,
             Player.get_top(field_data["field"], group),
             label,
             field_data["visible"],
         )
-        self.stream.seek(0)
 
-        self.message_manager.send_message(chat_id=chat_id, text=self.stream.read())
+        self.message_manager.send_message(chat_id=chat_id, text=text)
 
-    def _write_msg(self, player_called: Player, query, label: str, visible: bool):
+    def _write_msg(self, player_called: Player, query, label: str, visible: bool) -> str:
         rating: List[str] = [f"<b>{html.escape(label)}</b>:"]
         for index, player in enumerate(query, 1):
             if index < self.TOP_SIZE or player_called.nickname == player.nickname:
@@ -181,8 +177,7 @@ class RatingModule(RatingAbstractModule):
                     rating.append("    ... ")
                 rating.append(self._format_record(index, player, player_called, visible))
 
-        text = "\n".join(rating)
-        self.stream.write(text)
+        return "\n".join(rating)
 
     def _format_record(self, _: int, player: Player, called: Player, visible: bool) -> str:
         if player.nickname == called.nickname:
@@ -219,23 +214,21 @@ class AdminRatingModule(RatingAbstractModule):
     def _top(self, field_data: RatingFieldInfo):
         @permissions(is_admin)
         def handler(self, update: InnerUpdate):
-            with StringIO() as self.stream:
-                self._send_message(update.effective_chat_id, update.player, field_data)
+            self._send_message(update.effective_chat_id, update.player, field_data)
 
         return partial(handler, self)
 
     def _send_message(self, chat_id: int, from_player: Player, field_data: RatingFieldInfo):
         self.message_manager.send_message(chat_id=chat_id, text="Подожди, сейчас подготовлю файл")
 
-        self._write_msg(from_player, Player.get_top(field_data["field"]), field_data["label"])
+        text = self._write_msg(from_player, Player.get_top(field_data["field"]), field_data["label"])
 
-        self.stream.seek(0)
-
-        self.message_manager.bot.send_document(
-            chat_id=chat_id, document=BytesIOWrapper(self.stream), filename="top.html"
-        )
+        with StringIO(text) as stream:
+            self.message_manager.bot.send_document(
+                chat_id=chat_id, document=BytesIOWrapper(stream), filename="top.html"
+            )
 
-    def _write_msg(self, _: Player, query, label: str):
+    def _write_msg(self, _: Player, query, label: str) -> str:
         total = 0
         tops: List[Dict[str, Any]] = []
 
@@ -249,8 +242,7 @@ class AdminRatingModule(RatingAbstractModule):
             )
             total += player.value
 
-        text = self._rating_template.render(tops=tops, total=total, caption=label)
-        self.stream.write(text)
+        return self._rating_template.render(tops=tops, total=total, caption=label)
 
     def _format_record(self, _: int, player: Player) -> str:
         activity_flag = player.get_activity_flag()
@@ -22,7 +22,7 @@ from src.core import (
     CommandFilter,
     Command,
 )
-from src.decorators import permissions, command_handler
+from src.decorators import permissions, command_handler, UpdateContext
 from src.decorators.chat import get_chat
 from src.decorators.permissions import is_admin, or_, self_, is_lider
 from src.decorators.update import inner_update
@@ -736,9 +736,13 @@ class StatModule(BasicModule):
                 return self.message_manager.send_message(
                     chat_id=invoker.chat_id, text=formatted_report, reply_markup=markup
                 )
-            return update.telegram_update.callback_query.edit_message_text(
-                text=formatted_report, reply_markup=markup, parse_mode="HTML"
+            self.message_manager.edit_message_text(
+                chat_id=message.chat_id,
+                message_id=message.message_id,
+                text=formatted_report,
+                reply_markup=markup,
             )
+            return update.telegram_update.callback_query.answer()
 
     @inner_update()
     @get_player
@@ -863,9 +867,13 @@ class StatModule(BasicModule):
                     text=formatted_report,
                     reply_markup=reply_markup,
                 )
-            return update.telegram_update.callback_query.edit_message_text(
-                text=formatted_report, reply_markup=reply_markup, parse_mode="HTML"
+            self.message_manager.edit_message_text(
+                chat_id=message.chat_id,
+                message_id=message.message_id,
+                text=formatted_report,
+                reply_markup=reply_markup,
             )
+            return update.telegram_update.callback_query.answer()
 
     @get_users(include_reply=True, break_if_no_users=False)
     @permissions(or_(is_admin, self_))
@@ -1007,6 +1015,7 @@ class StatModule(BasicModule):
             )
 
         self._update_player(player, profile, message.chat_id)
+        UpdateContext.of(update.telegram_update).player = player
 
         if not created:
             return
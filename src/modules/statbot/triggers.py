@@ -5,9 +5,11 @@ import re
 import time
 from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple, Pattern, Match, Optional
+from typing import Dict, List, Tuple, Match, Optional
 
 from pytils import dt
+from telegram import Message
+from telegram.error import BadRequest
 from telegram.ext import MessageHandler, Dispatcher
 from telegram.ext.filters import Filters
 
@@ -18,6 +20,7 @@ from src.core import (
     CommandFilter,
     CommandNameFilter,
     InnerUpdate,
+    CallbackResults,
 )
 from src.decorators import command_handler, permissions
 from src.decorators.chat import get_chat
@@ -27,6 +30,7 @@ from src.decorators.users import get_player
 from src.models import Trigger, TelegramUser
 from src.modules import BasicModule
 from src.utils.functions import CustomInnerFilters
+from src.utils.trigger_matcher import TriggerMatcher
 
 
 class TriggersModule(BasicModule):
@@ -88,39 +92,28 @@ class TriggersModule(BasicModule):
         self.add_handler(MessageHandler(Filters.text | Filters.command, self._triggered))
         self.add_handler(MessageHandler(Filters.status_update.new_chat_members, self._triggered_actions))
 
-        self.regexps: Dict[int, List[Tuple[Pattern[str], int, Dict[str, bool]]]] = {}
+        self.matchers: Dict[int, TriggerMatcher[Tuple[int, Dict[str, bool]]]] = {}
 
         super().__init__(event_manager, message_manager, dispatcher)
 
     def startup(self):
-        self.refresh_regexes()
+        self.refresh_matchers()
 
-    def refresh_regexes(self):
-        self.regexps.clear()
+    def refresh_matchers(self):
+        """Rebuilds the matcher of every chat, triggers are matched in the order they were added"""
+        triggers: Dict[int, List[Tuple[str, bool, bool, Tuple[int, Dict[str, bool]]]]] = {}
 
-        for trigger in Trigger.select():
-            regexp = self._generate_regexp(trigger)
+        for trigger in Trigger.select().order_by(Trigger.id):
             options = {
                 "is_admin": trigger.admin_only,
                 "pin": trigger.pin_message,
                 "repling": trigger.repling,
             }
+            triggers.setdefault(trigger.chat_id, []).append(
+                (trigger.request, trigger.in_message, trigger.ignore_case, (trigger.id, options))
+            )
 
-            regexes = self.regexps.get(trigger.chat.chat_id)
-            if regexes is None:
-                regexes = []
-
-            regexes.append((regexp, trigger.id, options))
-            self.regexps[trigger.chat.chat_id] = regexes
-
-    def _generate_regexp(self, trigger):
-        regex = r"[\s\S]*(?P<trigger>{})[\s\S]*" if trigger.in_message else r"(?P<trigger>{})"
-        trigger_regex = regex.format(re.escape(trigger.request))
-
-        if trigger.ignore_case:
-            return re.compile(trigger_regex, re.IGNORECASE)
-
-        return re.compile(trigger_regex)
+        self.matchers = {chat_id: TriggerMatcher(chat_triggers) for chat_id, chat_triggers in triggers.items()}
 
     @permissions(is_admin)
     def _trigger_help(self, update: InnerUpdate):
@@ -145,19 +138,15 @@ class TriggersModule(BasicModule):
         if not update.chat:
             return
 
-        triggers = self.regexps.get(message.chat_id)
-        if not triggers:
+        matcher = self.matchers.get(message.chat_id)
+        if not matcher:
             return
 
         trigger_string = message.text
         if trigger_string in ["!welcome-new", "!welcome-old"]:
             return
 
-        for pattern, trigger_id, options in triggers:
-            match = pattern.match(trigger_string)
-            if match is None:
-                continue
-
+        for trigger_id, options in matcher.match(trigger_string):
             if options.get("is_admin", False) > update.invoker.is_admin:
                 continue
 
@@ -172,14 +161,17 @@ class TriggersModule(BasicModule):
                 return
 
             if pin:
-                try:
-                    self.message_manager.bot.pin_chat_message(
-                        chat_id=mess.chat_id,
-                        message_id=mess.message_id,
-                        disable_notification=False,
-                    )
-                except (Exception,):
-                    self.logger.warning(f"Не смог запинить триггер {trigger_id}")
+                self.message_manager.pin_chat_message(
+                    chat_id=mess.chat_id,
+                    message_id=mess.message_id,
+                    disable_notification=False,
+                    callback=self._pin_callback,
+                    callback_args=trigger_id,
+                )
+
+    def _pin_callback(self, callback_results: CallbackResults):
+        if callback_results.error:
+            self.logger.warning(f"Не смог запинить триггер {callback_results.args}")
 
     def _trigger_formatter(
         self,
@@ -234,19 +226,12 @@ class TriggersModule(BasicModule):
         if update.chat is None:
             return
 
-        triggers = self.regexps.get(message.chat_id)
-        if not triggers:
+        matcher = self.matchers.get(message.chat_id)
+        if not matcher:
             return
 
-        new_player_triggers: List[Tuple[int, Dict[str, bool]]] = []
-        old_player_triggers: List[Tuple[int, Dict[str, bool]]] = []
-
-        for regexp, trigger_id, options in triggers:
-            if regexp.match("!welcome-new"):
-                new_player_triggers.append((trigger_id, options))
-
-            if regexp.match("!welcome-old"):
-                old_player_triggers.append((trigger_id, options))
+        new_player_triggers = matcher.match("!welcome-new")
+        old_player_triggers = matcher.match("!welcome-old")
 
         for user in message.new_chat_members:
             telegram_user = TelegramUser.get_or_none(user_id=user.id)
@@ -324,26 +309,54 @@ class TriggersModule(BasicModule):
         if reply:
             kwargs.update({"reply_to_message_id": message.message_id})
 
+        bot = self.message_manager.bot
         if trigger.type == "text":
             m = self.message_manager.send_message(parse_mode="HTML", **kwargs)
         elif trigger.type == "audio":
-            m = self.message_manager.bot.send_audio(audio=open(trigger.file_path, "rb"), **kwargs)
+            m = self._send_file(trigger, bot.send_audio, "audio", **kwargs)
         elif trigger.type == "document":
-            m = self.message_manager.bot.send_document(
-                document=open(trigger.file_path, "rb"),
+            m = self._send_file(
+                trigger,
+                bot.send_document,
+                "document",
                 filename=f"{formatter(trigger.answer)}{Path(trigger.file_path).suffix}",
                 **kwargs,
             )
         elif trigger.type == "photo":
-            m = self.message_manager.bot.send_photo(photo=open(trigger.file_path, "rb"), **kwargs)
+            m = self._send_file(trigger, bot.send_photo, "photo", **kwargs)
         elif trigger.type == "sticker":
-            m = self.message_manager.bot.send_sticker(sticker=open(trigger.file_path, "rb"), **kwargs)
+            m = self._send_file(trigger, bot.send_sticker, "sticker", **kwargs)
         elif trigger.type == "video":
-            m = self.message_manager.bot.send_video(video=open(trigger.file_path, "rb"), **kwargs)
+            m = self._send_file(trigger, bot.send_video, "video", **kwargs)
         else:
             m = False
         return m
 
+    def _send_file(self, trigger: Trigger, send, argument: str, **kwargs) -> Message:
+        """
+        Sends the trigger file by its Telegram file_id, the file is uploaded only on the first send
+        or when Telegram does not accept the file_id anymore
+        """
+        if trigger.file_id:
+            try:
+                return send(**{argument: trigger.file_id}, **kwargs)
+            except BadRequest as e:
+                self.logger.warning(f"file_id триггера {trigger.id} не принят ({e.message}), загружаю файл")
+
+        with open(trigger.file_path, "rb") as file:
+            message = send(**{argument: file}, **kwargs)
+
+        attachment = message.effective_attachment
+        if isinstance(attachment, list):  # photo sizes, the last one is the original
+            attachment = attachment[-1]
+
+        file_id = getattr(attachment, "file_id", None)
+        if file_id and file_id != trigger.file_id:
+            Trigger.update(file_id=file_id).where(Trigger.id == trigger.id).execute()
+            trigger.file_id = file_id
+
+        return message
+
     def _triggers_ls(self, remove=False):
         def handler(self, update: InnerUpdate):
             if not update.chat:
@@ -455,7 +468,7 @@ class TriggersModule(BasicModule):
             text="Вжух и я добавил триггер!\n\tСписок триггеров: /triggers",
         )
 
-        self.refresh_regexes()
+        self.refresh_matchers()
 
     @permissions(is_admin)
     @command_handler(argument_miss_msg='Пришли сообщение в формате "/trigger_remove Название"')
@@ -492,7 +505,7 @@ class TriggersModule(BasicModule):
             chat_id=message.chat_id,
             text=f'Триггер "{trigger_r}" <b>удалён навсегда!</b>',
         )
-        self.refresh_regexes()
+        self.refresh_matchers()
 
     @permissions(is_admin)
     def _trigger_remove_id(self, update: InnerUpdate):
@@ -525,7 +538,7 @@ class TriggersModule(BasicModule):
             chat_id=message.chat_id,
             text=f"Триггер с id={trigger_id} <b>удалён навсегда!</b>",
         )
-        self.refresh_regexes()
+        self.refresh_matchers()
 
     def download_file(self, object_):
         file = object_.get_file()
@@ -0,0 +1,112 @@
+import collections
+from typing import Dict, Generic, Iterable, List, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Automaton:
+    """
+    Aho–Corasick automaton over literal requests. Prefix requests are found by walking the trie
+    from the start of the text, in_message ones by one scan over the whole text along the failure links
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.prefix: List[List[int]] = [[]]  # node -> indexes of the requests which must start the text
+        self.anywhere: List[List[int]] = [[]]  # node -> indexes of the requests found anywhere, inherited over fail
+        self.has_anywhere = False
+        self.is_empty = True
+
+    def add(self, request: str, index: int, in_message: bool):
+        self.is_empty = False
+        node = 0
+        for char in request:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.prefix.append([])
+                self.anywhere.append([])
+            node = next_node
+
+        if in_message:
+            self.anywhere[node].append(index)
+            self.has_anywhere = True
+        else:
+            self.prefix[node].append(index)
+
+    def build(self):
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+
+                if node:
+                    fail = self.fail[node]
+                    while fail and char not in self.goto[fail]:
+                        fail = self.fail[fail]
+                    self.fail[child] = self.goto[fail].get(char, 0)
+                self.anywhere[child] = self.anywhere[child] + self.anywhere[self.fail[child]]
+
+    def search(self, text: str, hits: Set[int]):
+        goto, prefix = self.goto, self.prefix
+
+        hits.update(prefix[0])
+        node = 0
+        for char in text:
+            node = goto[node].get(char)
+            if node is None:
+                break
+            hits.update(prefix[node])
+
+        if not self.has_anywhere:
+            return
+
+        fail, anywhere = self.fail, self.anywhere
+        hits.update(anywhere[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if anywhere[node]:
+                hits.update(anywhere[node])
+
+
+class TriggerMatcher(Generic[T]):
+    """
+    Finds the triggers of a text in one pass: the requests the text starts with,
+    or contains for in_message triggers. Case insensitive requests are matched against the lowercased text,
+    which folds a few letters unlike re.IGNORECASE: the dotted İ, the long ſ and the Greek final sigma.
+    `triggers` are (request, in_message, ignore_case, value), match() returns the values in the same order
+    """
+
+    def __init__(self, triggers: Iterable[Tuple[str, bool, bool, T]]):
+        self._values: List[T] = []
+        self._sensitive = _Automaton()
+        self._folded = _Automaton()
+
+        for index, (request, in_message, ignore_case, value) in enumerate(triggers):
+            self._values.append(value)
+            if ignore_case:
+                self._folded.add(request.lower(), index, in_message)
+            else:
+                self._sensitive.add(request, index, in_message)
+
+        self._sensitive.build()
+        self._folded.build()
+
+    def match(self, text: str) -> List[T]:
+        hits: Set[int] = set()
+        if not self._sensitive.is_empty:
+            self._sensitive.search(text, hits)
+        if not self._folded.is_empty:
+            self._folded.search(text.lower(), hits)
+        return [self._values[index] for index in sorted(hits)]
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -1,12 +1,21 @@
 from typing import Dict, List, Tuple, Set
 
-from src.wasteland_wars.enums import Fraction
+from src.wasteland_wars.enums import Fraction, MessageKind
 
 chat_id = 430930191
 
 raid_kms: Set[int] = {5, 9, 12, 16, 20, 24, 28, 32, 38, 46, 53, 54, 57, 63}
 raid_kms_tz: Set[int] = {24, 28, 32, 38, 53, 57, 63}
 
+# Literals every text of the kind contains, taken from the parser regexes: a text without them can not match
+MESSAGE_KIND_MARKERS: Dict[MessageKind, Tuple[str, ...]] = {
+    MessageKind.PIPBOY: ("❤️Здоровье:", "👤"),  # full and short profile
+    MessageKind.RAID_REWARD: ("Рейд",),
+    MessageKind.SHOWDATA: ("Доступ",),
+    MessageKind.GANG_PANEL: ("Панель банды.",),
+    MessageKind.GOAT_PANEL: ("козла.",),
+}
+
 
 KEY_STAT_ICON_BY_NAME: Dict[str, str] = {
     "hp": "❤️",
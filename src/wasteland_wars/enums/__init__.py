@@ -1 +1,2 @@
 from .fraction import Fraction
+from .message_kind import MessageKind
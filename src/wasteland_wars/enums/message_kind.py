@@ -0,0 +1,11 @@
+from enum import StrEnum
+
+
+class MessageKind(StrEnum):
+    PIPBOY = "pipboy"
+    RAID_REWARD = "raid_reward"
+    SHOWDATA = "showdata"
+    GANG_PANEL = "gang_panel"
+    GOAT_PANEL = "goat_panel"
+
+    UNKNOWN = "unknown"
@@ -3,3 +3,4 @@ from .parse_goat_panel import parse_goat_panel
 from .parse_pipboy import parse_pipboy
 from .parse_raid_reward import parse_raid_reward
 from .parse_showdata import parse_showdata
+from .bulk import PARSERS, parse_forward, parse_forwards
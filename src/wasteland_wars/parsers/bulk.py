@@ -0,0 +1,61 @@
+import concurrent.futures
+import datetime
+import itertools
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.wasteland_wars.enums import MessageKind
+from src.wasteland_wars.schemas import GangPanel, GoatPanel, Profile, RaidReward, ShowData
+from src.wasteland_wars.utils import get_message_kinds
+from .parse_gang_panel import parse_gang_panel
+from .parse_goat_panel import parse_goat_panel
+from .parse_pipboy import parse_pipboy
+from .parse_raid_reward import parse_raid_reward
+from .parse_showdata import parse_showdata
+
+Record = Tuple[str, datetime.datetime]  # text and forward_date of a game bot forward
+Schema = Union[Profile, RaidReward, ShowData, GangPanel, GoatPanel]
+ParseResults = Dict[MessageKind, Schema]
+
+PARSERS: Dict[MessageKind, Callable[[str, datetime.datetime], Optional[Schema]]] = {
+    MessageKind.PIPBOY: parse_pipboy,
+    MessageKind.RAID_REWARD: parse_raid_reward,
+    MessageKind.SHOWDATA: parse_showdata,
+    MessageKind.GANG_PANEL: parse_gang_panel,
+    MessageKind.GOAT_PANEL: parse_goat_panel,
+}
+
+
+def parse_forward(text: str, forward_date: datetime.datetime) -> ParseResults:
+    """Runs the parsers of the kinds the text is classified as, returns the results which matched"""
+    results: ParseResults = {}
+    for kind in get_message_kinds(text):
+        if (result := PARSERS[kind](text, forward_date)) is not None:
+            results[kind] = result
+    return results
+
+
+def _parse_chunk(records: List[Record]) -> List[ParseResults]:
+    return [parse_forward(text, forward_date) for text, forward_date in records]
+
+
+def parse_forwards(
+    records: Iterable[Record], workers: Optional[int] = None, chunk_size: int = 500
+) -> Iterator[ParseResults]:
+    """
+    Parses archived forwards on all cores, the results are yielded in the order of the records.
+    Records are sent to the workers in chunks and at most two chunks per worker are in flight,
+    so an archive of any size is streamed
+    """
+    records = iter(records)
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+
+    workers = workers or os.cpu_count() or 1
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = [pool.submit(_parse_chunk, chunk) for chunk in itertools.islice(chunks, 2 * workers)]
+        while pending:
+            results = pending.pop(0).result()
+            if chunk := next(chunks, None):
+                pending.append(pool.submit(_parse_chunk, chunk))
+            yield from results
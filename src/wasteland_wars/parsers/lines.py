@@ -0,0 +1,39 @@
+import itertools
+from typing import Iterable, List, Optional
+
+
+class Lines:
+    """
+    The text of a message split into lines once. Labelled lines are found by prefix,
+    offset() maps a line back to the text for the regex searches which continue after a layout
+    """
+
+    __slots__ = ("text", "lines", "_offsets")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: List[str] = text.split("\n")
+        self._offsets: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __getitem__(self, index: int) -> str:
+        return self.lines[index] if 0 <= index < len(self.lines) else ""
+
+    def index(self, prefix: str, start: int = 0) -> Optional[int]:
+        for index in range(start, len(self.lines)):
+            if self.lines[index].startswith(prefix):
+                return index
+        return None
+
+    def offset(self, index: int) -> int:
+        """Position of the line in the text"""
+        if self._offsets is None:
+            self._offsets = [0, *itertools.accumulate(len(line) + 1 for line in self.lines)]
+        return self._offsets[index]
+
+
+def contains_all(text: str, literals: Iterable[str]) -> bool:
+    """Whether a regex which requires all the literals may match at all"""
+    return all(literal in text for literal in literals)
@@ -1,11 +1,11 @@
+import datetime
 import re
-from typing import Optional, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from telegram import Message
+from src.wasteland_wars.schemas import GangPanel, GangMember, build
+from .lines import Lines, contains_all
 
-from src.wasteland_wars.schemas import GangPanel, GangMember
-
-goat_panel_regex = re.compile(
+gang_panel_regex = re.compile(
     r"^🤘\s+(?P<gang_name>.+)\s+🏅(?P<ears>\d+)\n"
     r"Панель банды\.\n\n"
     r"Главарь\n"
@@ -17,39 +17,122 @@ goat_panel_regex = re.compile(
 gang_member_regex = re.compile(
     r"(.{1,2})\s+" r"(?P<nickname>.+)" r"👂(?P<ears>\d+)\s+" r"(?P<state>.)(?P<kilometr>\d+)km"
 )
+gang_member_tail_regex = re.compile(r"👂(?P<ears>\d+)\s+" r"(?P<state>.)(?P<kilometr>\d+)km")
+whitespace_regex = re.compile(r"\s+")
+
+GANG_PANEL_LITERALS = ("Панель банды.", "Главарь", "Козёл", "/goat", "Участники")
+
+gang_panel_layout = (  # line index, its regex: a line per field of the panel header
+    (0, re.compile(r"🤘\s+(?P<gang_name>.+)\s+🏅(?P<ears>\d+)")),
+    (1, re.compile(r"Панель банды\.")),
+    (2, re.compile(r"")),
+    (3, re.compile(r"Главарь")),
+    (4, re.compile(r"⚜️\s+(?P<leader_nickname>.+)")),
+    (5, re.compile(r"")),
+    (6, re.compile(r"Козёл")),
+    (7, re.compile(r"🐐\s+(?P<goat_name>.+)\s+/goat")),
+    (8, re.compile(r"")),
+)
+members_line_regex = re.compile(r"Участники\s+\((?P<members_count>\d+)/(?P<available_members_count>\d+)\)")
+
+GangPanelMatch = Tuple[Dict[str, str], int]  # groups of gang_panel_regex, end of the match
+
 
+def _match_gang_panel_lines(lines: Lines) -> Optional[GangPanelMatch]:
+    groups: Dict[str, str] = {}
+    for index, regex in gang_panel_layout:
+        if not (match := regex.fullmatch(lines[index])):
+            return
+        groups.update(match.groupdict())
 
-def parse_gang_panel(message: Message) -> Optional[GangPanel]:
-    if not (match := goat_panel_regex.search(message.text)):
+    if not (match := members_line_regex.match(lines[9])):
         return
+    groups.update(match.groupdict())
+    return groups, lines.offset(9) + match.end()
+
+
+def _match_gang_panel(text: str) -> Optional[GangPanelMatch]:
+    """The usual layout line by line, the regex for the layouts it does not know"""
+    if not text.startswith("🤘"):
+        return
+
+    if found := _match_gang_panel_lines(Lines(text)):
+        return found
+    if contains_all(text, GANG_PANEL_LITERALS) and (match := gang_panel_regex.search(text)):
+        return match.groupdict(), match.end()
 
-    (
-        gang_name,
-        leader_nickname,
-        goat_name,
-        gang_ears,
-        members_count,
-        available_members_count,
-    ) = match.group(
-        "gang_name",
-        "leader_nickname",
-        "goat_name",
-        "ears",
-        "members_count",
-        "available_members_count",
-    )
 
-    startpos = match.end()
+def _find_members(text: str, pos: int) -> Iterator[re.Match]:
+    """
+    The matches of gang_member_regex.finditer(text, pos) in linear time.
+    A match needs whitespace after its first one or two characters, and the nickname starts in the line
+    where that whitespace ends, so the line must have a member tail after it. The regex is only tried
+    before such whitespace, a line without a tail is not backtracked over from each of its positions
+    """
+    line_end = tail = -1  # end of the line the latest whitespace ends in, its rightmost member tail
+    search_from = pos
+    while run := whitespace_regex.search(text, search_from):
+        start, end = run.span()
+        search_from = end
+        if end == len(text):
+            return
+
+        if end > line_end:
+            line_start = text.rfind("\n", 0, end) + 1
+            line_end = text.find("\n", end)
+            if line_end == -1:
+                line_end = len(text)
+            tail = text.rfind("👂", line_start, line_end)
+            while tail != -1 and not gang_member_tail_regex.match(text, tail):
+                tail = text.rfind("👂", line_start, tail)
+        if tail < end:
+            continue
+
+        for position in range(max(pos, start - 2), end - 1):
+            if match := gang_member_regex.match(text, position):
+                yield match
+                pos = search_from = match.end()
+                break
+
+
+def _match_members(text: str, startpos: int) -> Iterator[re.Match]:
+    """
+    Members after the panel header, same as gang_member_regex.finditer(text, startpos + 1).
+    Usually every line after the header is a member matched whole, which the regex matches the same way
+    """
+    if text.startswith("\n", startpos):
+        matches = []
+        for line in text[startpos + 1 :].split("\n"):
+            if not line:
+                continue
+            if not (match := gang_member_regex.match(line)) or match.end() != len(line):
+                break
+            matches.append(match)
+        else:
+            return iter(matches)
+
+    return _find_members(text, startpos + 1)
+
+
+def parse_gang_panel(text: str, forward_date: datetime.datetime) -> Optional[GangPanel]:
+    if not (found := _match_gang_panel(text)):
+        return
+
+    groups, startpos = found
+    gang_name, leader_nickname, goat_name, gang_ears = (
+        groups[name] for name in ("gang_name", "leader_nickname", "goat_name", "ears")
+    )
 
     members: List[GangMember] = []
-    for match in gang_member_regex.finditer(message.text, startpos + 1):
+    for match in _match_members(text, startpos):
         nickname, state, ears, kilometr = match.group("nickname", "state", "ears", "kilometr")
 
-        members.append(GangMember(nickname=nickname, ears=ears, kilometr=kilometr, status=state))
+        members.append(build(GangMember, nickname=nickname, ears=int(ears), kilometr=int(kilometr), status=state))
 
-    gang_panel = GangPanel(
+    gang_panel = build(
+        GangPanel,
         name=gang_name,
-        ears=gang_ears,
+        ears=int(gang_ears),
         leader_nickname=leader_nickname,
         goat_name=goat_name,
         members=members,
@@ -1,9 +1,9 @@
+import datetime
 import re
-from typing import Optional, List
+from typing import Dict, Iterable, List, Match, Optional, Tuple
 
-from telegram import Message
-
-from src.wasteland_wars.schemas import GoatPanel, GoatGangMember
+from src.wasteland_wars.schemas import GoatPanel, GoatGangMember, build
+from .lines import Lines, contains_all
 
 gang_in_goat_regex = re.compile(r"🤘(?P<gang_name>.+)\s+💥(?P<combat_power>\d+) (/gcr_(?P<gang_id>\d+)|🔐)")
 
@@ -20,40 +20,97 @@ goat_panel_regex = re.compile(
     r"🐐\s+👊\s+(?P<goat_raid_combat_power>\d+)\s+/\s+(?P<goat_combat_power>\d+)"
 )
 
+GOAT_PANEL_LITERALS = ("Панель", "козла.", "Уровень:", "🚩Лига:", "🏆 Рейтинг:", "Лидер", "Банды-участники", "👊")
+
+goat_panel_layout = (  # line index from the header, its regex: a line per field of goat_panel_regex
+    (0, re.compile(r"🐐\s+(?P<goat_name>.+)")),
+    (1, re.compile(r"Панель\s+козла\.")),
+    (2, re.compile(r"")),
+    (3, re.compile(r"🏅\s+Уровень:\s\d+\s*")),
+    (4, re.compile(r"🚩Лига:\s(?P<league_name>.+)")),
+    (5, re.compile(r"🏆 Рейтинг:\s+(?P<rating>\d+)")),
+    (6, re.compile(r"")),
+    (7, re.compile(r"Лидер")),
+    (8, re.compile(r"⚜️\s+(?P<leader_nickname>.+)")),
+    (9, re.compile(r"")),
+    (10, re.compile(r"Банды-участники\s+\((?P<gangs_count>\d+)/(?P<gangs_available_count>\d+)\)\s*")),
+)
+footer_line_regex = re.compile(r"🐐\s+👊\s+(?P<goat_raid_combat_power>\d+)\s+/\s+(?P<goat_combat_power>\d+)")
+
+GoatPanelMatch = Tuple[Dict[str, str], Iterable[Match]]  # groups of goat_panel_regex, gang_in_goat_regex matches
+
+
+def _match_goat_panel_lines(lines: Lines) -> Optional[GoatPanelMatch]:
+    """
+    The usual layout: a line per field and a line per gang between the header and the footer, the only 🐐 lines.
+    The gangs are then searched in their lines only, which finds what gang_in_goat_regex finds in the whole text
+    as long as all 🤘 are there and no line starts with 💥 for a gang match to continue on
+    """
+    text = lines.text
+    if text.count("🐐") != 2 or (header := lines.index("🐐")) is None:
+        return
+
+    groups: Dict[str, str] = {}
+    for offset, regex in goat_panel_layout:
+        if not (match := regex.fullmatch(lines[header + offset])):
+            return
+        groups.update(match.groupdict())
+
+    gangs_start = header + len(goat_panel_layout)
+    footer = lines.index("🐐", gangs_start)
+    if footer is None or not "\n".join(lines.lines[gangs_start:footer]):  # (?P<gangs>[\s\S]+) is not empty
+        return
+    if not (match := footer_line_regex.match(lines[footer])):
+        return
+    groups.update(match.groupdict())
+
+    gang_lines = lines.lines[gangs_start:footer]
+    if sum(line.count("🤘") for line in gang_lines) != text.count("🤘"):
+        return
+    if any(line.lstrip().startswith("💥") for line in lines.lines):
+        return
+
+    return groups, (match for line in gang_lines for match in gang_in_goat_regex.finditer(line))
+
+
+def _match_goat_panel(text: str) -> Optional[GoatPanelMatch]:
+    """The usual layout line by line, the regex for the layouts it does not know"""
+    if "🐐" not in text:
+        return
+
+    if found := _match_goat_panel_lines(Lines(text)):
+        return found
+    if contains_all(text, GOAT_PANEL_LITERALS) and (match := goat_panel_regex.search(text)):
+        return match.groupdict(), gang_in_goat_regex.finditer(text)
+
 
-def parse_goat_panel(message: Message) -> Optional[GoatPanel]:
-    if not (match := goat_panel_regex.search(message.text)):
+def parse_goat_panel(text: str, forward_date: datetime.datetime) -> Optional[GoatPanel]:
+    if not (found := _match_goat_panel(text)):
         return
 
-    goat_name, league_name, leader_nickname, gangs = match.group("goat_name", "league_name", "leader_nickname", "gangs")
-    (
-        gangs_count,
-        gangs_available_count,
-        rating,
-        goat_raid_combat_power,
-        goat_combat_power,
-    ) = match.group(
-        "gangs_count",
-        "gangs_available_count",
-        "rating",
-        "goat_raid_combat_power",
-        "goat_combat_power",
+    groups, gang_matches = found
+    goat_name, league_name, leader_nickname = (groups[name] for name in ("goat_name", "league_name", "leader_nickname"))
+    gangs_count, gangs_available_count, rating, goat_raid_combat_power, goat_combat_power = (
+        groups[name]
+        for name in ("gangs_count", "gangs_available_count", "rating", "goat_raid_combat_power", "goat_combat_power")
     )
 
     gangs: List[GoatGangMember] = []
-    for match in gang_in_goat_regex.finditer(message.text):
+    for match in gang_matches:
         gang_name, combat_power, gang_id = match.group("gang_name", "combat_power", "gang_id")
-        gangs.append(GoatGangMember(gang_name=gang_name, combat_power=combat_power, gang_id=gang_id))
+        gang_id = int(gang_id) if gang_id else None
+        gangs.append(build(GoatGangMember, gang_name=gang_name, combat_power=int(combat_power), gang_id=gang_id))
 
-    goat_panel = GoatPanel(
+    goat_panel = build(
+        GoatPanel,
         name=goat_name,
         league_name=league_name,
-        rating=rating,
+        rating=int(rating),
         leader_nickname=leader_nickname,
-        gangs_count=gangs_count,
-        gangs_available_count=gangs_available_count,
+        gangs_count=int(gangs_count),
+        gangs_available_count=int(gangs_available_count),
         gangs=gangs,
-        raid_combat_power=goat_raid_combat_power,
-        combat_power=goat_combat_power,
+        raid_combat_power=int(goat_raid_combat_power),
+        combat_power=int(goat_combat_power),
     )
     return goat_panel
@@ -1,10 +1,10 @@
+import datetime
 import re
-from typing import Optional, Match
+from typing import Dict, Match, Optional, Tuple
 
-from telegram import Message
-
-from src.wasteland_wars.schemas import Profile, PipboyStats
+from src.wasteland_wars.schemas import Profile, PipboyStats, build
 from src.wasteland_wars.utils import get_fraction_by_name
+from .lines import Lines, contains_all
 
 re_profile = re.compile(
     r"\n(?P<nic>[^\n]*),\s*(?P<fraction>[^\n]*)\s+"
@@ -37,14 +37,156 @@ telegram_user_id_regex = re.compile(r"ID(?P<user_id>\d+)")
 dzen_regex = re.compile(r"(🏵(\d+)|🏵+)")
 dzen_bars_regex = re.compile(r"[▓░]")
 
+# Literals each regex requires, a text without one of them is not searched with the regex
+PROFILE_LITERALS = (
+    "❤️Здоровье:",
+    "☠️Голод:",
+    "/myfood",
+    "⚔️Урон:",
+    "🛡Броня:",
+    "💪Сила:",
+    "🎯Меткость:",
+    "🗣Харизма:",
+    "🤸🏽‍♂️Ловкость:",
+    "🔋Выносливость:",
+    "/ref",
+    "📍",
+    "👣",
+    "км.",
+)
+PROFILE_SHORT_LITERALS = ("👤", "\n├🤟 ", "\n├❤️", "/", "👣", "\n├🔥")
+
+_BONUS = r"(\s*\([^)\n]*\))?"
+crew_line_regex = re.compile(r"🤟Банда:\s+(?P<crew>\S.*)")
+profile_fields = (  # the lines after the nickname one: label and the rest of the line
+    ("❤️Здоровье:", re.compile(r"\s+(?P<hp_now>\d+)/(?P<hp>\d+)\s*")),
+    ("☠️Голод:", re.compile(r"\s+(?P<hunger>\d+)%\s*/myfood\s*")),
+    ("⚔️Урон:", re.compile(rf"\s+(?P<attack>\d+){_BONUS}\s*")),
+    ("🛡Броня:", re.compile(rf"\s+(?P<armor>\d+){_BONUS}\s*")),
+    ("💪Сила:", re.compile(rf"\s+(?P<power>\d+){_BONUS}\s*")),
+    ("🎯Меткость:", re.compile(rf"\s+(?P<accuracy>\d+){_BONUS}\s*")),
+    ("🗣Харизма:", re.compile(rf"\s+(?P<oratory>\d+){_BONUS}\s*")),
+)
+agility_line_regex = re.compile(r"🤸🏽‍♂️Ловкость:\s+(?P<agility>\d+)")
+stamina_line_regex = re.compile(r"🔋Выносливость:\s+(?P<stamina_now>\d+)/(?P<stamina>\d+)\s*/ref\s*")
+location_line_regex = re.compile(r"📍(?P<location>.*),\s*👣\s*(?P<distance>\d+)км\.")
+on_raid_regex = re.compile(r"\s*(?P<on_raid>👊)?")
+
+short_stats_regex = re.compile(
+    r"(?P<hp_now>\d+)/(?P<hp>\d+)\D+(?P<hunger>\d+)\D+(?P<attack>\d+)\D+(?P<armor>\d+)\D+"
+    r"(?P<power>\d+)\D+(?P<accuracy>\d+)\D+(?P<oratory>\d+)\D+(?P<agility>\d+)\D+"
+    r"(?P<stamina_now>\d+)/(?P<stamina>\d+)\D+👣(?P<distance>\d+)"
+)
+
+ProfileMatch = Tuple[Dict[str, Optional[str]], int]  # groups of re_profile or re_profile_short, end of the match
+
+
+def _match_profile_lines(lines: Lines) -> Optional[ProfileMatch]:
+    """Full profile in its usual layout, a line per field: the same groups re_profile finds, without backtracking"""
+    text = lines.text
+    labels = (*(label for label, _ in profile_fields), "🔋Выносливость:")
+    if any(text.count(label) != 1 for label in labels) or text.count("🤟Банда:") > 1:
+        return
+
+    hp_index = lines.index("❤️Здоровье:")
+    stamina_index = lines.index("🔋Выносливость:")
+    if hp_index is None or stamina_index is None or stamina_index <= hp_index + len(profile_fields):
+        return
+
+    groups: Dict[str, Optional[str]] = {"crew": None, "on_raid": None}
+    nickname_index = hp_index - 1
+    if lines[nickname_index].startswith("🤟Банда:"):
+        if not (match := crew_line_regex.fullmatch(lines[nickname_index])):
+            return
+        groups["crew"] = match.group("crew")
+        nickname_index -= 1
+
+    # the match starts after a newline, at the last comma of the nickname line
+    nickname, comma, fraction = lines[nickname_index].rpartition(",")
+    if nickname_index < 1 or not comma or not fraction.strip():
+        return
+    previous = next((line for line in reversed(lines.lines[:nickname_index]) if line.strip()), "")
+    if "," in previous and not previous.rpartition(",")[2].strip():
+        return  # the match would start at the previous line and take this one for the fraction
+    groups["nic"], groups["fraction"] = nickname, fraction.lstrip()
+
+    for offset, (label, regex) in enumerate(profile_fields):
+        line = lines[hp_index + offset]
+        if not line.startswith(label) or not (match := regex.fullmatch(line, len(label))):
+            return
+        groups.update(match.groupdict())
+
+    if not (match := agility_line_regex.match(lines[hp_index + len(profile_fields)])):
+        return
+    groups.update(match.groupdict())
+
+    if not (match := stamina_line_regex.fullmatch(lines[stamina_index])):
+        return
+    groups.update(match.groupdict())
 
-def get_dzen_from_match(match: Match, dzen_match: Match, dzen_bars_match: Match) -> int:
+    if not (match := location_line_regex.match(lines[stamina_index + 1])):
+        return
+    groups.update(match.groupdict())
+
+    match = on_raid_regex.match(text, lines.offset(stamina_index + 1) + match.end())
+    groups["on_raid"] = match.group("on_raid")
+    return groups, match.end()
+
+
+def _match_profile_short_lines(lines: Lines) -> Optional[ProfileMatch]:
+    """Short profile in its usual layout: the same groups re_profile_short finds"""
+    text = lines.text
+    if text.count("👤") != 1:
+        return
+
+    index = lines.index("👤")
+    if index is None or not (
+        lines[index + 1].startswith("├🤟 ") and lines[index + 2].startswith("├") and lines[index + 3].startswith("├❤️")
+    ):
+        return
+
+    location_index = lines.index("├🔥", index + 4)
+    if location_index is None or len(lines[location_index]) == len("├🔥"):
+        return
+
+    stats_start = lines.offset(index + 3) + len("├❤️")
+    if not (match := short_stats_regex.fullmatch(text, stats_start, lines.offset(location_index) - 1)):
+        return
+    groups: Dict[str, Optional[str]] = match.groupdict()
+
+    header = lines[index][len("👤") :]
+    nickname_end = len(header)  # the nickname is followed by a run of dzen characters, as lazy (?P<nic>) leaves
+    while nickname_end and (header[nickname_end - 1] in "🏵+|" or header[nickname_end - 1].isdecimal()):
+        nickname_end -= 1
+    groups["nic"], groups["dzen"] = header[:nickname_end], header[nickname_end:]
+    groups["crew"] = lines[index + 1][len("├🤟 ") :]
+    groups["fraction"] = lines[index + 2][len("├") :]
+    groups["location"] = lines[location_index][len("├🔥") :]
+    return groups, lines.offset(location_index) + len(lines[location_index])
+
+
+def _match_profile(text: str) -> Optional[ProfileMatch]:
+    """The line layouts first, the regexes for the layouts they do not know"""
+    if "❤️Здоровье:" not in text and "👤" not in text:
+        return
+
+    lines = Lines(text)
+    for match_lines, regex, literals in (
+        (_match_profile_lines, re_profile, PROFILE_LITERALS),
+        (_match_profile_short_lines, re_profile_short, PROFILE_SHORT_LITERALS),
+    ):
+        if found := match_lines(lines):
+            return found
+        if contains_all(text, literals) and (match := regex.search(text)):
+            return match.groupdict(), match.end()
+
+
+def get_dzen_from_match(groups: Dict[str, Optional[str]], dzen_match: Match, dzen_bars_match: Match) -> int:
     dzen = 0
-    try:
-        dzen = match.group("dzen") or 0  # Короткий профиль
-    except IndexError:
-        if dzen_match:
-            dzen = dzen_match.group(0) or 0
+    if "dzen" in groups:
+        dzen = groups["dzen"] or 0  # Короткий профиль
+    elif dzen_match:
+        dzen = dzen_match.group(0) or 0
 
     if isinstance(dzen, str):
         if dzen.endswith("🏵"):  # 1-3
@@ -58,31 +200,33 @@ def get_dzen_from_match(match: Match, dzen_match: Match, dzen_bars_match: Match)
     return dzen
 
 
-def parse_pipboy(message: Message) -> Optional[Profile]:
-    match = re_profile.search(message.text) or re_profile_short.search(message.text)
-    if not match:
+def parse_pipboy(text: str, forward_date: datetime.datetime) -> Optional[Profile]:
+    if not (found := _match_profile(text)):
         return
 
-    startpos = match.end()
+    groups, startpos = found
 
-    if user_id_match := telegram_user_id_regex.search(message.text, startpos):
-        telegram_user_id = user_id_match.group("user_id")
+    if user_id_match := telegram_user_id_regex.search(text, startpos):
+        telegram_user_id = int(user_id_match.group("user_id"))
     else:
         telegram_user_id = None
 
-    dzen_match = dzen_regex.search(message.text, startpos)
-    dzen_bars_match = dzen_bars_regex.search(message.text, startpos)
+    dzen_match = dzen_regex.search(text, startpos)
+    dzen_bars_match = dzen_bars_regex.search(text, startpos)
 
-    nickname, crew, location = match.group("nic", "crew", "location")
-    fraction = get_fraction_by_name(match.group("fraction"))
+    nickname, crew, location = groups["nic"], groups["crew"], groups["location"]
+    fraction = get_fraction_by_name(groups["fraction"])
 
-    attack, armor, power, accuracy, oratory, agility, stamina = match.group(
-        "attack", "armor", "power", "accuracy", "oratory", "agility", "stamina"
+    attack, armor, power, accuracy, oratory, agility, stamina = (
+        int(groups[name]) for name in ("attack", "armor", "power", "accuracy", "oratory", "agility", "stamina")
+    )
+    hp, hp_now, hunger, stamina_now, distance = (
+        int(groups[name]) for name in ("hp", "hp_now", "hunger", "stamina_now", "distance")
     )
-    hp, hp_now, hunger, stamina_now, distance = match.group("hp", "hp_now", "hunger", "stamina_now", "distance")
 
-    dzen = get_dzen_from_match(match, dzen_match, dzen_bars_match)
-    stats = PipboyStats(
+    dzen = get_dzen_from_match(groups, dzen_match, dzen_bars_match)
+    stats = build(
+        PipboyStats,
         hp=hp,
         stamina=stamina,
         agility=agility,
@@ -92,17 +236,13 @@ def parse_pipboy(message: Message) -> Optional[Profile]:
         attack=attack,
         defence=armor,
         dzen=dzen,
-        time=message.forward_date,
+        time=forward_date,
     )
 
-    stand_on_raid = False
-    try:
-        if match.group("on_raid"):
-            stand_on_raid = True
-    except IndexError:
-        pass
+    stand_on_raid = bool(groups.get("on_raid"))
 
-    pipboy = Profile(
+    pipboy = build(
+        Profile,
         nickname=nickname,
         fraction=fraction,
         gang_name=crew,
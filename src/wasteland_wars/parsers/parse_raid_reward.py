@@ -1,22 +1,35 @@
 import datetime
 import re
-from typing import Optional
+from typing import Match, Optional
 
-from telegram import Message
-
-from src.wasteland_wars.schemas import RaidReward
+from src.wasteland_wars.schemas import RaidReward, build
 
 raid_reward_regex = re.compile(
     r"(Рейд\s+(?P<msg>в\s+((?P<hour>\d+)|(-+)):\d+\s*((?P<day>\d+)\.(?P<month>\d+))?" r".*\n.*\n.*))"
 )
 
 
-def parse_raid_reward(message: Message) -> Optional[RaidReward]:
-    if not (match := raid_reward_regex.search(message.text)):
+def _search_raid_reward(text: str) -> Optional[Match]:
+    """
+    raid_reward_regex.search tried only at the "Рейд" which have the two more lines the regex needs after them:
+    .*\n of the search scans to the end of the line at every "Рейд" of the last lines, which is quadratic
+    """
+    limit = text.rfind("\n", 0, max(text.rfind("\n"), 0))  # the second to last newline
+    if limit == -1:
+        return
+
+    start = text.find("Рейд", 0, limit)
+    while start != -1:
+        if match := raid_reward_regex.match(text, start):
+            return match
+        start = text.find("Рейд", start + 1, limit)
+
+
+def parse_raid_reward(text: str, forward_date: datetime.datetime) -> Optional[RaidReward]:
+    if not (match := _search_raid_reward(text)):
         return
 
     hour, day, month = match.group("hour", "day", "month")
-    forward_date = message.forward_date
 
     if hour is None:
         h = (((int(forward_date.hour) % 24) - 1) // 6) * 6 + 1
@@ -45,4 +58,4 @@ def parse_raid_reward(message: Message) -> Optional[RaidReward]:
         if forward_date - date < datetime.timedelta(seconds=-1):
             date = datetime.datetime(date.year - 1, date.month, date.day, date.hour)
 
-    return RaidReward(time=date)
+    return build(RaidReward, time=date)
@@ -1,17 +1,16 @@
+import datetime
 import re
 from typing import Optional
 
-from telegram import Message
-
-from src.wasteland_wars.schemas import ShowData
+from src.wasteland_wars.schemas import ShowData, build
 
 showdata_regex = re.compile(r"Доступ\s+к\s+данным\s+(?P<status>.+)")
 
 
-def parse_showdata(message: Message) -> Optional[ShowData]:
-    if not (match := showdata_regex.search(message.text)):
+def parse_showdata(text: str, forward_date: datetime.datetime) -> Optional[ShowData]:
+    if "Доступ" not in text or not (match := showdata_regex.search(text)):
         return
 
     showdata_enabled = match.group("status") == "✅"
-    showdata = ShowData(enabled=showdata_enabled)
+    showdata = build(ShowData, enabled=showdata_enabled)
     return showdata
@@ -3,3 +3,4 @@ from .goat_panel import GoatPanel, GoatGangMember
 from .pipboy import Profile, PipboyStats
 from .raid_reward import RaidReward
 from .show_data import ShowData
+from .construct import build
@@ -0,0 +1,22 @@
+import functools
+import os
+from typing import Type, TypeVar
+
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+# the parsers convert the captured values themselves, full validation is a debug check of that
+VALIDATE_SCHEMAS = os.getenv("WW_VALIDATE_SCHEMAS", "false").lower() in ("1", "true", "yes")
+
+
+@functools.cache
+def _adapter(schema: Type[T]) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def build(schema: Type[T], **fields) -> T:
+    """Trusted fast path: the schema as is, validated by pydantic only if WW_VALIDATE_SCHEMAS is set"""
+    if VALIDATE_SCHEMAS:
+        return _adapter(schema).validate_python(fields)
+    return schema(**fields)
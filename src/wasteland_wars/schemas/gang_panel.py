@@ -1,16 +1,17 @@
+from dataclasses import dataclass
 from typing import List, Optional
 
-from pydantic import BaseModel
 
-
-class GangMember(BaseModel):
+@dataclass(slots=True)
+class GangMember:
     nickname: str
     ears: int
     kilometr: int
     status: str
 
 
-class GangPanel(BaseModel):
+@dataclass(slots=True)
+class GangPanel:
     name: str
     ears: int
     leader_nickname: str
@@ -1,15 +1,16 @@
+from dataclasses import dataclass
 from typing import List, Optional
 
-from pydantic import BaseModel
 
-
-class GoatGangMember(BaseModel):
+@dataclass(slots=True)
+class GoatGangMember:
     gang_name: str
     combat_power: int
     gang_id: Optional[int]
 
 
-class GoatPanel(BaseModel):
+@dataclass(slots=True)
+class GoatPanel:
     name: str
     league_name: str
     rating: int
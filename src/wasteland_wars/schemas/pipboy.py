@@ -1,12 +1,12 @@
 import datetime
+from dataclasses import dataclass
 from typing import Optional
 
-from pydantic import BaseModel
-
 from src.wasteland_wars.enums import Fraction
 
 
-class PipboyStats(BaseModel):
+@dataclass(slots=True)
+class PipboyStats:
     hp: int
     stamina: int
     agility: int
@@ -20,7 +20,8 @@ class PipboyStats(BaseModel):
     time: datetime.datetime
 
 
-class Profile(BaseModel):
+@dataclass(slots=True)
+class Profile:
     nickname: str
     fraction: Fraction
     gang_name: Optional[str]
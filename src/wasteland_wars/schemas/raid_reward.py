@@ -1,7 +1,7 @@
 import datetime
+from dataclasses import dataclass
 
-from pydantic import BaseModel
 
-
-class RaidReward(BaseModel):
+@dataclass(slots=True)
+class RaidReward:
     time: datetime.datetime
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
 
 
-class ShowData(BaseModel):
+@dataclass(slots=True)
+class ShowData:
     enabled: bool
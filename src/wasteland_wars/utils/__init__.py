@@ -1,2 +1,3 @@
 from .get_fraction_by_emoji import get_fraction_by_emoji
 from .get_fraction_by_name import get_fraction_by_name
+from .get_message_kinds import get_message_kinds
@@ -0,0 +1,11 @@
+from typing import FrozenSet
+
+from src.wasteland_wars.constants import MESSAGE_KIND_MARKERS
+from src.wasteland_wars.enums import MessageKind
+
+
+def get_message_kinds(text: str) -> FrozenSet[MessageKind]:
+    """Kinds whose parser may match the text, a forward is usually of one kind or of none"""
+    return frozenset(
+        kind for kind, markers in MESSAGE_KIND_MARKERS.items() if any(marker in text for marker in markers)
+    )
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# src.config and src.models read the environment on import
+os.environ.setdefault("TG_TOKEN", "123456:TEST")
+os.environ.setdefault("ADMIN_CHAT_ID", "1")
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="deusai-tests-"), "db.sqlite")
+)
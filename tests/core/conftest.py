@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, Dict, List
+
+import pytest
+
+from src.core import MessageManager
+
+
+class FakeBot:
+    """Records the Bot API calls, `errors` maps a method name to the exceptions its next calls raise"""
+
+    def __init__(self):
+        self.calls: List[tuple] = []
+        self.errors: Dict[str, List[Exception]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, args, kwargs):
+        with self._lock:
+            self.calls.append((method, args, kwargs))
+            errors = self.errors.get(method)
+            if errors:
+                raise errors.pop(0)
+        return method
+
+    def send_message(self, *args, **kwargs):
+        return self._call("send_message", args, kwargs)
+
+    def edit_message_text(self, *args, **kwargs):
+        return self._call("edit_message_text", args, kwargs)
+
+    def edit_message_reply_markup(self, *args, **kwargs):
+        return self._call("edit_message_reply_markup", args, kwargs)
+
+    def pin_chat_message(self, *args, **kwargs):
+        return self._call("pin_chat_message", args, kwargs)
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def bot() -> FakeBot:
+    return FakeBot()
+
+
+@pytest.fixture
+def make_manager(bot):
+    """MessageManager over the fake bot with short delays, its sender workers are stopped after the test"""
+    managers: List[MessageManager] = []
+
+    def make(**kwargs) -> MessageManager:
+        options = dict(workers=1, edit_delay=0.01, edit_max_delay=0.05, retry_base_delay=0.01)
+        options.update(kwargs)
+        manager = MessageManager(bot, None, **options)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.stop(timeout=5)
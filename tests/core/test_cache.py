@@ -0,0 +1,73 @@
+import pytest
+
+from src.core import LRUCache, MetricsRegistry
+
+
+@pytest.fixture
+def make_cache():
+    def make(**kwargs) -> LRUCache:
+        return LRUCache("test", metrics=MetricsRegistry(), **kwargs)
+
+    return make
+
+
+def test_loaded_value_is_cached(make_cache):
+    cache = make_cache()
+    loads = []
+
+    for _ in range(3):
+        assert cache.get_or_load("key", lambda: loads.append(1) or "value") == "value"
+
+    assert len(loads) == 1
+
+
+def test_missing_row_is_cached_too(make_cache):
+    cache = make_cache()
+    loads = []
+
+    for _ in range(2):
+        assert cache.get_or_load("key", lambda: loads.append(1)) is None
+
+    assert len(loads) == 1
+
+
+def test_least_recently_used_is_evicted(make_cache):
+    cache = make_cache(maxsize=2)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+
+    cache.set("third", 3)
+
+    assert cache.get("second", None) is None
+    assert (cache.get("first"), cache.get("third")) == (1, 3)
+
+
+def test_entries_expire(make_cache):
+    cache = make_cache(ttl=0)
+    cache.set("key", "value")
+
+    assert cache.get("key", None) is None and len(cache) == 0
+
+
+def test_invalidation_drops_matching_entries(make_cache):
+    cache = make_cache()
+    cache.set("first", 1)
+    cache.set("second", 2)
+
+    cache.invalidate_where(lambda value: value == 1)
+    assert cache.get("first", None) is None and cache.get("second") == 2
+
+    cache.invalidate("second")
+    assert len(cache) == 0
+
+
+def test_value_loaded_across_an_invalidation_is_not_stored(make_cache):
+    cache = make_cache()
+
+    def load():
+        cache.invalidate("key")  # a concurrent save of the row
+        return "stale"
+
+    assert cache.get_or_load("key", load) == "stale"
+    assert cache.get("key", None) is None
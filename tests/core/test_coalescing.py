@@ -0,0 +1,66 @@
+from src.core.message_manager import COALESCE_SEPARATOR, MAX_MESSAGE_LENGTH
+from tests.core.conftest import wait_until
+
+
+def _texts(bot):
+    return [kwargs["text"] for _, _, kwargs in bot.calls]
+
+
+def test_messages_within_the_window_are_sent_as_one(bot, make_manager):
+    manager = make_manager(coalesce_window=0.05)
+    manager.start()
+    results = []
+
+    for index in range(3):
+        manager.send_message(chat_id=-1, text=str(index), callback=results.append, callback_args=index)
+
+    assert wait_until(lambda: len(results) == 3)
+    assert _texts(bot) == [COALESCE_SEPARATOR.join(["0", "1", "2"])]
+    assert sorted(result.args for result in results) == [0, 1, 2]
+    assert all(result.value == "send_message" and result.error is None for result in results)
+
+
+def test_chats_are_not_merged_together(bot, make_manager):
+    manager = make_manager(coalesce_window=0.05)
+    manager.start()
+
+    manager.send_message(chat_id=-1, text="first")
+    manager.send_message(chat_id=-2, text="second")
+
+    assert wait_until(lambda: len(bot.calls) == 2)
+    assert sorted(_texts(bot)) == ["first", "second"]
+
+
+def test_messages_with_other_options_or_markup_are_not_merged(bot, make_manager):
+    manager = make_manager(coalesce_window=0.05)
+    manager.start()
+
+    manager.send_message(chat_id=-1, text="plain")
+    manager.send_message(chat_id=-1, text="*markdown*", parse_mode="Markdown")
+    manager.send_message(chat_id=-1, text="markup", reply_markup=object())
+    manager.send_message(chat_id=-1, text="after markup")
+
+    assert wait_until(lambda: len(bot.calls) == 4)
+    assert _texts(bot) == ["plain", "*markdown*", "markup", "after markup"]
+
+
+def test_merged_message_stays_within_the_length_limit(bot, make_manager):
+    manager = make_manager(coalesce_window=0.05)
+    manager.start()
+    text = "x" * (MAX_MESSAGE_LENGTH // 3)
+
+    for _ in range(3):
+        manager.send_message(chat_id=-1, text=text)
+
+    assert wait_until(lambda: len(bot.calls) == 2)
+    assert _texts(bot) == [COALESCE_SEPARATOR.join([text, text]), text]
+
+
+def test_without_a_window_nothing_is_merged(bot, make_manager):
+    manager = make_manager()
+    for index in range(3):
+        manager.send_message(chat_id=-1, text=str(index))
+    manager.start()
+
+    assert wait_until(lambda: len(bot.calls) == 3)
+    assert _texts(bot) == ["0", "1", "2"]
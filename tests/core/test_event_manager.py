@@ -0,0 +1,81 @@
+import random
+
+from src.core import Command, EventManager, InnerHandler, InnerUpdate, UpdateFilter, CommandFilter, CommandNameFilter
+
+ATTRIBUTES = ("invoker", "player", "chat")
+COMMANDS = ("me", "me_full", "raid", "RAID", "gang")
+
+
+def _update(command: str = None, **attributes) -> InnerUpdate:
+    update = InnerUpdate()
+    if command:
+        name = command.split("_")[0]
+        update.command = Command(command=command, name=name, subcommand=command[len(name) + 1 :])
+    for attribute, value in attributes.items():
+        setattr(update, attribute, value)
+    return update
+
+
+def _manager(handlers) -> EventManager:
+    manager = EventManager(None)
+    for handler in handlers:
+        manager.add_handler(handler)
+    return manager
+
+
+def test_handlers_run_in_registration_order():
+    calls = []
+    handlers = [
+        InnerHandler(UpdateFilter("player"), lambda update: calls.append("player")),
+        InnerHandler(CommandFilter("me"), lambda update: calls.append("command")),
+        InnerHandler(lambda update: True, lambda update: calls.append("fallback")),
+        InnerHandler(CommandNameFilter("me"), lambda update: calls.append("name")),
+        InnerHandler(CommandFilter("raid"), lambda update: calls.append("other command")),
+    ]
+
+    _manager(handlers).invoke_handler_update(_update("me", player=True))
+
+    assert calls == ["player", "command", "fallback", "name"]
+
+
+def test_custom_filters_are_checked():
+    calls = []
+    handlers = [
+        InnerHandler(CommandFilter("me"), lambda update: calls.append("denied"), [lambda update: False]),
+        InnerHandler(CommandFilter("me"), lambda update: calls.append("allowed"), [lambda update: True]),
+    ]
+
+    _manager(handlers).invoke_handler_update(_update("me"))
+
+    assert calls == ["allowed"]
+
+
+def _random_filter(rng: random.Random):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return CommandFilter(rng.choice(COMMANDS))
+    if kind == 1:
+        return CommandNameFilter(rng.choice(COMMANDS))
+    if kind == 2:
+        up_filter = UpdateFilter(rng.choice(ATTRIBUTES))
+        return up_filter & UpdateFilter(rng.choice(ATTRIBUTES)) if rng.random() < 0.5 else up_filter
+    return UpdateFilter() if rng.random() < 0.5 else (lambda update: update.command is None)
+
+
+def test_index_matches_the_same_handlers_as_a_scan():
+    rng = random.Random(0)
+    for _ in range(50):
+        calls = []
+        handlers = [
+            InnerHandler(_random_filter(rng), lambda update, index=index: calls.append(index)) for index in range(30)
+        ]
+        manager = _manager(handlers)
+
+        for _ in range(20):
+            attributes = {attribute: rng.random() < 0.5 for attribute in ATTRIBUTES}
+            update = _update(rng.choice((None,) + COMMANDS), **attributes)
+            expected = [index for index, handler in enumerate(handlers) if handler.filter(update)]
+
+            calls.clear()
+            manager.invoke_handler_update(update)
+            assert calls == expected
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from src.core import BackpressurePolicy, KeyedExecutor, MetricsRegistry
+from tests.core.conftest import wait_until
+
+
+@pytest.fixture
+def make_executor():
+    executors = []
+
+    def make(**kwargs) -> KeyedExecutor:
+        executor = KeyedExecutor(metrics=MetricsRegistry(), **kwargs)
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.stop(timeout=5)
+
+
+def test_tasks_of_a_key_run_in_order(make_executor):
+    executor = make_executor(workers=4)
+    executor.start()
+    done = {key: [] for key in range(3)}
+
+    for index in range(100):
+        for key, tasks in done.items():
+            executor.submit(key, tasks.append, index)
+
+    assert wait_until(lambda: all(len(tasks) == 100 for tasks in done.values()))
+    assert all(tasks == list(range(100)) for tasks in done.values())
+
+
+def test_keys_run_in_parallel(make_executor):
+    executor = make_executor(workers=2)
+    executor.start()
+    barrier = threading.Barrier(2, timeout=5)
+    passed = []
+
+    for key in ("first", "second"):
+        executor.submit(key, lambda: passed.append(barrier.wait()))
+
+    assert wait_until(lambda: len(passed) == 2)
+
+
+def test_failed_task_does_not_stop_the_key(make_executor):
+    executor = make_executor(workers=1)
+    executor.start()
+    done = []
+
+    executor.submit("key", lambda: 1 / 0)
+    executor.submit("key", done.append, "next")
+
+    assert wait_until(lambda: done == ["next"])
+
+
+def test_full_queue_drops_tasks(make_executor):
+    executor = make_executor(max_queue_size=1, backpressure=BackpressurePolicy.DROP)
+
+    assert executor.submit("key", print)
+    assert not executor.submit("other", print)
+
+
+def test_stop_runs_the_queued_tasks(make_executor):
+    executor = make_executor(workers=2)
+    done = []
+    for index in range(10):
+        executor.submit(index % 3, done.append, index)
+    executor.start()
+
+    executor.stop(timeout=5)
+
+    assert sorted(done) == list(range(10))
@@ -0,0 +1,96 @@
+import threading
+
+from telegram.error import TimedOut
+
+from tests.core.conftest import wait_until
+
+
+def _texts(bot, method="edit_message_text"):
+    return [kwargs["text"] for name, _, kwargs in bot.calls if name == method]
+
+
+def test_only_the_latest_edit_is_sent(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    for index in range(5):
+        manager.edit_message_text(
+            chat_id=-1, message_id=1, text=str(index), callback=results.append, callback_args=index
+        )
+
+    assert wait_until(lambda: results)
+    assert _texts(bot) == ["4"] and [result.args for result in results] == [4]
+
+
+def test_markup_change_is_merged_into_the_queued_text_edit(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+
+    manager.edit_message_text(chat_id=-1, message_id=1, text="text")
+    manager.edit_message_reply_markup(chat_id=-1, message_id=1, reply_markup="markup")
+    manager.edit_message_text(chat_id=-1, message_id=2, text="other message")
+
+    assert wait_until(lambda: len(bot.calls) == 2)
+    assert {(name, kwargs["message_id"], kwargs.get("reply_markup")) for name, _, kwargs in bot.calls} == {
+        ("edit_message_text", 1, "markup"),
+        ("edit_message_text", 2, None),
+    }
+
+
+def test_only_the_latest_pin_is_made(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+
+    for message_id in range(3):
+        manager.pin_chat_message(chat_id=-1, message_id=message_id)
+
+    assert wait_until(lambda: bot.calls)
+    assert not wait_until(lambda: len(bot.calls) > 1, timeout=0.1)
+    assert bot.calls[0][2]["message_id"] == 2
+
+
+def test_retried_edit_does_not_break_the_worker(bot, make_manager):
+    bot.errors["edit_message_text"] = [TimedOut()]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    manager.edit_message_text(chat_id=-1, message_id=1, text="text", callback=results.append)
+
+    assert wait_until(lambda: results)
+    assert results[0].error is None and _texts(bot) == ["text", "text"]
+    assert wait_until(lambda: manager._pending == 0)
+    assert manager._latest == {}
+
+    manager.edit_message_text(chat_id=-1, message_id=1, text="after", callback=results.append)
+    assert wait_until(lambda: len(results) == 2) and _texts(bot)[-1] == "after"
+
+
+def test_edit_queued_while_the_previous_one_is_in_flight_is_sent(bot, make_manager):
+    sending, release = threading.Event(), threading.Event()
+    send = bot.edit_message_text
+
+    def slow_edit(*args, **kwargs):
+        if kwargs["text"] == "old" and not sending.is_set():
+            sending.set()
+            release.wait(5)
+            raise TimedOut()
+        return send(*args, **kwargs)
+
+    bot.edit_message_text = slow_edit
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    manager.edit_message_text(chat_id=-1, message_id=1, text="old", callback=results.append, callback_args="old")
+    assert sending.wait(5)
+    manager.edit_message_text(chat_id=-1, message_id=1, text="new", callback=results.append, callback_args="new")
+    queued = manager._latest[("edit", -1, 1)]
+    release.set()
+
+    assert wait_until(lambda: len(results) == 2)
+    assert [(result.args, result.error) for result in results] == [("old", None), ("new", None)]
+    assert _texts(bot) == ["old", "new"]
+    assert queued.kwargs["text"] == "new" and manager._latest == {}
+    assert wait_until(lambda: manager._pending == 0)
@@ -0,0 +1,72 @@
+from queue import Full
+
+from src.core import BackpressurePolicy
+from tests.core.conftest import wait_until
+
+
+def test_rows_of_a_chat_are_sent_in_order_by_several_workers(bot, make_manager):
+    manager = make_manager(workers=4, all_burst_limit=1000)
+    manager._rate_limiter.acquire = lambda chat_id: 0.0
+    manager.start()
+
+    for index in range(50):
+        for chat_id in (1, 2, 3):
+            manager.send_message(chat_id=chat_id, text=str(index))
+
+    assert wait_until(lambda: len(bot.calls) == 150)
+    for chat_id in (1, 2, 3):
+        texts = [kwargs["text"] for _, _, kwargs in bot.calls if kwargs["chat_id"] == chat_id]
+        assert texts == [str(index) for index in range(50)]
+
+
+def test_higher_priority_goes_first(bot, make_manager):
+    manager = make_manager()
+    manager.send_message(chat_id=1, text="low", priority=2)
+    manager.send_message(chat_id=1, text="high", priority=0)
+    manager.start()
+
+    assert wait_until(lambda: len(bot.calls) == 2)
+    assert [kwargs["text"] for _, _, kwargs in bot.calls] == ["high", "low"]
+
+
+def test_full_queue_drops_and_reports_to_the_callback(make_manager):
+    manager = make_manager(max_queue_size=1, backpressure=BackpressurePolicy.DROP)
+    results = []
+
+    manager.send_message(chat_id=1, text="queued", callback=results.append)
+    manager.send_message(chat_id=1, text="dropped", callback=results.append, callback_args="dropped")
+
+    assert len(results) == 1
+    assert isinstance(results[0].error, Full) and results[0].args == "dropped"
+
+
+def test_blocked_caller_gives_up_after_the_timeout(make_manager):
+    manager = make_manager(max_queue_size=1, backpressure=BackpressurePolicy.BLOCK, block_timeout=0.05)
+    results = []
+
+    manager.send_message(chat_id=1, text="queued")
+    manager.send_message(chat_id=1, text="dropped", callback=results.append)
+
+    assert isinstance(results[0].error, Full)
+
+
+def test_callback_gets_the_api_result(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    manager.send_message(chat_id=1, text="text", callback=results.append, callback_args="args")
+
+    assert wait_until(lambda: results)
+    assert results[0].value == "send_message" and results[0].error is None and results[0].args == "args"
+
+
+def test_stop_sends_the_queued_rows_first(bot, make_manager):
+    manager = make_manager()
+    for index in range(5):
+        manager.send_message(chat_id=-index - 1, text=str(index))
+    manager.start()
+
+    manager.stop(timeout=5)
+
+    assert len(bot.calls) == 5
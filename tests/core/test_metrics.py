@@ -0,0 +1,69 @@
+from telegram.error import TimedOut
+
+from src.core import Histogram, MetricsRegistry
+from tests.core.conftest import wait_until
+
+
+def test_counter_renders_prometheus_samples():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("sent", "Sent messages", ["chat_type"])
+    counter.inc(chat_type="group")
+    counter.inc(2, chat_type='say "hi"')
+
+    assert metrics.render() == (
+        "# HELP sent Sent messages\n"
+        "# TYPE sent counter\n"
+        'sent_total{chat_type="group"} 1\n'
+        'sent_total{chat_type="say \\"hi\\""} 2\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = MetricsRegistry().histogram("latency", "Latency", buckets=(1, 2))
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+
+    assert histogram.samples() == [
+        ("_bucket", '{le="1"}', 1),
+        ("_bucket", '{le="2"}', 3),
+        ("_bucket", '{le="+Inf"}', 4),
+        ("_sum", "", 6.5),
+        ("_count", "", 4),
+    ]
+    assert histogram.count() == 4
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1) == 2
+
+
+def test_metric_registered_twice_is_shared():
+    metrics = MetricsRegistry()
+
+    assert metrics.counter("sent", "Sent") is metrics.counter("sent", "Sent")
+
+
+def test_gauge_is_collected_on_read():
+    depth = {(): 1}
+    gauge = MetricsRegistry().gauge("depth", "Queue depth", collect=lambda: dict(depth))
+    depth[()] = 3
+
+    assert gauge.values() == {(): 3}
+
+
+def test_message_manager_reports_sends_errors_and_retries(bot, make_manager):
+    metrics = MetricsRegistry()
+    bot.errors["send_message"] = [TimedOut()]
+    manager = make_manager(metrics=metrics)
+    manager.send_message(chat_id=-1, text="text", priority=2)
+
+    depth = {metric.name: metric for metric in metrics.metrics()}["telegram_queue_depth"]
+    assert depth.values() == {("2",): 1}
+
+    manager.start()
+    assert wait_until(lambda: manager._pending == 0)
+
+    values = {metric.name: metric.values() for metric in metrics.metrics() if not isinstance(metric, Histogram)}
+    assert values["telegram_messages_enqueued"] == {("send_message", "group"): 1}
+    assert values["telegram_messages_sent"] == {("send_message", "group"): 1}
+    assert values["telegram_send_errors"] == {("send_message", "TimedOut"): 1}
+    assert values["telegram_send_retries"] == {("TimedOut",): 1}
+    assert values["telegram_queue_depth"] == {}
@@ -0,0 +1,66 @@
+import peewee
+import pytest
+
+from src.core import MetricsRegistry, Profiler
+
+
+@pytest.fixture
+def profiler() -> Profiler:
+    return Profiler(samples=10, metrics=MetricsRegistry())
+
+
+@pytest.fixture
+def database() -> peewee.SqliteDatabase:
+    database = peewee.SqliteDatabase(":memory:")
+    database.connect()
+    yield database
+    database.close()
+
+
+def test_calls_are_recorded_with_their_queries(profiler, database):
+    profiler.instrument_database(database)
+
+    def handler(queries: int):
+        for _ in range(queries):
+            database.execute_sql("SELECT 1")
+        return queries
+
+    assert profiler.wrap("handler", handler)(3) == 3
+    profiler.wrap("handler", handler)(1)
+
+    [row] = profiler.report()
+    assert (row.name, row.calls, row.queries) == ("handler", 2, 2.0)
+    assert row.total > 0 and row.p50 <= row.p99
+
+
+def test_failed_call_is_recorded(profiler):
+    with pytest.raises(ZeroDivisionError):
+        profiler.call("handler", lambda: 1 / 0)
+
+    assert profiler.report()[0].calls == 1
+
+
+def test_rejecting_filters_are_recorded(profiler):
+    assert not profiler.check("handler", lambda update: False, None)
+    assert profiler.check("handler", lambda update: True, None)
+
+    [row] = profiler.report()
+    assert (row.calls, row.rejected) == (0, 1)
+
+
+def test_report_is_sorted_and_cut(profiler):
+    for name, wall in (("fast", 0.1), ("slow", 3.0), ("middle", 1.0)):
+        profiler.record(name, wall, 0, 0.0)
+
+    assert [row.name for row in profiler.report(top=2)] == ["slow", "middle"]
+    assert [row.name for row in profiler.report(sort="calls", top=3)] == ["fast", "slow", "middle"]
+
+
+def test_disabled_profiler_does_not_wrap(database):
+    profiler = Profiler(enabled=False, metrics=MetricsRegistry())
+    execute_sql = database.execute_sql
+
+    profiler.instrument_database(database)
+
+    assert profiler.wrap("handler", len) is len
+    assert database.execute_sql == execute_sql
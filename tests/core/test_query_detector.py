@@ -0,0 +1,60 @@
+import peewee
+import pytest
+
+from src.core import DetectorMode, NPlusOneError, QueryDetector, statement_shape
+
+
+class Item(peewee.Model):
+    name = peewee.CharField()
+
+
+@pytest.fixture
+def database() -> peewee.SqliteDatabase:
+    database = peewee.SqliteDatabase(":memory:")
+    with database.bind_ctx([Item]):
+        database.create_tables([Item])
+        Item.insert_many([{"name": str(index)} for index in range(10)]).execute()
+        yield database
+
+
+@pytest.fixture
+def detector(database) -> QueryDetector:
+    detector = QueryDetector(DetectorMode.RAISE, threshold=3)
+    detector.instrument_database(database)
+    return detector
+
+
+def test_statement_shape_collapses_values():
+    assert (
+        statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) LIMIT 10")
+        == "SELECT * FROM t WHERE id IN (?...) LIMIT N"
+    )
+    assert statement_shape("SELECT * FROM t WHERE id IN (%s,%s)") == "SELECT * FROM t WHERE id IN (?...)"
+
+
+def test_query_in_a_loop_is_reported(detector):
+    with pytest.raises(NPlusOneError, match=r"N\+1 queries in handler:\n  3x at "):
+        with detector.scope("handler"):
+            for item_id in range(1, 4):
+                Item.get_by_id(item_id)
+
+
+def test_batched_query_is_not_reported(detector):
+    with detector.scope("handler"):
+        list(Item.select().where(Item.id << [1, 2, 3]))
+        for _ in range(2):
+            Item.get_by_id(1)
+
+
+def test_nested_scope_counts_to_the_outer_one(detector):
+    with pytest.raises(NPlusOneError, match="in outer"):
+        with detector.scope("outer"):
+            Item.get_by_id(1)
+            for _ in range(2):
+                with detector.scope("inner"):
+                    Item.get_by_id(1)
+
+
+def test_queries_outside_a_scope_are_not_checked(detector):
+    for _ in range(5):
+        Item.get_by_id(1)
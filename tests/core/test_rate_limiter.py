@@ -0,0 +1,91 @@
+from src.core import TokenBucketRateLimiter
+from src.core.rate_limiter import TokenBucket
+from tests.core.conftest import wait_until
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate=2, capacity=3)
+    bucket.updated_at = 0
+    for _ in range(3):
+        assert bucket.delay(0) == 0
+        bucket.consume(0)
+
+    assert bucket.delay(0) == 0.5
+    assert bucket.delay(0.5) == 0
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.updated_at = 0
+    bucket.consume(0)
+    bucket.consume(0)
+
+    assert bucket.is_full(100)
+    assert bucket.tokens == 2
+
+
+def test_bucket_backoff_holds_the_next_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.updated_at = 0
+    bucket.backoff(0, 5)
+
+    assert bucket.delay(0) == 5
+    assert bucket.delay(5) == 0
+
+
+def test_private_chat_gets_one_message_per_second():
+    limiter = TokenBucketRateLimiter(all_burst_limit=30, group_burst_limit=20)
+
+    assert limiter.acquire(42) == 0
+    assert 0 < limiter.acquire(42) <= 1
+    assert limiter.acquire(43) == 0
+
+
+def test_group_chat_gets_its_burst():
+    limiter = TokenBucketRateLimiter(all_burst_limit=30, group_burst_limit=20)
+
+    assert all(limiter.acquire(-100) == 0 for _ in range(20))
+    assert limiter.acquire(-100) > 0
+
+
+def test_global_limit_covers_all_chats():
+    limiter = TokenBucketRateLimiter(all_burst_limit=5)
+
+    assert all(limiter.acquire(chat_id) == 0 for chat_id in range(1, 6))
+    assert limiter.acquire(6) > 0
+
+
+def test_backoff_holds_only_that_chat():
+    limiter = TokenBucketRateLimiter()
+    limiter.backoff(42, 10)
+
+    assert limiter.acquire(42) > 9
+    assert limiter.acquire(43) == 0
+
+
+def test_unknown_chat_is_limited_globally_only():
+    limiter = TokenBucketRateLimiter(all_burst_limit=2)
+
+    assert limiter.acquire(None) == 0
+    limiter.consume(None)
+    limiter.backoff(None, 10)
+    assert limiter.acquire(None) > 0
+
+
+def test_full_buckets_are_pruned():
+    limiter = TokenBucketRateLimiter(max_buckets=2)
+    limiter._buckets = {1: TokenBucket(1, 1), 2: TokenBucket(1, 1)}
+
+    limiter.acquire(3)
+
+    assert set(limiter._buckets) == {3}
+
+
+def test_message_manager_sends_with_positional_chat_id(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+
+    manager.send_message(True, None, None, 1, 42, "text")
+
+    assert wait_until(lambda: bot.calls)
+    assert bot.calls[0][1] == (42, "text")
@@ -0,0 +1,118 @@
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut, Unauthorized
+
+from src.core import UndeliverableChats
+from tests.core.conftest import wait_until
+
+
+def _send(manager, results, text="text", chat_id=-1):
+    manager.send_message(chat_id=chat_id, text=text, callback=results.append)
+
+
+def test_network_error_is_retried(bot, make_manager):
+    bot.errors["send_message"] = [TimedOut(), NetworkError("reset")]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    _send(manager, results)
+
+    assert wait_until(lambda: results)
+    assert len(bot.calls) == 3 and results[0].error is None
+    assert wait_until(lambda: manager._pending == 0)
+
+
+def test_network_error_is_given_up_after_max_retries(bot, make_manager):
+    bot.errors["send_message"] = [NetworkError("reset") for _ in range(3)]
+    manager = make_manager(max_retries=2)
+    manager.start()
+    results = []
+
+    _send(manager, results)
+
+    assert wait_until(lambda: results)
+    assert len(bot.calls) == 3 and isinstance(results[0].error, NetworkError)
+
+
+def test_retried_row_keeps_its_place_in_the_chat(bot, make_manager):
+    bot.errors["send_message"] = [TimedOut()]
+    manager = make_manager()
+    results = []
+
+    _send(manager, results, "first")
+    _send(manager, results, "second")
+    manager.start()
+
+    assert wait_until(lambda: len(results) == 2)
+    assert [kwargs["text"] for _, _, kwargs in bot.calls] == ["first", "first", "second"]
+
+
+def test_retry_after_waits_for_the_flood_wait(bot, make_manager):
+    bot.errors["send_message"] = [RetryAfter(0.2)]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    _send(manager, results)
+
+    assert wait_until(lambda: len(bot.calls) == 1)
+    assert not wait_until(lambda: results, timeout=0.1)
+    assert wait_until(lambda: results) and results[0].error is None
+
+
+def test_blocked_chat_is_skipped_without_api_calls(bot, make_manager):
+    bot.errors["send_message"] = [Unauthorized("Forbidden: bot was blocked by the user")]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    _send(manager, results)
+    assert wait_until(lambda: results)
+    _send(manager, results)
+
+    assert wait_until(lambda: len(results) == 2)
+    assert len(bot.calls) == 1 and -1 in manager.undeliverable
+    assert all(isinstance(result.error, Unauthorized) for result in results)
+
+
+def test_chat_not_found_is_undeliverable(bot, make_manager):
+    bot.errors["send_message"] = [BadRequest("Chat not found")]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    _send(manager, results)
+
+    assert wait_until(lambda: results)
+    assert -1 in manager.undeliverable and len(bot.calls) == 1
+
+
+def test_bad_request_is_not_retried(bot, make_manager):
+    bot.errors["send_message"] = [BadRequest("Can't parse entities")]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    _send(manager, results)
+
+    assert wait_until(lambda: results)
+    assert isinstance(results[0].error, BadRequest) and len(bot.calls) == 1
+    assert -1 not in manager.undeliverable
+
+
+def test_not_modified_edit_is_not_an_error(bot, make_manager):
+    bot.errors["edit_message_text"] = [BadRequest("Bad Request: message is not modified")]
+    manager = make_manager()
+    manager.start()
+    results = []
+
+    manager.edit_message_text(chat_id=-1, message_id=1, text="same", callback=results.append)
+
+    assert wait_until(lambda: results)
+    assert results[0].error is None and results[0].value is None
+
+
+def test_undeliverable_chats_expire():
+    chats = UndeliverableChats(ttl=0)
+    chats.add(1, "blocked")
+
+    assert 1 not in chats and len(chats) == 0
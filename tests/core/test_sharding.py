@@ -0,0 +1,91 @@
+import datetime
+import queue
+
+import pytest
+from telegram import Update
+from telegram.ext import DispatcherHandlerStop
+
+from src.core import LeaderLock, ShardRouter, routing_key, shard_of
+
+
+def _update(user_id=None, chat_id=-100) -> Update:
+    message = {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "group"}, "text": "text"}
+    if user_id is not None:
+        message["from"] = {"id": user_id, "is_bot": False, "first_name": "user"}
+    return Update.de_json({"update_id": 1, "message": message}, None)
+
+
+def test_updates_are_routed_by_user_then_by_chat():
+    assert routing_key(_update(user_id=7)) == 7
+    assert routing_key(_update()) == -100
+    assert shard_of(None, 3) == 0 and shard_of(7, 3) == 1 and shard_of(-100, 3) == 2
+
+
+def test_router_hands_other_shards_updates_over():
+    queues = [queue.Queue() for _ in range(3)]
+    router = ShardRouter(queues, shard_index=0)
+    own, other = _update(user_id=3), _update(user_id=7)
+
+    assert not router.check_update(own)
+    assert router.check_update(other)
+    with pytest.raises(DispatcherHandlerStop):
+        router.handle_update(other, None)
+
+    assert queues[1].get_nowait() == other.to_dict()
+    assert queues[0].empty() and queues[2].empty()
+
+
+class FakeLease:
+    """In-memory LeaderLease"""
+
+    def __init__(self):
+        self.owner = None
+        self.expires_at = datetime.datetime.min
+
+    def acquire(self, name: str, owner: str, ttl: datetime.timedelta) -> bool:
+        now = datetime.datetime.now()
+        if self.owner != owner and self.expires_at > now:
+            return False
+        self.owner, self.expires_at = owner, now + ttl
+        return True
+
+    def release(self, name: str, owner: str):
+        if self.owner == owner:
+            self.expires_at = datetime.datetime.now()
+
+
+def test_only_one_process_is_the_leader():
+    lease = FakeLease()
+    first, second = LeaderLock(lease, "first"), LeaderLock(lease, "second")
+
+    first.refresh()
+    second.refresh()
+    assert first.is_leader and not second.is_leader
+
+    first.release()
+    second.refresh()
+    assert not first.is_leader and second.is_leader
+
+
+def test_leader_only_jobs_are_skipped_by_followers():
+    lease = FakeLease()
+    leader, follower = LeaderLock(lease, "leader"), LeaderLock(lease, "follower")
+    leader.refresh()
+    follower.refresh()
+    runs = []
+
+    leader.only(runs.append)("leader")
+    follower.only(runs.append)("follower")
+
+    assert runs == ["leader"]
+
+
+def test_failed_refresh_keeps_the_lease_until_it_expires():
+    lease = FakeLease()
+    lock = LeaderLock(lease, "leader")
+    lock.refresh()
+
+    lease.acquire = lambda *args: 1 / 0
+    lock.refresh()
+
+    assert lock.is_leader
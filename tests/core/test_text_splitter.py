@@ -0,0 +1,79 @@
+import re
+
+from src.core.text_splitter import split_text, utf16_length
+from tests.core.conftest import wait_until
+
+
+def _is_balanced(chunk: str) -> bool:
+    stack = []
+    for closing, name in re.findall(r"<(/?)(\w+)[^>]*>", chunk):
+        if not closing:
+            stack.append(name)
+        elif not stack or stack.pop() != name:
+            return False
+    return not stack
+
+
+def test_short_text_is_not_split():
+    assert split_text("<b>text</b>", limit=20) == ["<b>text</b>"]
+
+
+def test_text_is_split_on_line_breaks():
+    lines = [f"line {index}" for index in range(10)]
+
+    chunks = split_text("\n".join(lines), limit=20)
+
+    assert all(utf16_length(chunk) <= 20 for chunk in chunks)
+    assert "\n".join(chunks).split("\n") == lines
+
+
+def test_open_tags_are_closed_and_reopened():
+    text = '<a href="https://t.me">' + "\n".join(["word"] * 10) + "</a>"
+
+    chunks = split_text(text, limit=40)
+
+    assert len(chunks) > 1
+    assert all(utf16_length(chunk) <= 40 and _is_balanced(chunk) for chunk in chunks)
+    assert all(chunk.startswith('<a href="https://t.me">') for chunk in chunks)
+    assert re.sub(r"<[^>]*>", "", "\n".join(chunks)) == re.sub(r"<[^>]*>", "", text)
+
+
+def test_entities_are_not_cut():
+    chunks = split_text("&amp;" * 10, limit=12)
+
+    assert chunks == ["&amp;&amp;", "&amp;&amp;", "&amp;&amp;", "&amp;&amp;", "&amp;&amp;"]
+
+
+def test_long_line_is_cut_by_spaces():
+    chunks = split_text("word " * 10, limit=12)
+
+    assert all(utf16_length(chunk) <= 12 for chunk in chunks)
+    assert "".join(chunks) == "word " * 10
+    assert all(chunk.endswith(" ") for chunk in chunks[:-1])
+
+
+def test_length_is_counted_in_utf16():
+    chunks = split_text("😀" * 10, limit=8)
+
+    assert chunks == ["😀" * 4, "😀" * 4, "😀" * 2]
+
+
+def test_plain_text_tags_are_text():
+    chunks = split_text("<b>" * 5, limit=6, html=False)
+
+    assert "".join(chunks) == "<b>" * 5 and all(len(chunk) <= 6 for chunk in chunks)
+
+
+def test_long_message_is_sent_as_several(bot, make_manager):
+    manager = make_manager()
+    manager.start()
+    results = []
+    text = "\n".join(["x" * 100] * 100)
+
+    manager.send_message(chat_id=-1, text=text, reply_to_message_id=5, reply_markup="markup", callback=results.append)
+
+    assert wait_until(lambda: results)
+    sent = [kwargs for _, _, kwargs in bot.calls]
+    assert len(sent) == 3 and "\n".join(kwargs["text"] for kwargs in sent) == text
+    assert [kwargs.get("reply_to_message_id") for kwargs in sent] == [5, None, None]
+    assert [kwargs.get("reply_markup") for kwargs in sent] == [None, None, "markup"]
@@ -0,0 +1,96 @@
+import http.client
+import inspect
+import json
+import queue
+import threading
+
+import pytest
+from telegram import Bot
+from telegram.ext import Updater
+from telegram.utils.webhookhandler import WebhookServer
+
+from src.core.webhook import SECRET_TOKEN_HEADER, SecretTokenWebhookHandler, WebhookUpdater
+
+SECRET = "secret-token_1"
+UPDATE = {"update_id": 1, "message": {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "/me"}}
+
+
+class FakeRequest:
+    """Records the Bot API posts instead of making them"""
+
+    con_pool_size = 8
+
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data, timeout=None):
+        self.posts.append((url.rsplit("/", 1)[-1], data))
+        return True
+
+
+@pytest.fixture
+def bot() -> Bot:
+    return Bot("123456:TEST", request=FakeRequest())
+
+
+@pytest.fixture
+def server(bot):
+    httpd = WebhookServer(("127.0.0.1", 0), SecretTokenWebhookHandler, queue.Queue(), "/hook", bot)
+    httpd.secret_token = SECRET
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    thread.join(5)
+
+
+def _post(server, headers, path="/hook") -> int:
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request("POST", path, json.dumps(UPDATE), {"Content-Type": "application/json", **headers})
+    status = connection.getresponse().status
+    connection.close()
+    return status
+
+
+def test_post_with_the_secret_token_is_queued(server):
+    assert _post(server, {SECRET_TOKEN_HEADER: SECRET}) == 200
+
+    update = server.update_queue.get(timeout=5)
+    assert update.update_id == 1 and update.message.text == "/me"
+
+
+@pytest.mark.parametrize("headers", [{}, {SECRET_TOKEN_HEADER: "wrong"}, {SECRET_TOKEN_HEADER: SECRET + "x"}])
+def test_post_without_the_secret_token_is_rejected(server, headers):
+    assert _post(server, headers) == 403
+    assert server.update_queue.empty()
+
+
+def test_post_to_another_path_is_rejected(server):
+    assert _post(server, {SECRET_TOKEN_HEADER: SECRET}, path="/other") == 403
+    assert server.update_queue.empty()
+
+
+def test_webhook_is_registered_with_the_secret_token(bot):
+    updater = WebhookUpdater(bot=bot, secret_token=SECRET, max_connections=10)
+
+    updater._set_webhook("https://example.com/hook", None, True, ["message"], max_retries=0)
+
+    assert bot._request.posts == [
+        (
+            "setWebhook",
+            {
+                "url": "https://example.com/hook",
+                "max_connections": 10,
+                "allowed_updates": ["message"],
+                "drop_pending_updates": True,
+                "secret_token": SECRET,
+            },
+        )
+    ]
+
+
+def test_start_webhook_overrides_the_updater_one():
+    """_start_webhook is private to python-telegram-bot, the override must keep up with the pinned version"""
+    assert list(inspect.signature(WebhookUpdater._start_webhook).parameters) == list(
+        inspect.signature(Updater._start_webhook).parameters
+    )
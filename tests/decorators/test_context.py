@@ -0,0 +1,83 @@
+import pytest
+from telegram import Update
+
+from src.config import settings
+
+if not settings.DATABASE_URL.startswith("postgres"):
+    pytest.skip(
+        "src.models create PostgreSQL-only indexes, set DATABASE_URL to a test database", allow_module_level=True
+    )
+
+from src.decorators.context import UpdateContext  # noqa: E402
+from src.models import Player, TelegramChat, TelegramUser, database  # noqa: E402
+
+USER_ID, CHAT_ID = 1001, -1001
+
+
+@pytest.fixture(autouse=True)
+def transaction():
+    with database.atomic() as transaction:
+        yield
+        transaction.rollback()
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    statements = []
+    execute_sql = database.execute_sql
+
+    def counting(sql, *args, **kwargs):
+        statements.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    monkeypatch.setattr(database, "execute_sql", counting)
+    return statements
+
+
+def _update(chat_id: int = CHAT_ID, user_id: int = USER_ID) -> Update:
+    chat_type = "private" if chat_id > 0 else "supergroup"
+    message = {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": chat_id, "type": chat_type},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+        "text": "text",
+    }
+    return Update.de_json({"update_id": 1, "message": message}, None)
+
+
+def test_user_player_and_chat_are_loaded_with_one_query(queries):
+    user = TelegramUser.create(user_id=USER_ID)
+    player = Player.create(telegram_user=user, nickname="nickname")
+    TelegramChat.create(chat_id=CHAT_ID, chat_type="supergroup")
+    queries.clear()
+
+    context = UpdateContext.of(_update())
+
+    assert context.invoker.user_id == USER_ID
+    assert context.player.id == player.id and context.player.telegram_user is context.invoker
+    assert context.chat.chat_id == CHAT_ID
+    assert len(queries) == 1
+
+
+def test_context_is_shared_by_the_update():
+    update = _update()
+
+    assert UpdateContext.of(update) is UpdateContext.of(update)
+
+
+def test_unknown_user_still_gets_the_chat():
+    TelegramChat.create(chat_id=CHAT_ID, chat_type="supergroup")
+
+    context = UpdateContext.of(_update())
+
+    assert context.invoker is None and context.player is None
+    assert context.chat.chat_id == CHAT_ID
+
+
+def test_private_chat_is_not_loaded():
+    TelegramUser.create(user_id=USER_ID)
+
+    context = UpdateContext.of(_update(chat_id=USER_ID))
+
+    assert context.invoker.user_id == USER_ID and context.player is None and context.chat is None
@@ -0,0 +1,46 @@
+import pytest
+
+from src.config import settings
+
+if not settings.DATABASE_URL.startswith("postgres"):
+    pytest.skip(
+        "src.models create PostgreSQL-only indexes, set DATABASE_URL to a test database", allow_module_level=True
+    )
+
+from src.models import Player, TelegramUser, database  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def transaction():
+    with database.atomic() as transaction:
+        yield
+        transaction.rollback()
+
+
+@pytest.fixture
+def player() -> Player:
+    return Player.create(telegram_user=TelegramUser.create(user_id=1001), nickname="Nickname")
+
+
+def test_exact_nickname_is_cached_and_handed_out_as_a_copy(player):
+    cached = Player.get_by_nickname("nickname")
+    cached.nickname = "changed"
+
+    assert Player.get_by_nickname("NICKNAME").nickname == "Nickname"
+
+
+def test_saved_player_is_invalidated(player):
+    assert Player.get_by_nickname("nickname").attack == 0
+
+    player.attack = 10
+    player.save()
+
+    assert Player.get_by_nickname("nickname").attack == 10
+
+
+def test_partial_nickname_is_not_cached(player):
+    assert Player.get_by_nickname("nick").id == player.id
+
+    Player.create(telegram_user=TelegramUser.create(user_id=1002), nickname="nick")
+
+    assert Player.get_by_nickname("nick").nickname == "nick"
@@ -0,0 +1,25 @@
+import pytest
+from playhouse.migrate import SchemaMigrator, migrate
+
+from src.config import settings
+
+if not settings.DATABASE_URL.startswith("postgres"):
+    pytest.skip(
+        "src.models create PostgreSQL-only indexes, set DATABASE_URL to a test database", allow_module_level=True
+    )
+
+from src.models import Trigger, database  # noqa: E402
+from src.models.migrations import run_migrations  # noqa: E402
+
+
+def _columns():
+    return {column.name for column in database.get_columns(Trigger._meta.table_name)}
+
+
+def test_trigger_file_id_is_added_once():
+    migrate(SchemaMigrator.from_database(database).drop_column(Trigger._meta.table_name, "file_id"))
+    assert "file_id" not in _columns()
+
+    assert run_migrations() == ["add_trigger_file_id"]
+    assert "file_id" in _columns()
+    assert run_migrations() == []
@@ -0,0 +1,126 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import settings
+from src.core import Outbox
+
+if not settings.DATABASE_URL.startswith("postgres"):
+    pytest.skip(
+        "src.models create PostgreSQL-only indexes, set DATABASE_URL to a test database", allow_module_level=True
+    )
+
+from src.models import OutboxMessage  # noqa: E402
+
+LEASE = datetime.timedelta(minutes=5)
+
+
+@pytest.fixture(autouse=True)
+def clean_outbox():
+    OutboxMessage.delete().execute()
+    yield
+    OutboxMessage.delete().execute()
+
+
+def _row(key: str, priority: int = 1, owner: str = None, **fields) -> dict:
+    now = datetime.datetime.now()
+    row = dict(
+        chat_id=1,
+        payload='{"chat_id": 1, "text": "%s"}' % key,
+        priority=priority,
+        not_before=now,
+        dedupe_key=key,
+        owner=owner,
+        claimed_at=now if owner else None,
+        created_date=now,
+    )
+    row.update(fields)
+    return row
+
+
+def test_claim_takes_due_free_rows_by_priority():
+    future = datetime.datetime.now() + datetime.timedelta(hours=1)
+    OutboxMessage.add_many(
+        [
+            _row("low", priority=2),
+            _row("high", priority=0),
+            _row("held", owner="other"),
+            _row("later", not_before=future),
+        ]
+    )
+
+    claimed = OutboxMessage.claim("me", 10, LEASE)
+
+    assert [row.dedupe_key for row in claimed] == ["high", "low"]
+    assert all(row.owner == "me" for row in claimed)
+    assert OutboxMessage.claim("another", 10, LEASE) == []
+
+
+def test_claim_respects_the_limit():
+    OutboxMessage.add_many([_row(str(index)) for index in range(5)])
+
+    assert [row.dedupe_key for row in OutboxMessage.claim("me", 2, LEASE)] == ["0", "1"]
+    assert [row.dedupe_key for row in OutboxMessage.claim("me", 10, LEASE)] == ["2", "3", "4"]
+
+
+def test_claim_returns_only_the_rows_it_took(monkeypatch):
+    now = datetime.datetime.now().replace(microsecond=0)
+
+    class FrozenDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    # a second-precision clock: the row held since an earlier claim has the same claimed_at
+    monkeypatch.setattr("src.models.outbox.datetime", SimpleNamespace(datetime=FrozenDatetime))
+    OutboxMessage.add_many([_row("mine", not_before=now), _row("held", owner="me", claimed_at=now)])
+
+    assert [row.dedupe_key for row in OutboxMessage.claim("me", 10, LEASE)] == ["mine"]
+
+
+def test_expired_lease_is_claimable():
+    expired = datetime.datetime.now() - LEASE * 2
+    OutboxMessage.add_many([_row("orphan", owner="dead", claimed_at=expired)])
+
+    assert [row.owner for row in OutboxMessage.claim("me", 10, LEASE)] == ["me"]
+
+
+def test_completed_rows_are_not_claimed():
+    OutboxMessage.add_many([_row("sent"), _row("failed")])
+    OutboxMessage.complete(["sent"])
+    OutboxMessage.complete(["failed"], "Forbidden")
+
+    assert OutboxMessage.claim("me", 10, LEASE) == []
+    assert OutboxMessage.get(OutboxMessage.dedupe_key == "failed").error == "Forbidden"
+
+
+def test_add_many_sends_a_sent_key_again_and_skips_a_queued_one():
+    OutboxMessage.add_many([_row("sent"), _row("queued")])
+    OutboxMessage.complete(["sent"], "error")
+
+    OutboxMessage.add_many([_row("sent", chat_id=2), _row("queued", chat_id=2)])
+
+    sent = OutboxMessage.get(OutboxMessage.dedupe_key == "sent")
+    assert (sent.chat_id, sent.sent_at, sent.error, sent.attempts) == (2, None, None, 0)
+    assert OutboxMessage.get(OutboxMessage.dedupe_key == "queued").chat_id == 1
+
+
+def test_outbox_flushes_and_replays_after_a_restart():
+    outbox = Outbox(OutboxMessage, "me")
+    outbox.add("sent", 1, {"chat_id": 1, "text": "sent"})
+    outbox.add("unsent", 1, {"chat_id": 1, "text": "unsent"})
+    outbox.complete("sent")
+    outbox.flush()
+
+    assert [row.dedupe_key for row in OutboxMessage.select()] == ["unsent"]
+    assert outbox.claim(10) == []
+
+    restarted = Outbox(OutboxMessage, "me")
+    restarted.replay()
+    rows = restarted.claim(10)
+
+    assert [(row.key, row.kwargs) for row in rows] == [("unsent", {"chat_id": 1, "text": "unsent"})]
+    restarted.complete("unsent")
+    restarted.flush()
+    assert OutboxMessage.get(OutboxMessage.dedupe_key == "unsent").sent_at is not None
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+from telegram import Update
+
+from src.config import settings
+from src.core import UndeliverableChats
+
+if not settings.DATABASE_URL.startswith("postgres"):
+    pytest.skip(
+        "src.models create PostgreSQL-only indexes, set DATABASE_URL to a test database", allow_module_level=True
+    )
+
+from src.models import TelegramChat, TelegramUser, database  # noqa: E402
+from src.modules.common.activity import ActivityModule  # noqa: E402
+
+USER_ID, CHAT_ID = 1001, -1001
+
+
+@pytest.fixture(autouse=True)
+def transaction():
+    with database.atomic() as transaction:
+        yield
+        transaction.rollback()
+
+
+@pytest.fixture
+def module() -> ActivityModule:
+    return ActivityModule(None, SimpleNamespace(undeliverable=UndeliverableChats()), None)
+
+
+def _update(chat_id: int = CHAT_ID, username: str = "user", title: str = "chat") -> Update:
+    chat = {"id": chat_id, "type": "private"} if chat_id > 0 else {"id": chat_id, "type": "supergroup", "title": title}
+    message = {
+        "message_id": 1,
+        "date": 0,
+        "chat": chat,
+        "from": {"id": USER_ID, "is_bot": False, "first_name": "user", "username": username},
+        "text": "text",
+    }
+    return Update.de_json({"update_id": 1, "message": message}, None)
+
+
+def _user() -> TelegramUser:
+    return TelegramUser.get(TelegramUser.user_id == USER_ID)
+
+
+def test_new_user_and_chat_are_written_at_once(module):
+    module._write_activity(None, _update())
+
+    assert _user().username == "user"
+    assert TelegramChat.get(TelegramChat.chat_id == CHAT_ID).title == "chat"
+
+
+def test_known_user_activity_is_written_by_the_flush(module):
+    module._write_activity(None, _update())
+    module._write_activity(None, _update(username="renamed", title="renamed"))
+    module._write_activity(None, _update(username="renamed again", title="renamed again"))
+
+    assert _user().username == "user"
+    module._flush()
+
+    assert _user().username == "renamed again"
+    assert TelegramChat.get(TelegramChat.chat_id == CHAT_ID).title == "renamed again"
+
+
+def test_new_private_chat_id_is_written_at_once(module):
+    module._write_activity(None, _update())
+
+    module._write_activity(None, _update(chat_id=USER_ID))
+    module._write_activity(None, _update(username="renamed"))
+
+    assert _user().chat_id == USER_ID
+    module._flush()
+    assert (_user().chat_id, _user().username) == (USER_ID, "renamed")
+
+
+def test_failed_flush_is_retried(module, monkeypatch):
+    module._write_activity(None, _update())
+    module._write_activity(None, _update(username="renamed"))
+    upsert_users = module._upsert_users
+
+    def failing(rows):
+        monkeypatch.setattr(module, "_upsert_users", upsert_users)
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(module, "_upsert_users", failing)
+    module._flush()
+    assert _user().username == "user"
+
+    module._flush()
+    assert _user().username == "renamed"
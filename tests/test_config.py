@@ -0,0 +1,27 @@
+import pytest
+from telegram.utils.request import Request
+
+from src.config import Config, ImproperlyConfigured
+
+
+def _config(**attributes) -> Config:
+    return type("TestConfig", (Config,), attributes)()
+
+
+def test_connection_pool_fits_the_api_callers_by_default():
+    config = _config(TG_CON_POOL_SIZE=None)
+
+    assert config.TG_CON_POOL_SIZE == config.CONCURRENT_API_CALLERS
+
+
+def test_too_small_connection_pool_is_rejected():
+    with pytest.raises(ImproperlyConfigured, match="TG_CON_POOL_SIZE"):
+        _config(TG_CON_POOL_SIZE="2")
+
+
+def test_request_kwargs_are_accepted_by_the_bot_request():
+    config = _config(TG_CON_POOL_SIZE="100", TG_READ_TIMEOUT=7.0)
+    request = Request(**config.REQUEST_KWARGS)
+
+    assert request.con_pool_size == 100
+    request.stop()
@@ -0,0 +1,50 @@
+import random
+import re
+
+from src.utils.trigger_matcher import TriggerMatcher
+
+
+def _regex_match(triggers, text):
+    """Matching of the per-trigger regexes the matcher replaced"""
+    matched = []
+    for request, in_message, ignore_case, value in triggers:
+        regex = r"[\s\S]*(?P<trigger>{})[\s\S]*" if in_message else r"(?P<trigger>{})"
+        pattern = re.compile(regex.format(re.escape(request)), re.IGNORECASE if ignore_case else 0)
+        if pattern.match(text):
+            matched.append(value)
+    return matched
+
+
+def test_prefix_and_in_message_triggers():
+    triggers = [
+        ("!привет", False, True, "greeting"),
+        ("бот", True, True, "mention"),
+        ("Case", True, False, "sensitive"),
+        ("", False, True, "empty"),
+    ]
+    matcher = TriggerMatcher(triggers)
+
+    assert matcher.match("!Привет, БОТ") == ["greeting", "mention", "empty"]
+    assert matcher.match("say !привет") == ["empty"]
+    assert matcher.match("a case of Case") == ["sensitive", "empty"]
+    assert len(matcher) == 4
+
+
+def test_overlapping_requests_are_all_found():
+    triggers = [("he", True, False, 0), ("she", True, False, 1), ("hers", True, False, 2), ("his", True, False, 3)]
+
+    assert TriggerMatcher(triggers).match("ushers") == [0, 1, 2]
+
+
+def test_matches_the_same_triggers_as_the_regexes():
+    rng = random.Random(0)
+    alphabet = "abAB аяАЯёЁ!\n"
+    for _ in range(300):
+        triggers = [
+            ("".join(rng.choices(alphabet, k=rng.randint(1, 3))), rng.random() < 0.5, rng.random() < 0.5, index)
+            for index in range(rng.randint(1, 15))
+        ]
+        matcher = TriggerMatcher(triggers)
+        for _ in range(10):
+            text = "".join(rng.choices(alphabet, k=rng.randint(0, 20)))
+            assert matcher.match(text) == _regex_match(triggers, text), (triggers, text)
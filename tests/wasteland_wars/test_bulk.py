@@ -0,0 +1,46 @@
+import itertools
+
+from benchmarks.parsers.corpus import FORWARD_DATE, load_corpus
+from src.wasteland_wars.enums import MessageKind
+from src.wasteland_wars.parsers import parse_forward, parse_forwards
+
+CORPUS = load_corpus()
+RECORDS = [(sample.text, FORWARD_DATE) for sample in CORPUS]
+
+
+def test_forward_is_parsed_as_its_kind():
+    for sample in CORPUS:
+        results = parse_forward(sample.text, FORWARD_DATE)
+
+        if sample.kind == MessageKind.UNKNOWN:
+            assert results == {}
+        else:
+            assert sample.kind in results
+
+
+def test_forwards_are_yielded_in_the_order_of_the_records():
+    records = RECORDS * 3
+
+    results = list(parse_forwards(records, workers=2, chunk_size=4))
+
+    assert results == [parse_forward(text, forward_date) for text, forward_date in records]
+
+
+def test_no_forwards():
+    assert list(parse_forwards([], workers=2)) == []
+
+
+def test_forwards_are_streamed():
+    """At most two chunks per worker are taken from the records ahead of the results"""
+    taken = []
+
+    def records():
+        for record in itertools.cycle(RECORDS):
+            taken.append(record)
+            yield record
+
+    results = parse_forwards(records(), workers=1, chunk_size=2)
+
+    assert next(results) == parse_forward(*RECORDS[0])
+    assert len(taken) <= 3 * 2
+    results.close()
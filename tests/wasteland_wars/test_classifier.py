@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from benchmarks.parsers.corpus import FORWARD_DATE, load_corpus
+from src.wasteland_wars.enums import MessageKind
+from src.wasteland_wars.parsers import PARSERS, parse_forward
+from src.wasteland_wars.utils import get_message_kinds
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("sample", CORPUS, ids=lambda sample: f"{sample.kind}/{sample.name}")
+def test_forward_is_classified_as_its_kind(sample):
+    kinds = get_message_kinds(sample.text)
+
+    if sample.kind != MessageKind.UNKNOWN:
+        assert sample.kind in kinds
+
+
+@pytest.mark.parametrize("sample", CORPUS, ids=lambda sample: f"{sample.kind}/{sample.name}")
+def test_classified_parsing_equals_running_every_parser(sample):
+    every_parser = {kind: parser(sample.text, FORWARD_DATE) for kind, parser in PARSERS.items()}
+
+    assert parse_forward(sample.text, FORWARD_DATE) == {
+        kind: result for kind, result in every_parser.items() if result is not None
+    }
+
+
+def test_text_without_markers_runs_no_parser():
+    assert get_message_kinds("Привет, как дела?") == frozenset()
+    assert parse_forward("Привет, как дела?", FORWARD_DATE) == {}
+
+
+def test_markers_are_required_by_the_parsers():
+    """A parser never matches a text the classifier rejected, checked on mutations of the corpus"""
+    rng = random.Random(0)
+    texts = [sample.text for sample in CORPUS]
+    for _ in range(2_000):
+        lines = rng.choice(texts).split("\n")
+        for _ in range(rng.randint(1, 3)):
+            index = rng.randrange(len(lines))
+            line = lines[index]
+            start = rng.randrange(len(line) + 1)
+            lines[index] = line[:start] + line[start + rng.randint(1, 8) :]
+        text = "\n".join(lines)
+
+        kinds = get_message_kinds(text)
+        for kind, parser in PARSERS.items():
+            if kind not in kinds:
+                assert parser(text, FORWARD_DATE) is None, (kind, text)
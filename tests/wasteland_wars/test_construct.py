@@ -0,0 +1,47 @@
+import pydantic
+import pytest
+
+from benchmarks.parsers.corpus import FORWARD_DATE, PARSERS, load_corpus
+from src.wasteland_wars.schemas import GangMember, construct
+
+CORPUS = load_corpus()
+
+
+@pytest.fixture
+def validated(monkeypatch):
+    monkeypatch.setattr(construct, "VALIDATE_SCHEMAS", True)
+
+
+def _parse_corpus():
+    return [parser(sample.text, FORWARD_DATE) for sample in CORPUS for parser in PARSERS.values()]
+
+
+def test_validation_does_not_change_the_parse_results(monkeypatch):
+    monkeypatch.setattr(construct, "VALIDATE_SCHEMAS", False)
+    trusted = _parse_corpus()
+
+    monkeypatch.setattr(construct, "VALIDATE_SCHEMAS", True)
+    assert _parse_corpus() == trusted
+    assert any(trusted)
+
+
+def test_trusted_build_takes_the_fields_as_is(monkeypatch):
+    monkeypatch.setattr(construct, "VALIDATE_SCHEMAS", False)
+
+    member = construct.build(GangMember, nickname="Игрок", ears="12", kilometr=3, status="👊")
+
+    assert member == GangMember(nickname="Игрок", ears="12", kilometr=3, status="👊")
+
+
+def test_validated_build_converts_the_fields(validated):
+    member = construct.build(GangMember, nickname="Игрок", ears="12", kilometr=3, status="👊")
+
+    assert member == GangMember(nickname="Игрок", ears=12, kilometr=3, status="👊")
+
+
+def test_validated_build_rejects_wrong_fields(validated):
+    with pytest.raises(pydantic.ValidationError):
+        construct.build(GangMember, nickname="Игрок", ears="много", kilometr=3, status="👊")
+
+    with pytest.raises(pydantic.ValidationError):
+        construct.build(GangMember, nickname="Игрок", ears=12, kilometr=3)
@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.parsers.__main__ import check_corpus
+from benchmarks.parsers.corpus import FORWARD_DATE, PARSERS, load_corpus
+from benchmarks.parsers.fuzz import Growth, make_generators
+
+CORPUS = load_corpus()
+
+
+def test_every_kind_has_samples():
+    assert {sample.kind for sample in CORPUS} >= set(PARSERS)
+
+
+def test_parsers_match_exactly_their_corpus():
+    assert check_corpus(CORPUS) == []
+
+
+@pytest.mark.parametrize("name", sorted(make_generators(CORPUS)))
+def test_parsers_survive_the_fuzz_inputs(name):
+    text = make_generators(CORPUS)[name](2_000)
+
+    for parser in PARSERS.values():
+        parser(text, FORWARD_DATE)
+
+
+def test_growth_exponent():
+    assert Growth("input", "parser", [1, 2, 4], [1, 2, 4]).exponent == pytest.approx(1)
+    assert Growth("input", "parser", [1, 2, 4], [1, 4, 16]).exponent == pytest.approx(2)
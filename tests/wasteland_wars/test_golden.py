@@ -0,0 +1,126 @@
+import importlib
+import random
+
+import pytest
+
+from benchmarks.parsers.corpus import FORWARD_DATE, load_corpus
+from src.wasteland_wars.enums import MessageKind
+
+# the package exports the parse functions under the same names as their modules
+parse_pipboy = importlib.import_module("src.wasteland_wars.parsers.parse_pipboy")
+parse_gang_panel = importlib.import_module("src.wasteland_wars.parsers.parse_gang_panel")
+parse_goat_panel = importlib.import_module("src.wasteland_wars.parsers.parse_goat_panel")
+
+CORPUS = load_corpus()
+PANEL = next(sample.text for sample in CORPUS if sample.name == "members_05")
+
+# what a near-miss may put into a text: the characters the member and header regexes hinge on
+NEAR_MISS_CHARACTERS = " \n\t\r👂👊⛺km0123456789🔸ab)(/:,"
+
+GANG_NEAR_MISSES = [
+    PANEL + "\n",
+    PANEL + "\n\n",
+    PANEL + "\nВсего 5",
+    PANEL + "\nab\n🔸 Игрок06 👂1 👊2km",
+    PANEL + "\n 🔸 Игрок06 👂1 👊2km",
+    PANEL + "\n🔸 Игрок06 👂1 👊2km🔸 Игрок07 👂3 👊4km",
+    PANEL + "\n🔸 Игрок06 👂1 👊2km хвост",
+    PANEL + "\n🔸 Игрок06 👂1\n👊2km",
+    PANEL + "\n🔸 Игрок06 👂1 👊2km\r",
+    PANEL + "\n🔸 Игрок06 👂1 👊" * 20,
+    PANEL.replace("Участники (5/30)", "Участники (5/30) и ещё"),
+    PANEL.replace("Участники (5/30)\n", "Участники (5/30)"),
+    PANEL.replace("\n🔸", "\n\n🔸"),
+    PANEL.replace(" 👂", "\n👂", 1),
+    PANEL.replace("km\n", "km \n", 1),
+]
+
+
+def _mutations(texts, count: int, seed: int):
+    """Texts with a few characters inserted, deleted or replaced"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = list(rng.choice(texts))
+        for _ in range(rng.randint(1, 6)):
+            position = rng.randrange(len(text) + 1)
+            operation = rng.randrange(3)
+            if operation == 0:
+                text.insert(position, rng.choice(NEAR_MISS_CHARACTERS))
+            elif position < len(text):
+                text[position : position + 1] = [rng.choice(NEAR_MISS_CHARACTERS)] if operation == 1 else []
+        yield "".join(text)
+
+
+def _texts(kind: MessageKind):
+    own = [sample.text for sample in CORPUS if sample.kind == kind]
+    return own + list(_mutations(own, 3_000, seed=len(own)))
+
+
+def _use_regexes_only(monkeypatch):
+    """Switches the parsers to the regexes they had before the line layouts"""
+    monkeypatch.setattr(parse_pipboy, "_match_profile_lines", lambda lines: None)
+    monkeypatch.setattr(parse_pipboy, "_match_profile_short_lines", lambda lines: None)
+    monkeypatch.setattr(parse_goat_panel, "_match_goat_panel_lines", lambda lines: None)
+    monkeypatch.setattr(parse_gang_panel, "_match_gang_panel_lines", lambda lines: None)
+    monkeypatch.setattr(
+        parse_gang_panel,
+        "_match_members",
+        lambda text, startpos: parse_gang_panel.gang_member_regex.finditer(text, startpos + 1),
+    )
+
+
+def _outcome(parse, text: str):
+    """The result, or the error for the texts a parser fails on, e.g. a malformed dzen of a short profile"""
+    try:
+        return parse(text, FORWARD_DATE)
+    except ValueError as error:
+        return repr(error)
+
+
+def _assert_equal_to_regexes(parse, texts, monkeypatch):
+    results = [_outcome(parse, text) for text in texts]
+    _use_regexes_only(monkeypatch)
+    assert [_outcome(parse, text) for text in texts] == results
+    return results
+
+
+def test_pipboy_equals_the_regexes(monkeypatch):
+    texts = _texts(MessageKind.PIPBOY)
+
+    results = _assert_equal_to_regexes(parse_pipboy.parse_pipboy, texts, monkeypatch)
+
+    assert any(results)
+
+
+def test_goat_panel_equals_the_regexes(monkeypatch):
+    texts = _texts(MessageKind.GOAT_PANEL)
+
+    results = _assert_equal_to_regexes(parse_goat_panel.parse_goat_panel, texts, monkeypatch)
+
+    assert any(results)
+
+
+def test_gang_panel_equals_the_regexes(monkeypatch):
+    texts = _texts(MessageKind.GANG_PANEL) + GANG_NEAR_MISSES
+
+    results = _assert_equal_to_regexes(parse_gang_panel.parse_gang_panel, texts, monkeypatch)
+
+    assert any(results)
+
+
+@pytest.mark.parametrize("text", GANG_NEAR_MISSES)
+def test_gang_members_equal_finditer(text):
+    _, startpos = parse_gang_panel._match_gang_panel(text)
+
+    expected = [match.groups() for match in parse_gang_panel.gang_member_regex.finditer(text, startpos + 1)]
+    assert [match.groups() for match in parse_gang_panel._match_members(text, startpos)] == expected
+
+
+def test_gang_members_without_km_are_found_in_linear_time():
+    """finditer backtracks over the whole line from each of its positions"""
+    text = PANEL + "\n" + "🔸 Игрок 👂12 👊" * 20_000
+
+    _, startpos = parse_gang_panel._match_gang_panel(text)
+
+    members = [match.group("nickname") for match in parse_gang_panel._find_members(text, startpos + 1)]
+    assert members == [f"Игрок0{number} " for number in range(1, 6)]